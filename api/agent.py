@@ -1,5 +1,4 @@
 """PydanticAI agent with tools for VNP46A1 satellite data queries."""
-import asyncio
 import json
 import os
 import uuid
@@ -12,9 +11,19 @@ from pydantic_ai.models.google import GoogleModel
 from pydantic_ai.providers.google import GoogleProvider
 
 from satellite_async.config import PIXELES_MUNICIPIOS
+from satellite_async.processing import mask_to_json, radiance_to_json
 from satellite_async.utils import normalize_municipio
 
-from .job_manager import job_store, run_job, run_matriz_job
+from .job_manager import (
+    INTERACTIVE,
+    QueueFullError,
+    job_store,
+    memoized_job,
+    memoized_matriz_job,
+    run_job,
+    run_matriz_job,
+    submit_job,
+)
 
 load_dotenv()
 
@@ -114,13 +123,16 @@ def _create_agent() -> Agent:
             return {"error": "No hay fechas en el rango"}
 
         job_id = str(uuid.uuid4())
-        job_store.create(job_id)
-        task = asyncio.create_task(
-            run_job(job_id, [normalized], fechas, None)
-        )
-        job_store.set_task(job_id, task)
-        print(f"[Agent] get_mediciones: job {job_id[:8]}... running, waiting...")
-        await task
+        state = memoized_job(job_id, [normalized], fechas)
+        if state is None:
+            try:
+                state = submit_job(
+                    job_id, run_job(job_id, [normalized], fechas, None, incremental=True), INTERACTIVE
+                )
+            except QueueFullError:
+                return {"error": "Hay demasiados trabajos en cola; intenta de nuevo más tarde"}
+            print(f"[Agent] get_mediciones: job {job_id[:8]}... running, waiting...")
+            await state.task
 
         state = job_store.get(job_id)
         if not state:
@@ -163,11 +175,14 @@ def _create_agent() -> Agent:
         d = date.fromisoformat(fecha)
 
         job_id = str(uuid.uuid4())
-        job_store.create(job_id)
-        task = asyncio.create_task(run_matriz_job(job_id, municipio, d))
-        job_store.set_task(job_id, task)
-        print(f"[Agent] get_radiance_matrix: job {job_id[:8]}... running, waiting...")
-        await task
+        state = memoized_matriz_job(job_id, municipio, d)
+        if state is None:
+            try:
+                state = submit_job(job_id, run_matriz_job(job_id, municipio, d), INTERACTIVE)
+            except QueueFullError:
+                return {"error": "Hay demasiados trabajos en cola; intenta de nuevo más tarde"}
+            print(f"[Agent] get_radiance_matrix: job {job_id[:8]}... running, waiting...")
+            await state.task
 
         state = job_store.get(job_id)
         if not state:
@@ -176,19 +191,20 @@ def _create_agent() -> Agent:
         if state.status == "failed":
             print(f"[Agent] get_radiance_matrix: job failed - {state.error}")
             return {"error": state.error or "Job falló"}
-        if state.status != "completed" or not state.results:
+        results = state.results
+        if state.status != "completed" or not results:
             print(f"[Agent] get_radiance_matrix: job status={state.status}")
             return {"error": f"Job en estado {state.status}"}
 
-        result = state.results[0]
+        result = results[0]
         print(f"[Agent] get_radiance_matrix -> completed, matrix {result.get('rows',0)}x{result.get('cols',0)}")
         data = {
             "municipio": result.get("municipio", municipio),
             "fecha": result.get("fecha"),
             "rows": int(result.get("rows", 0)),
             "cols": int(result.get("cols", 0)),
-            "radiance_matrix": _to_json_serializable(result.get("radiance_matrix", [])),
-            "municipality_mask": _to_json_serializable(result.get("municipality_mask", [])),
+            "radiance_matrix": radiance_to_json(result.get("radiance_matrix", [])),
+            "municipality_mask": mask_to_json(result.get("municipality_mask", [])),
         }
         if hasattr(data["fecha"], "isoformat"):
             data["fecha"] = data["fecha"].isoformat()
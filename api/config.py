@@ -0,0 +1,24 @@
+"""API settings read from environment variables (job store backend and limits)."""
+import os
+
+from satellite_async.config import CACHE_DIR
+
+# Job store backend: "memory" (process-local) or "sqlite" (survives restarts)
+JOB_STORE_BACKEND = os.getenv("VNP46A1_JOB_STORE", "memory").strip().lower()
+# Finished jobs are evicted after this many seconds
+JOB_TTL_SECONDS = int(os.getenv("VNP46A1_JOB_TTL_SECONDS", str(24 * 3600)))
+# Budget for the results of finished jobs (in memory or spilled to disk); oldest evicted first
+JOB_STORE_MAX_BYTES = int(os.getenv("VNP46A1_JOB_STORE_MAX_BYTES", str(512 * 1024**2)))
+# SQLite backend: job status database and directory for spilled result payloads
+JOB_STORE_DB = os.getenv("VNP46A1_JOB_STORE_DB", os.path.join(CACHE_DIR, "jobs.sqlite"))
+JOB_RESULTS_DIR = os.getenv("VNP46A1_JOB_RESULTS_DIR", os.path.join(CACHE_DIR, "job_results"))
+
+# Job queue: jobs running at once and jobs allowed to wait before POST returns 429
+JOB_WORKERS = int(os.getenv("VNP46A1_JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("VNP46A1_JOB_QUEUE_MAX", "100"))
+
+# Memo of (municipio, fecha) results shared by /jobs, /matriz and the agent (0 disables it)
+MEMO_MAX_BYTES = int(os.getenv("VNP46A1_MEMO_MAX_BYTES", str(256 * 1024**2)))
+
+# Longest date range accepted by POST /matriz/rango (one cube slice per day)
+MATRIZ_RANGO_MAX_DIAS = int(os.getenv("VNP46A1_MATRIZ_RANGO_MAX_DIAS", "366"))
@@ -1,55 +1,88 @@
-"""In-memory job store and background job execution for satellite processing."""
+"""Background job execution for satellite processing. Job states live in api.job_store."""
 import asyncio
-import os
 from datetime import date, datetime
-from typing import Literal
 
-from satellite_async.config import PIXELES_MUNICIPIOS
-from satellite_async.downloader import download_file, find_file
+from satellite_async.cache import get_granule_cache
+from satellite_async.checkpoint import CheckpointJournal
+from satellite_async.config import IN_MEMORY_GRANULES, PIXELES_MUNICIPIOS
+from satellite_async.cube import build_radiance_cube
+from satellite_async.downloader import fetch_granule, fetch_granule_source
 from satellite_async.processing import extract_radiance_matrix
 from satellite_async.satellite_async import SatelliteImagesAsync
 from satellite_async.utils import load_coord_data, normalize_municipio, parse_date
+from satellite_async.workers import run_cpu
 
+from .job_queue import BULK, INTERACTIVE, JobQueue, QueueFullError
+from .job_store import JobState, JobStore, create_job_store
+from .memo import ResultMemo
+from .streaming import JobEvents, medicion_event, status_event
 
-class JobState:
-    """Mutable state for a single job."""
 
-    def __init__(self, job_id: str):
-        self.job_id = job_id
-        self.status: Literal["pending", "running", "completed", "failed"] = "pending"
-        self.progress: str | None = None
-        self.created_at = datetime.utcnow()
-        self.finished_at: datetime | None = None
-        self.error: str | None = None
-        self.results: list[dict] = []
-        self.total_results: int = 0
-        self.task: asyncio.Task | None = None
+job_store = create_job_store()
+memo = ResultMemo()
+job_events = JobEvents()
 
 
-class JobStore:
-    """In-memory store for job states. Single instance used by the API."""
+def _report_queue_position(job_id: str, position: int) -> None:
+    state = job_store.get(job_id)
+    if state and state.status == "pending":
+        state.progress = f"En cola (posición {position})"
+
+
+job_queue = JobQueue(on_position=_report_queue_position)
+
+
+def submit_job(job_id: str, coro, priority: int = BULK) -> JobState:
+    """
+    Create the job state and queue `coro` to run it. Raises QueueFullError (without
+    creating the job) when the queue cannot admit it.
+    """
+    try:
+        job_queue.check_admission()
+    except QueueFullError:
+        coro.close()
+        raise
+    state = job_store.create(job_id)
+    job_store.set_task(job_id, job_queue.submit(job_id, coro, priority))
+    return state
 
-    def __init__(self):
-        self._jobs: dict[str, JobState] = {}
 
-    def create(self, job_id: str) -> JobState:
-        state = JobState(job_id)
-        self._jobs[job_id] = state
-        return state
+def completed_job(job_id: str, results: list[dict]) -> JobState:
+    """Create a job that is already completed with memoized results (no queueing)."""
+    state = job_store.create(job_id)
+    state.results = results
+    state.total_results = len(results)
+    state.status = "completed"
+    state.progress = "Resultados en memoria"
+    state.finished_at = datetime.utcnow()
+    job_store.save(state)
+    memo.served_requests += 1
+    return state
 
-    def get(self, job_id: str) -> JobState | None:
-        return self._jobs.get(job_id)
 
-    def set_task(self, job_id: str, task: asyncio.Task) -> None:
-        state = self._jobs.get(job_id)
-        if state:
-            state.task = task
+def memoized_job(job_id: str, municipios: list[str], fechas: list[str]) -> JobState | None:
+    """Completed job if every (municipio, fecha) pair is memoized, otherwise None."""
+    municipios = [normalize_municipio(m) for m in municipios]
+    dates = [parse_date(f)[2] for f in fechas]
+    if not memo.covers(municipios, dates):
+        return None
+    rows, _ = memo.lookup_mediciones(municipios, dates)
+    return completed_job(job_id, rows)
 
-    def remove(self, job_id: str) -> None:
-        self._jobs.pop(job_id, None)
 
+def memoized_matriz_job(job_id: str, municipio: str, fecha: date) -> JobState | None:
+    """Completed matriz job if the result for (municipio, fecha) is memoized, otherwise None."""
+    key = memo.matriz_key(normalize_municipio(municipio), fecha)
+    if key not in memo:
+        return None
+    return completed_job(job_id, [{**memo.get(key), "job_id": job_id}])
 
-job_store = JobStore()
+
+def _merge_rows(memo_rows: list[dict], new_rows: list[dict]) -> list[dict]:
+    """Memoized and newly computed rows, one per (municipio, fecha), sorted by date."""
+    merged = {(r["Municipio"], r["Fecha"]): r for r in memo_rows}
+    merged.update({(r["Municipio"], r["Fecha"]): r for r in new_rows})
+    return sorted(merged.values(), key=lambda r: (r["Fecha"], r["Municipio"]))
 
 
 async def run_job(
@@ -57,31 +90,80 @@ async def run_job(
     municipios: list[str],
     fechas: list[str],
     chunks: int | None,
+    incremental: bool = False,
 ) -> None:
     """
     Run satellite processing in the background. Updates the job state in job_store.
+    With incremental=True only (municipio, fecha) pairs missing from the results store
+    are downloaded and processed. Progress is checkpointed under job_id, so a job that
+    already has a checkpoint journal continues where it stopped (see resume_job).
+    (municipio, fecha) pairs already in the memo are not computed again; only the gap is.
+    Each measurement and progress update is published to job_events as it is produced
+    (see GET /jobs/{job_id}/stream).
     """
     state = job_store.get(job_id)
     if not state:
         return
+    municipios = [normalize_municipio(m) for m in municipios]
+    dates = {f: parse_date(f)[2] for f in fechas}
+    memo_rows, missing = memo.lookup_mediciones(municipios, list(dates.values()))
+    gap_fechas = [f for f, d in dates.items() if d in missing]
+    gap_municipios = [m for m in municipios if any(m in faltan for faltan in missing.values())]
+
     state.status = "running"
-    state.progress = "0/" + str(len(fechas)) + " fechas"
+    state.progress = "0/" + str(len(gap_fechas)) + " fechas"
+    job_store.save(state)
+    job_events.publish(job_id, *status_event(state))
+
+    def _publish_rows(rows: list[dict]) -> None:
+        state.results.extend(rows)
+        state.total_results = len(state.results)
+        if job_events.has_subscribers(job_id):
+            for row in rows:
+                job_events.publish(job_id, *medicion_event(row))
+
+    fechas_progress = state.progress
+    downloaded_mb = 0.0
+
+    def _render_progress() -> None:
+        suffix = f" ({downloaded_mb:.1f} MB descargados)" if downloaded_mb else ""
+        state.progress = fechas_progress + suffix
 
     def on_progress(progress: str) -> None:
-        if state:
-            state.progress = progress
+        nonlocal fechas_progress
+        fechas_progress = progress
+        _render_progress()
+        job_events.publish(job_id, *status_event(state))
+
+    def on_download(total_bytes: int) -> None:
+        nonlocal downloaded_mb
+        downloaded_mb = total_bytes / 1024**2
+        _render_progress()
 
     try:
-        sat = SatelliteImagesAsync(municipios)
-        df = await sat.run(
-            fechas,
-            chunks=chunks,
-            save_progress_enabled=False,
-            on_progress=on_progress,
-        )
-        state.results = df.to_dict(orient="records") if not df.empty else []
+        state.results = []
+        _publish_rows(memo_rows)
+        new_rows = []
+        if gap_fechas:
+            sat = SatelliteImagesAsync(gap_municipios)
+            async for lote in sat.iter_measures(
+                gap_fechas,
+                chunks=chunks,
+                on_progress=on_progress,
+                on_download=on_download,
+                incremental=incremental,
+                job_id=job_id,
+                # The journal keeps the full request: after a restart the memo may no longer cover it
+                journal_params={"municipios": municipios, "fechas": list(fechas), "chunks": chunks, "incremental": incremental},
+            ):
+                new_rows.extend(lote.filas)
+                memo.store_mediciones(lote.filas)
+                _publish_rows(lote.filas)
+        state.results = _merge_rows(memo_rows, new_rows)
         state.status = "completed"
         state.total_results = len(state.results)
+        # Nothing left to resume
+        CheckpointJournal(job_id).discard()
     except asyncio.CancelledError:
         state.status = "failed"
         state.error = "Job cancelled"
@@ -90,18 +172,53 @@ async def run_job(
         state.error = str(e)
     finally:
         state.finished_at = datetime.utcnow()
+        job_store.save(state)
+        job_events.publish(job_id, *status_event(state, "end"))
 
 
-async def run_matriz_job(job_id: str, municipio: str, fecha: date) -> None:
+def resume_job(job_id: str) -> JobState | None:
+    """
+    Restart a job from its checkpoint journal, e.g. after a failure or an API restart.
+    Returns the new job state, or None if there is no journal for job_id.
+    Only the (fecha, cuadrante) units not completed before are processed again.
+    Raises QueueFullError when the job queue is full.
+    """
+    journal_state = CheckpointJournal(job_id).load()
+    if journal_state is None:
+        return None
+    params = journal_state.params
+    return submit_job(
+        job_id,
+        run_job(
+            job_id,
+            params["municipios"],
+            params["fechas"],
+            params.get("chunks"),
+            params.get("incremental", False),
+        ),
+        BULK,
+    )
+
+
+async def run_matriz_job(
+    job_id: str,
+    municipio: str,
+    fecha: date,
+    in_memory: bool = IN_MEMORY_GRANULES,
+) -> None:
     """
     Run matriz extraction in the background. Downloads HDF5, extracts radiance
     submatrix and municipality mask, stores result in job_store.
+    With in_memory=True (VNP46A1_IN_MEMORY) a granule that is not already cached is
+    kept in memory and opened from the buffer; nothing is written to disk.
+    Results are memoized per (municipio, fecha).
     """
     state = job_store.get(job_id)
     if not state:
         return
     state.status = "running"
     state.progress = "Descargando imagen..."
+    job_store.save(state)
 
     try:
         municipio_norm = normalize_municipio(municipio)
@@ -110,42 +227,107 @@ async def run_matriz_job(job_id: str, municipio: str, fecha: date) -> None:
         year, day, date_obj = parse_date(date_str)
         cuadrante = coord_data.cuadrante
 
+        # Another job may have computed it while this one was queued
+        cached = memo.get(memo.matriz_key(municipio_norm, date_obj))
+        if cached is not None:
+            state.results = [{**cached, "job_id": job_id}]
+            state.status = "completed"
+            state.total_results = 1
+            return
+
         import aiohttp
 
-        async with aiohttp.ClientSession() as session:
-            h5_url = await find_file(session, year, day, cuadrante)
-            if not h5_url:
-                state.status = "failed"
-                state.error = f"No se encontró archivo HDF5 para {year}-{day} ({cuadrante})"
-                return
+        def on_bytes(received: int, total: int | None) -> None:
+            done = f"{received / 1024**2:.1f}"
+            state.progress = (
+                f"Descargando imagen... {done}/{total / 1024**2:.1f} MB"
+                if total
+                else f"Descargando imagen... {done} MB"
+            )
 
-            os.makedirs("../temp", exist_ok=True)
-            save_path = f"../temp/{date_obj}_{cuadrante}_matriz.h5"
-            downloaded_path = await download_file(session, h5_url, save_path)
+        async with aiohttp.ClientSession() as session:
+            if in_memory:
+                downloaded_path = await fetch_granule_source(
+                    session, year, day, cuadrante, on_bytes=on_bytes
+                )
+            else:
+                downloaded_path = await fetch_granule(
+                    session, year, day, cuadrante, pin=True, on_bytes=on_bytes
+                )
             if not downloaded_path:
                 state.status = "failed"
-                state.error = f"Error descargando archivo HDF5"
+                state.error = f"No se pudo obtener el archivo HDF5 para {year}-{day} ({cuadrante})"
                 return
 
         state.progress = "Extrayendo matrices..."
-        result = extract_radiance_matrix(
-            downloaded_path,
-            list(coord_data.coordenadas_pixeles),
-            date_obj,
-            municipio_norm,
-        )
-
         try:
-            if os.path.exists(downloaded_path):
-                os.remove(downloaded_path)
-        except OSError:
-            pass
+            result = await run_cpu(
+                extract_radiance_matrix,
+                downloaded_path,
+                list(coord_data.coordenadas_pixeles),
+                date_obj,
+                municipio_norm,
+            )
+        finally:
+            # Cached granules are pinned so other jobs cannot evict them while being read
+            if isinstance(downloaded_path, str):
+                get_granule_cache().unpin(downloaded_path)
 
         if result is None:
             state.status = "failed"
             state.error = "No se pudo extraer la matriz de radianza"
             return
 
+        memo.put(memo.matriz_key(municipio_norm, date_obj), dict(result))
+        result["job_id"] = job_id
+        state.results = [result]
+        state.status = "completed"
+        state.total_results = 1
+
+    except asyncio.CancelledError:
+        state.status = "failed"
+        state.error = "Job cancelled"
+    except Exception as e:
+        state.status = "failed"
+        state.error = str(e)
+    finally:
+        state.finished_at = datetime.utcnow()
+        job_store.save(state)
+
+
+async def run_matriz_rango_job(
+    job_id: str,
+    municipio: str,
+    fechas: list[date],
+    in_memory: bool = IN_MEMORY_GRANULES,
+) -> None:
+    """
+    Build the (time, rows, cols) radiance cube of a municipio for a date range in the
+    background (see satellite_async.cube). All dates share one HTTP session, one listing
+    lookup and one mask; dates without a granule stay NaN. Fails only if no date is found.
+    """
+    state = job_store.get(job_id)
+    if not state:
+        return
+    state.status = "running"
+    state.progress = f"0/{len(fechas)} fechas"
+    job_store.save(state)
+
+    def on_progress(done: int, total: int) -> None:
+        state.progress = f"{done}/{total} fechas"
+
+    try:
+        result = await build_radiance_cube(
+            municipio, fechas, in_memory=in_memory, on_progress=on_progress
+        )
+        if result is None:
+            state.status = "failed"
+            state.error = "No se pudo extraer la matriz de radianza"
+            return
+        if not any(result["available"]):
+            state.status = "failed"
+            state.error = "No se pudo obtener ningún archivo HDF5 del rango"
+            return
         result["job_id"] = job_id
         state.results = [result]
         state.status = "completed"
@@ -159,3 +341,4 @@ async def run_matriz_job(job_id: str, municipio: str, fecha: date) -> None:
         state.error = str(e)
     finally:
         state.finished_at = datetime.utcnow()
+        job_store.save(state)
@@ -0,0 +1,122 @@
+"""
+Priority queue with a fixed number of execution slots for background jobs.
+
+Every job still gets its own asyncio.Task (so it can be cancelled or awaited), but the task
+only starts its work once one of the `workers` slots is free. Waiting jobs are served by
+priority (INTERACTIVE before BULK) and then in arrival order. When no slot is free and
+`max_queued` jobs are already waiting, new jobs are rejected with QueueFullError.
+Pipeline metrics recorded while a job runs are also attributed to it (see /metrics).
+"""
+import asyncio
+import heapq
+import itertools
+from typing import Callable, Coroutine
+
+from satellite_async.metrics import job_scope
+
+from .config import JOB_QUEUE_MAX, JOB_WORKERS
+
+INTERACTIVE = 0
+BULK = 10
+
+
+class QueueFullError(Exception):
+    """Raised when a job cannot be admitted because the queue is full."""
+
+
+class JobQueue:
+    """Admission queue shared by the API routes and the agent tools."""
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        max_queued: int = JOB_QUEUE_MAX,
+        on_position: Callable[[str, int], None] | None = None,
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.on_position = on_position
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._running: set[str] = set()
+        self._waiting: list[tuple[int, int, str, asyncio.Future]] = []
+        self._waiter_tasks: dict[asyncio.Future, asyncio.Task] = {}
+        self._seq = itertools.count()
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        # Slots and waiters belong to one event loop; a new loop starts with an empty queue
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._running = set()
+            self._waiting = []
+            self._waiter_tasks = {}
+        return loop
+
+    def _has_free_slot(self) -> bool:
+        return len(self._running) < self.workers and not self._waiting
+
+    def check_admission(self) -> None:
+        """Raise QueueFullError if a new job would be rejected right now."""
+        self._bind_loop()
+        if not self._has_free_slot() and len(self._waiting) >= self.max_queued:
+            raise QueueFullError(f"Job queue is full ({len(self._waiting)} jobs waiting)")
+
+    def position(self, job_id: str) -> int | None:
+        """1-based position of a waiting job, or None if it is running or unknown."""
+        for i, (_, _, waiting_id, _) in enumerate(sorted(self._waiting)):
+            if waiting_id == job_id:
+                return i + 1
+        return None
+
+    def _report_positions(self) -> None:
+        if self.on_position is None:
+            return
+        for i, (_, _, job_id, _) in enumerate(sorted(self._waiting)):
+            self.on_position(job_id, i + 1)
+
+    def submit(self, job_id: str, coro: Coroutine, priority: int = BULK) -> asyncio.Task:
+        """
+        Queue `coro` as job `job_id` and return its task. The coroutine starts once a slot is
+        free. Raises QueueFullError (and closes `coro`) if the job cannot be admitted.
+        """
+        try:
+            self.check_admission()
+        except QueueFullError:
+            coro.close()
+            raise
+        waiter = None
+        if self._has_free_slot():
+            self._running.add(job_id)
+        else:
+            waiter = self._loop.create_future()
+            heapq.heappush(self._waiting, (priority, next(self._seq), job_id, waiter))
+            self._report_positions()
+        task = asyncio.create_task(self._run(job_id, coro, waiter))
+        if waiter is not None:
+            self._waiter_tasks[waiter] = task
+        # Released from a done callback: a task cancelled before its first step never runs _run
+        task.add_done_callback(lambda _: self._release(job_id, coro, waiter))
+        return task
+
+    async def _run(self, job_id: str, coro: Coroutine, waiter: asyncio.Future | None):
+        if waiter is not None:
+            await waiter
+        with job_scope(job_id):
+            return await coro
+
+    def _release(self, job_id: str, coro: Coroutine, waiter: asyncio.Future | None) -> None:
+        coro.close()  # No-op if it ran; avoids "never awaited" if it was cancelled before starting
+        self._running.discard(job_id)
+        if waiter is not None:
+            # A job cancelled while waiting leaves the queue without taking a slot
+            self._waiter_tasks.pop(waiter, None)
+            self._waiting = [entry for entry in self._waiting if entry[3] is not waiter]
+            heapq.heapify(self._waiting)
+        while self._waiting and len(self._running) < self.workers:
+            _, _, next_id, next_waiter = heapq.heappop(self._waiting)
+            task = self._waiter_tasks.pop(next_waiter, None)
+            if next_waiter.done() or (task is not None and (task.done() or task.cancelling())):
+                continue
+            self._running.add(next_id)
+            next_waiter.set_result(None)
+        self._report_positions()
@@ -0,0 +1,297 @@
+"""
+Job stores for the API.
+
+`JobStore` keeps job states in process memory. `SQLiteJobStore` persists job status in SQLite
+and spills result payloads to disk, loading them only when results are requested, so jobs
+survive API restarts. Both evict finished jobs after JOB_TTL_SECONDS, and the oldest finished
+jobs whenever their results exceed JOB_STORE_MAX_BYTES. Pending and running jobs, and the most
+recently finished job, are never evicted by size. Evicting or deleting a job also discards its
+checkpoint journal.
+"""
+import asyncio
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Literal
+
+import numpy as np
+
+from satellite_async.checkpoint import CheckpointJournal
+
+from .config import (
+    JOB_RESULTS_DIR,
+    JOB_STORE_BACKEND,
+    JOB_STORE_DB,
+    JOB_STORE_MAX_BYTES,
+    JOB_TTL_SECONDS,
+)
+
+FINISHED = ("completed", "failed")
+
+
+def estimate_size(obj) -> int:
+    """Approximate memory footprint of a results payload (NumPy arrays counted by nbytes)."""
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(estimate_size(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+def load_results(path: str) -> list[dict]:
+    """Load a spilled results payload; an evicted or missing file yields no results."""
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return []
+
+
+class JobState:
+    """Mutable state for a single job."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.status: Literal["pending", "running", "completed", "failed"] = "pending"
+        self.progress: str | None = None
+        self.created_at = datetime.utcnow()
+        self.finished_at: datetime | None = None
+        self.error: str | None = None
+        self._results: list[dict] | None = []
+        self.results_path: str | None = None
+        self.results_bytes: int = 0
+        self.total_results: int = 0
+        self.task: asyncio.Task | None = None
+
+    @property
+    def results(self) -> list[dict]:
+        """Results held in memory, or read from the spill file on each access (not cached)."""
+        if self._results is not None:
+            return self._results
+        if self.results_path:
+            return load_results(self.results_path)
+        return []
+
+    @results.setter
+    def results(self, value: list[dict]) -> None:
+        self._results = value
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+
+class JobStore:
+    """In-memory store for job states, with TTL and maximum-bytes eviction of finished jobs."""
+
+    def __init__(self, ttl_seconds: int = JOB_TTL_SECONDS, max_bytes: int = JOB_STORE_MAX_BYTES):
+        self._jobs: dict[str, JobState] = {}
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_bytes = max_bytes
+
+    def create(self, job_id: str) -> JobState:
+        self.evict()
+        state = JobState(job_id)
+        self._jobs[job_id] = state
+        return state
+
+    def get(self, job_id: str) -> JobState | None:
+        return self._jobs.get(job_id)
+
+    def set_task(self, job_id: str, task: asyncio.Task) -> None:
+        state = self._jobs.get(job_id)
+        if state:
+            state.task = task
+
+    def save(self, state: JobState) -> None:
+        """Record a status change; finished jobs get their results size accounted."""
+        if state.finished and state._results is not None:
+            state.results_bytes = estimate_size(state._results)
+        self.evict()
+
+    def remove(self, job_id: str) -> None:
+        self._jobs.pop(job_id, None)
+
+    def delete(self, job_id: str) -> None:
+        """Remove the job and its checkpoint journal (it can no longer be resumed)."""
+        self.remove(job_id)
+        CheckpointJournal(job_id).discard()
+
+    def _finished_jobs(self) -> list[tuple[str, datetime, int]]:
+        """(job_id, finished_at, results_bytes) of finished jobs."""
+        return [
+            (s.job_id, s.finished_at or s.created_at, s.results_bytes)
+            for s in self._jobs.values()
+            if s.finished
+        ]
+
+    def evict(self, now: datetime | None = None) -> list[str]:
+        """Remove expired finished jobs, then the oldest ones while over the byte budget."""
+        now = now or datetime.utcnow()
+        finished = sorted(self._finished_jobs(), key=lambda job: job[1])
+        total = sum(size for _, _, size in finished)
+        evicted = []
+        for i, (job_id, finished_at, size) in enumerate(finished):
+            expired = now - finished_at > self.ttl
+            over_budget = total > self.max_bytes and i < len(finished) - 1
+            if expired or over_budget:
+                self.delete(job_id)
+                total -= size
+                evicted.append(job_id)
+        return evicted
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    progress TEXT,
+    created_at TEXT NOT NULL,
+    finished_at TEXT,
+    error TEXT,
+    total_results INTEGER NOT NULL DEFAULT 0,
+    results_path TEXT,
+    results_bytes INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job store that survives restarts. Status is kept in SQLite and finished results are
+    pickled to JOB_RESULTS_DIR. Only pending/running jobs are held in memory (in `_jobs`);
+    finished jobs are read back from the database on `get`. Jobs that were still running
+    when the process stopped are marked failed on startup, so they can be resumed.
+    """
+
+    def __init__(
+        self,
+        path: str = JOB_STORE_DB,
+        results_dir: str = JOB_RESULTS_DIR,
+        ttl_seconds: int = JOB_TTL_SECONDS,
+        max_bytes: int = JOB_STORE_MAX_BYTES,
+    ):
+        super().__init__(ttl_seconds, max_bytes)
+        self.path = path
+        self.results_dir = results_dir
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        os.makedirs(results_dir, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(_SCHEMA)
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                "WHERE status IN ('pending', 'running')",
+                ("Interrupted by an API restart", datetime.utcnow().isoformat()),
+            )
+
+    def _write(self, state: JobState) -> None:
+        row = (
+            state.job_id,
+            state.status,
+            state.progress,
+            state.created_at.isoformat(),
+            state.finished_at.isoformat() if state.finished_at else None,
+            state.error,
+            state.total_results,
+            state.results_path,
+            state.results_bytes,
+        )
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+
+    def _spill(self, state: JobState) -> None:
+        """Write the results to disk atomically and drop them from memory."""
+        path = os.path.join(self.results_dir, f"{state.job_id}.pkl")
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state._results, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        state.results_path = path
+        state.results_bytes = os.path.getsize(path)
+        state._results = None
+
+    def create(self, job_id: str) -> JobState:
+        # Resuming a job replaces its previous row and spilled results
+        self.remove(job_id)
+        state = super().create(job_id)
+        self._write(state)
+        return state
+
+    def get(self, job_id: str) -> JobState | None:
+        state = self._jobs.get(job_id)
+        if state is not None:
+            return state
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, progress, created_at, finished_at, error, total_results, "
+                "results_path, results_bytes FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        state = JobState(job_id)
+        (
+            state.status,
+            state.progress,
+            created_at,
+            finished_at,
+            state.error,
+            state.total_results,
+            state.results_path,
+            state.results_bytes,
+        ) = row
+        state.created_at = datetime.fromisoformat(created_at)
+        state.finished_at = datetime.fromisoformat(finished_at) if finished_at else None
+        state._results = None
+        return state
+
+    def save(self, state: JobState) -> None:
+        """Persist a status change. Finished jobs are spilled to disk and leave memory."""
+        if state.finished and state._results is not None:
+            self._spill(state)
+        self._write(state)
+        if state.finished:
+            self._jobs.pop(state.job_id, None)
+        self.evict()
+
+    def remove(self, job_id: str) -> None:
+        super().remove(job_id)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT results_path FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        if row and row[0]:
+            try:
+                os.remove(row[0])
+            except FileNotFoundError:
+                pass
+
+    def _finished_jobs(self) -> list[tuple[str, datetime, int]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, COALESCE(finished_at, created_at), results_bytes FROM jobs "
+                "WHERE status IN ('completed', 'failed')"
+            ).fetchall()
+        return [(job_id, datetime.fromisoformat(ts), size) for job_id, ts, size in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_job_store(backend: str = JOB_STORE_BACKEND) -> JobStore:
+    """Job store selected with VNP46A1_JOB_STORE ("memory" or "sqlite")."""
+    if backend == "memory":
+        return JobStore()
+    if backend == "sqlite":
+        return SQLiteJobStore()
+    raise ValueError(f"Unsupported job store backend: {backend!r} (use 'memory' or 'sqlite')")
@@ -1,4 +1,5 @@
 """FastAPI application entry point for VNP46A1 Satellite API."""
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
@@ -6,11 +7,21 @@ from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
 from api.routes import router
+from satellite_async.workers import shutdown_cpu_executor
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release the CPU worker pool used for HDF5 decoding on shutdown."""
+    yield
+    shutdown_cpu_executor()
+
 
 app = FastAPI(
     title="VNP46A1 Satellite API",
     version="1.0.0",
     description="Async API for satellite image processing (VNP46A1) with background jobs.",
+    lifespan=lifespan,
 )
 app.include_router(router)
 
@@ -0,0 +1,106 @@
+"""
+Request-level memoization of job results.
+
+Measurements are memoized per (municipio, fecha) and matriz results per (municipio, fecha),
+so a /jobs range that is fully memoized completes immediately and a partially memoized range
+only computes the missing pairs. Entries are evicted LRU once their estimated size exceeds
+MEMO_MAX_BYTES (0 disables the memo).
+"""
+from collections import OrderedDict
+from datetime import date
+
+from .config import MEMO_MAX_BYTES
+from .job_store import estimate_size
+
+
+class ResultMemo:
+    """Bounded LRU memo with hit/miss counters."""
+
+    def __init__(self, max_bytes: int = MEMO_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, tuple[object, int]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.served_requests = 0
+
+    def __contains__(self, key: tuple) -> bool:
+        """Membership check that does not count as a hit or refresh the entry."""
+        return key in self._entries
+
+    def get(self, key: tuple):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: tuple, value) -> None:
+        if self.max_bytes <= 0:
+            return
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    # --- Measurements (one row per municipio and date) ---
+
+    @staticmethod
+    def medicion_key(municipio: str, fecha: date) -> tuple:
+        return ("medicion", municipio, fecha)
+
+    def covers(self, municipios: list[str], fechas: list[date]) -> bool:
+        """True if every (municipio, fecha) pair is memoized."""
+        return all(self.medicion_key(m, f) in self for f in fechas for m in municipios)
+
+    def lookup_mediciones(
+        self, municipios: list[str], fechas: list[date]
+    ) -> tuple[list[dict], dict[date, list[str]]]:
+        """Memoized rows and the missing pairs as {fecha: [municipios]}."""
+        rows, missing = [], {}
+        for fecha in fechas:
+            for municipio in municipios:
+                row = self.get(self.medicion_key(municipio, fecha))
+                if row is None:
+                    missing.setdefault(fecha, []).append(municipio)
+                else:
+                    rows.append(dict(row))
+        return rows, missing
+
+    def store_mediciones(self, rows: list[dict]) -> None:
+        for row in rows:
+            self.put(self.medicion_key(row["Municipio"], row["Fecha"]), dict(row))
+
+    # --- Matriz results ---
+
+    @staticmethod
+    def matriz_key(municipio: str, fecha: date) -> tuple:
+        return ("matriz", municipio, fecha)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "served_requests": self.served_requests,
+        }
@@ -4,24 +4,47 @@ import json
 import uuid
 from datetime import datetime, timezone, timedelta
 
-from fastapi import APIRouter, HTTPException
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
 from satellite_async.config import PIXELES_MUNICIPIOS
+from satellite_async.metrics import get_metrics
 from satellite_async.models import MedicionResultado
+from satellite_async.processing import mask_to_json, radiance_to_json
 from satellite_async.utils import normalize_municipio
 
 from .agent import get_agent, get_last_tool_results
-from .job_manager import job_store, run_job, run_matriz_job
+from .config import MATRIZ_RANGO_MAX_DIAS
+from .job_manager import (
+    BULK,
+    INTERACTIVE,
+    QueueFullError,
+    job_events,
+    job_store,
+    memo,
+    memoized_job,
+    memoized_matriz_job,
+    resume_job,
+    run_job,
+    run_matriz_job,
+    run_matriz_rango_job,
+    submit_job,
+)
 from .schemas import (
     ChatRequest,
     ChatResponse,
     JobRequest,
     JobResult,
     JobStatus,
+    MatrizRangoRequest,
+    MatrizRangoResult,
     MatrizRequest,
     MatrizResult,
+    MemoStats,
     MunicipiosResponse,
 )
+from .streaming import NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE, stream_job
 
 router = APIRouter()
 
@@ -33,6 +56,11 @@ def _get_available_municipios() -> list[str]:
     return list(data.keys())
 
 
+def _queue_full(exc: QueueFullError) -> HTTPException:
+    """429 response for a job the queue cannot admit."""
+    return HTTPException(status_code=429, detail=f"{exc}. Retry later.", headers={"Retry-After": "30"})
+
+
 def _build_fechas(fecha_inicio, fecha_fin) -> list[str]:
     """Build list of date strings dd-mm-yy from inicio to fin (inclusive)."""
     fechas = []
@@ -52,7 +80,11 @@ async def list_municipios():
 
 @router.post("/jobs", response_model=JobStatus, status_code=202)
 async def create_job(body: JobRequest):
-    """Create a new processing job. Returns immediately with job_id; poll GET /jobs/{job_id} for status."""
+    """
+    Create a new processing job. Returns immediately with job_id; poll GET /jobs/{job_id} for status.
+    Jobs wait in a queue (position shown in `progress`); returns 429 when the queue is full.
+    If every (municipio, fecha) is memoized the job is returned already completed.
+    """
     available = _get_available_municipios()
     normalized = [m.lower().strip() for m in body.municipios]
     invalid = [m for m in normalized if m not in available]
@@ -69,11 +101,14 @@ async def create_job(body: JobRequest):
         raise HTTPException(status_code=400, detail="No dates in range")
 
     job_id = str(uuid.uuid4())
-    state = job_store.create(job_id)
-    task = asyncio.create_task(
-        run_job(job_id, normalized, fechas, body.chunks)
-    )
-    job_store.set_task(job_id, task)
+    state = memoized_job(job_id, normalized, fechas)
+    if state is None:
+        try:
+            state = submit_job(
+                job_id, run_job(job_id, normalized, fechas, body.chunks, body.incremental), BULK
+            )
+        except QueueFullError as e:
+            raise _queue_full(e)
 
     return JobStatus(
         job_id=job_id,
@@ -123,9 +158,57 @@ async def get_job_results(job_id: str):
     return JobResult(job_id=job_id, results=results)
 
 
+@router.post("/jobs/{job_id}/resume", response_model=JobStatus, status_code=202)
+async def resume_job_endpoint(job_id: str):
+    """
+    Resume a failed or interrupted job (also after an API restart) from its checkpoint
+    journal. Only the dates and quadrants that did not finish are processed.
+    """
+    state = job_store.get(job_id)
+    if state and state.task and not state.task.done():
+        raise HTTPException(status_code=409, detail="Job is still running")
+    try:
+        state = resume_job(job_id)
+    except QueueFullError as e:
+        raise _queue_full(e)
+    if not state:
+        raise HTTPException(status_code=404, detail="No checkpoint found for job")
+    return JobStatus(
+        job_id=job_id,
+        status=state.status,
+        progress=state.progress,
+        created_at=state.created_at,
+        finished_at=state.finished_at,
+        error=state.error,
+        total_results=state.total_results,
+    )
+
+
+@router.get(
+    "/jobs/{job_id}/stream",
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}, SSE_MEDIA_TYPE: {}}}},
+)
+async def stream_job_results(job_id: str, request: Request):
+    """
+    Stream a job's measurements and progress as they are produced, ending with an `end` event.
+    Sends Server-Sent Events with `Accept: text/event-stream` and NDJSON lines
+    ({"event": ..., "data": ...}) otherwise. Events: `progress`, `medicion`, `end`.
+    """
+    if not job_store.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    sse = SSE_MEDIA_TYPE in request.headers.get("accept", "")
+    return StreamingResponse(
+        stream_job(job_id, job_store, job_events, sse),
+        media_type=SSE_MEDIA_TYPE if sse else NDJSON_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
 @router.delete("/jobs/{job_id}", status_code=204)
 async def cancel_job(job_id: str):
-    """Cancel a pending or running job and remove it from the store."""
+    """
+    Cancel a pending or running job and remove it and its checkpoint journal from the store.
+    """
     state = job_store.get(job_id)
     if not state:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -135,7 +218,32 @@ async def cancel_job(job_id: str):
             await state.task
         except asyncio.CancelledError:
             pass
-    job_store.remove(job_id)
+    job_store.delete(job_id)
+
+
+@router.get("/memo/stats", response_model=MemoStats)
+async def get_memo_stats():
+    """Size and hit rate of the result memo shared by /jobs, /matriz and the agent."""
+    return MemoStats(**memo.stats())
+
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_pipeline_metrics(job_id: str | None = None):
+    """
+    Stage timings and counters (downloaded bytes, cache hits, retries) in Prometheus text
+    format, for the whole process or, with `?job_id=`, for one recent job.
+    Returns 404 unless metrics are enabled with VNP46A1_METRICS=true.
+    """
+    registry = get_metrics()
+    if not registry.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (set VNP46A1_METRICS=true)")
+    text = registry.render(job_id)
+    if text is None:
+        raise HTTPException(status_code=404, detail="No metrics for this job")
+    return Response(content=text, media_type=PROMETHEUS_MEDIA_TYPE)
 
 
 # --- Matriz endpoints ---
@@ -153,9 +261,52 @@ async def create_matriz_job(body: MatrizRequest):
         )
 
     job_id = str(uuid.uuid4())
-    state = job_store.create(job_id)
-    task = asyncio.create_task(run_matriz_job(job_id, body.municipio, body.fecha))
-    job_store.set_task(job_id, task)
+    state = memoized_matriz_job(job_id, body.municipio, body.fecha)
+    if state is None:
+        try:
+            state = submit_job(job_id, run_matriz_job(job_id, body.municipio, body.fecha), INTERACTIVE)
+        except QueueFullError as e:
+            raise _queue_full(e)
+
+    return JobStatus(
+        job_id=job_id,
+        status=state.status,
+        progress=state.progress,
+        created_at=state.created_at,
+        finished_at=state.finished_at,
+        error=state.error,
+        total_results=state.total_results,
+    )
+
+
+@router.post("/matriz/rango", response_model=JobStatus, status_code=202)
+async def create_matriz_rango_job(body: MatrizRangoRequest):
+    """
+    Create a time-cube job: one radiance slice per date of the range plus one shared mask.
+    Returns immediately with job_id; poll GET /matriz/{job_id} for status.
+    """
+    if body.fecha_fin < body.fecha_inicio:
+        raise HTTPException(status_code=400, detail="fecha_fin must be >= fecha_inicio")
+    dias = (body.fecha_fin - body.fecha_inicio).days + 1
+    if dias > MATRIZ_RANGO_MAX_DIAS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range too long ({dias} days); the maximum is {MATRIZ_RANGO_MAX_DIAS}",
+        )
+    available = _get_available_municipios()
+    normalized = normalize_municipio(body.municipio)
+    if normalized not in available:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Municipio '{body.municipio}' not available. Use GET /municipios for the list.",
+        )
+
+    job_id = str(uuid.uuid4())
+    fechas = [body.fecha_inicio + timedelta(days=i) for i in range(dias)]
+    try:
+        state = submit_job(job_id, run_matriz_rango_job(job_id, body.municipio, fechas), INTERACTIVE)
+    except QueueFullError as e:
+        raise _queue_full(e)
 
     return JobStatus(
         job_id=job_id,
@@ -247,9 +398,62 @@ async def chat(body: ChatRequest):
     )
 
 
-@router.get("/matriz/{job_id}/resultado", response_model=MatrizResult)
-async def get_matriz_result(job_id: str):
-    """Get radiance matrix and municipality mask. Returns 409 if job is not yet completed."""
+MATRIZ_BINARY_MEDIA_TYPE = "application/octet-stream"
+
+
+def _wants_binary(request: Request) -> bool:
+    """True if the Accept header asks for the binary matriz format (q=0 excluded)."""
+    for part in request.headers.get("accept", "").split(","):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        if media_type.lower() != MATRIZ_BINARY_MEDIA_TYPE:
+            continue
+        return not any(p.replace(" ", "") in ("q=0", "q=0.0") for p in params)
+    return False
+
+
+def _as_float32(matrix) -> np.ndarray:
+    """Radiance matrix as float32; JSON-style lists (None for NaN) are accepted too."""
+    if isinstance(matrix, np.ndarray):
+        return matrix.astype(np.float32, copy=False)
+    values = np.array(matrix, dtype=object)
+    values[values == None] = np.nan  # noqa: E711 (element-wise comparison)
+    return values.astype(np.float32)
+
+
+def _matriz_binary_response(result: dict, job_id: str) -> Response:
+    """
+    Binary matriz payload: the radiance matrix as row-major float32 little-endian
+    (NaN marks no-data, instead of per-element nulls) followed by the municipality mask
+    packed 8 pixels per byte (np.packbits, MSB first). Shape and metadata go in headers.
+    """
+    radiance = _as_float32(result["radiance_matrix"])
+    mask = np.asarray(result["municipality_mask"], dtype=bool)
+    rows, cols = radiance.shape if radiance.ndim == 2 else (0, 0)
+    radiance_bytes = radiance.astype("<f4", copy=False).tobytes(order="C")
+    mask_bytes = np.packbits(mask.ravel()).tobytes()
+    fecha = result.get("fecha")
+    headers = {
+        "X-Job-Id": job_id,
+        "X-Municipio": str(result.get("municipio", "")),
+        "X-Fecha": fecha.isoformat() if hasattr(fecha, "isoformat") else str(fecha),
+        "X-Bbox": json.dumps(result.get("bbox", {})),
+        "X-Rows": str(rows),
+        "X-Cols": str(cols),
+        "X-Radiance-Dtype": "<f4",
+        "X-Radiance-Bytes": str(len(radiance_bytes)),
+        "X-Mask-Encoding": "packbits-msb",
+        "X-Mask-Bytes": str(len(mask_bytes)),
+        "X-Nan-Policy": "nan",
+    }
+    return Response(
+        content=radiance_bytes + mask_bytes,
+        media_type=MATRIZ_BINARY_MEDIA_TYPE,
+        headers=headers,
+    )
+
+
+def _finished_matriz_result(job_id: str) -> dict:
+    """Result of a completed matriz job; 404/409/500 otherwise."""
     state = job_store.get(job_id)
     if not state:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -263,6 +467,96 @@ async def get_matriz_result(job_id: str):
             status_code=409,
             detail=f"Job failed: {state.error or 'Unknown error'}",
         )
-    if not state.results:
+    results = state.results
+    if not results:
         raise HTTPException(status_code=500, detail="No result data")
-    return MatrizResult.model_validate(state.results[0])
+    return results[0]
+
+
+def _cube_binary_response(result: dict, job_id: str) -> StreamingResponse:
+    """
+    Binary time cube, streamed in chunks: one row-major float32 little-endian slice per
+    date (NaN marks no-data and dates without a granule), then the shared municipality mask
+    packed 8 pixels per byte (np.packbits, MSB first). Shape and metadata go in headers.
+    """
+    cube = np.asarray(result["radiance_cube"], dtype="<f4")
+    mask = np.asarray(result["municipality_mask"], dtype=bool)
+    times, rows, cols = cube.shape
+    mask_bytes = np.packbits(mask.ravel()).tobytes()
+    fechas = [f.isoformat() if hasattr(f, "isoformat") else str(f) for f in result.get("fechas", [])]
+
+    def chunks():
+        for t in range(times):
+            yield cube[t].tobytes(order="C")
+        yield mask_bytes
+
+    headers = {
+        "X-Job-Id": job_id,
+        "X-Municipio": str(result.get("municipio", "")),
+        "X-Fecha-Inicio": fechas[0] if fechas else "",
+        "X-Fecha-Fin": fechas[-1] if fechas else "",
+        "X-Available": "".join("1" if a else "0" for a in result.get("available", [])),
+        "X-Bbox": json.dumps(result.get("bbox", {})),
+        "X-Times": str(times),
+        "X-Rows": str(rows),
+        "X-Cols": str(cols),
+        "X-Radiance-Dtype": "<f4",
+        "X-Frame-Bytes": str(rows * cols * 4),
+        "X-Radiance-Bytes": str(times * rows * cols * 4),
+        "X-Mask-Encoding": "packbits-msb",
+        "X-Mask-Bytes": str(len(mask_bytes)),
+        "X-Nan-Policy": "nan",
+    }
+    return StreamingResponse(chunks(), media_type=MATRIZ_BINARY_MEDIA_TYPE, headers=headers)
+
+
+@router.get(
+    "/matriz/rango/{job_id}/resultado",
+    response_model=MatrizRangoResult,
+    responses={200: {"content": {MATRIZ_BINARY_MEDIA_TYPE: {}}}},
+)
+async def get_matriz_rango_result(job_id: str, request: Request):
+    """
+    Get the radiance cube and shared municipality mask of a /matriz/rango job.
+    Send `Accept: application/octet-stream` for the chunked binary format (see README);
+    JSON is returned otherwise.
+    """
+    result = _finished_matriz_result(job_id)
+    if "radiance_cube" not in result:
+        raise HTTPException(status_code=404, detail="Not a /matriz/rango job; use GET /matriz/{job_id}/resultado")
+    if _wants_binary(request):
+        return _cube_binary_response(result, job_id)
+    return MatrizRangoResult.model_validate(
+        {
+            **result,
+            "radiance_cube": radiance_to_json(result["radiance_cube"]),
+            "municipality_mask": mask_to_json(result["municipality_mask"]),
+        }
+    )
+
+
+@router.get(
+    "/matriz/{job_id}/resultado",
+    response_model=MatrizResult,
+    responses={200: {"content": {MATRIZ_BINARY_MEDIA_TYPE: {}}}},
+)
+async def get_matriz_result(job_id: str, request: Request):
+    """
+    Get radiance matrix and municipality mask. Returns 409 if job is not yet completed.
+    Send `Accept: application/octet-stream` for the compact binary format (see README);
+    JSON is returned otherwise.
+    """
+    result = _finished_matriz_result(job_id)
+    if "radiance_matrix" not in result:
+        raise HTTPException(
+            status_code=404, detail="Not a /matriz job; use GET /matriz/rango/{job_id}/resultado"
+        )
+    if _wants_binary(request):
+        return _matriz_binary_response(result, job_id)
+    return MatrizResult.model_validate(
+        {
+            **result,
+            "radiance_matrix": radiance_to_json(result["radiance_matrix"]),
+            "municipality_mask": mask_to_json(result["municipality_mask"]),
+        }
+    )
@@ -14,6 +14,10 @@ class JobRequest(BaseModel):
     fecha_inicio: date = Field(..., description="Start date (inclusive)")
     fecha_fin: date = Field(..., description="End date (inclusive)")
     chunks: int | None = Field(None, description="Optional chunk size for processing dates in batches")
+    incremental: bool = Field(
+        False,
+        description="Reuse results already computed for the same municipio, date and algorithm version",
+    )
 
 
 class JobStatus(BaseModel):
@@ -45,6 +49,19 @@ class MunicipiosResponse(BaseModel):
     municipios: list[str] = Field(..., description="Available municipality names")
 
 
+class MemoStats(BaseModel):
+    """Response for GET /memo/stats."""
+
+    entries: int = Field(..., description="Memoized results")
+    bytes: int = Field(..., description="Estimated size of the memoized results")
+    max_bytes: int = Field(..., description="Memo budget in bytes (0 = disabled)")
+    hits: int = Field(..., description="(municipio, fecha) lookups answered from the memo")
+    misses: int = Field(..., description="(municipio, fecha) lookups that had to be computed")
+    hit_rate: float = Field(..., description="hits / (hits + misses)")
+    evictions: int = Field(..., description="Entries evicted to stay within max_bytes")
+    served_requests: int = Field(..., description="Requests answered entirely from the memo")
+
+
 class MatrizRequest(BaseModel):
     """Body for POST /matriz."""
 
@@ -78,6 +95,32 @@ class MatrizResult(BaseModel):
     )
 
 
+class MatrizRangoRequest(BaseModel):
+    """Body for POST /matriz/rango."""
+
+    municipio: str = Field(..., description="Municipality name")
+    fecha_inicio: date = Field(..., description="Start date (inclusive)")
+    fecha_fin: date = Field(..., description="End date (inclusive)")
+
+
+class MatrizRangoResult(BaseModel):
+    """Response for GET /matriz/rango/{job_id}/resultado (JSON form)."""
+
+    job_id: str = Field(..., description="Job identifier")
+    municipio: str = Field(..., description="Municipality name")
+    fechas: list[date] = Field(..., description="Date of each time slice, in order")
+    available: list[bool] = Field(..., description="Whether a granule was found for each date")
+    bbox: BboxSchema = Field(..., description="Bounding box in the original tile")
+    rows: int = Field(..., description="Number of rows of each slice and of the mask")
+    cols: int = Field(..., description="Number of columns of each slice and of the mask")
+    radiance_cube: list[list[list[float | None]]] = Field(
+        ..., description="Radiance values indexed [time][row][col]; NaN/Inf and missing dates as null"
+    )
+    municipality_mask: list[list[int]] = Field(
+        ..., description="Binary mask shared by every slice: 1=municipality pixel, 0=otherwise"
+    )
+
+
 class ChatRequest(BaseModel):
     """Body for POST /chat."""
 
@@ -0,0 +1,94 @@
+"""Streaming of job events (measurements and progress) as NDJSON or Server-Sent Events."""
+import asyncio
+import json
+from typing import AsyncIterator
+
+from satellite_async.models import MedicionResultado
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+KEEPALIVE_SECONDS = 15.0
+
+
+class JobEvents:
+    """Fan-out of job events to the clients streaming each job."""
+
+    def __init__(self):
+        self._queues: dict[str, set[asyncio.Queue]] = {}
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        queues = self._queues.get(job_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._queues[job_id]
+
+    def has_subscribers(self, job_id: str) -> bool:
+        return bool(self._queues.get(job_id))
+
+    def publish(self, job_id: str, event: str, data: dict) -> None:
+        for queue in self._queues.get(job_id, ()):
+            queue.put_nowait((event, data))
+
+
+def medicion_event(row: dict) -> tuple[str, dict]:
+    return "medicion", MedicionResultado.model_validate(row).model_dump(mode="json")
+
+
+def status_event(state, event: str = "progress") -> tuple[str, dict]:
+    return event, {
+        "status": state.status,
+        "progress": state.progress,
+        "error": state.error,
+        "total_results": state.total_results,
+    }
+
+
+def format_event(event: str, data: dict, sse: bool) -> str:
+    """One SSE message (`event:` + `data:`) or one NDJSON line ({"event", "data"})."""
+    if sse:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, "data": data}) + "\n"
+
+
+async def stream_job(job_id: str, job_store, events: JobEvents, sse: bool) -> AsyncIterator[str]:
+    """
+    Events of a job: its current status, the measurements produced so far and then each new
+    measurement and progress update as it happens, ending with an `end` event.
+    """
+    queue = events.subscribe(job_id)
+    try:
+        state = job_store.get(job_id)
+        if state is None:
+            return
+        # Snapshot before the first yield: later records arrive through the queue
+        snapshot = list(state.results)
+        finished = state.finished
+        yield format_event(*status_event(state), sse)
+        for row in snapshot:
+            yield format_event(*medicion_event(row), sse)
+        if finished:
+            yield format_event(*status_event(state, "end"), sse)
+            return
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                current = job_store.get(job_id)
+                if current is None or current.finished or (current.task and current.task.done()):
+                    # Removed or cancelled before it could report its end
+                    yield format_event(*status_event(current or state, "end"), sse)
+                    return
+                if sse:
+                    yield ": keepalive\n\n"
+                continue
+            yield format_event(event, data, sse)
+            if event == "end":
+                return
+    finally:
+        events.unsubscribe(job_id, queue)
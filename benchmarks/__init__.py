@@ -0,0 +1 @@
+"""Benchmarks con gránulos VNP46A1 sintéticos y un sustituto local de LAADS (ver run.py)."""
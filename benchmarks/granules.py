@@ -0,0 +1,140 @@
+"""
+Gránulos VNP46A1 sintéticos para los benchmarks.
+
+Cada archivo tiene la misma estructura que uno real de LAADS: el dataset
+`HDFEOS/GRIDS/VNP_Grid_DNB/Data Fields/DNB_At_Sensor_Radiance_500m` (2400x2400, por
+chunks y comprimido), capas auxiliares en el mismo grupo y `HDFEOS INFORMATION/StructMetadata.0`
+con las esquinas del cuadrante en el formato que leen `left_right_coords` y `recortar_imagen`.
+La radianza es un fondo log-normal con manchas urbanas brillantes, generada con una semilla
+por (año, día, cuadrante) para que cada ejecución produzca los mismos archivos.
+"""
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+
+import h5py
+import numpy as np
+
+from satellite_async.config import IMAGE_PATH, TILE_SIZE
+
+# Capas auxiliares (nombre, dtype) que acompañan a la radianza en un gránulo real
+CAPAS_AUXILIARES = (
+    ("QF_Cloud_Mask", np.uint16),
+    ("QF_DNB", np.uint16),
+    ("Moon_Illumination_Fraction", np.int16),
+    ("Sensor_Zenith", np.int16),
+    ("Solar_Zenith", np.int16),
+    ("Lunar_Zenith", np.int16),
+)
+
+_CUADRANTE_RE = re.compile(r"h(\d{2})v(\d{2})")
+
+
+@dataclass
+class GranuloSintetico:
+    """Gránulo generado: nombre con el formato de LAADS, ruta, tamaño y md5."""
+
+    year: int
+    day: int
+    cuadrante: str
+    filename: str
+    path: str
+    size: int
+    md5: str
+
+
+def esquinas_cuadrante(cuadrante: str) -> tuple[tuple[float, float], tuple[float, float]]:
+    """(lon, lat) de las esquinas superior izquierda e inferior derecha de un cuadrante de 10°."""
+    match = _CUADRANTE_RE.fullmatch(cuadrante)
+    if match is None:
+        raise ValueError(f"Cuadrante inválido: {cuadrante!r} (se espera hXXvYY)")
+    h, v = int(match.group(1)), int(match.group(2))
+    lon, lat = -180 + 10 * h, 90 - 10 * v
+    return (lon, lat), (lon + 10, lat - 10)
+
+
+def struct_metadata(cuadrante: str, size: int) -> str:
+    """StructMetadata.0 (ODL) con las esquinas en grados empaquetados como en HDF-EOS (x 1e6)."""
+    (x0, y0), (x1, y1) = esquinas_cuadrante(cuadrante)
+    return (
+        "GROUP=SwathStructure\nEND_GROUP=SwathStructure\n"
+        "GROUP=GridStructure\n"
+        "\tGROUP=GRID_1\n"
+        '\t\tGridName="VNP_Grid_DNB"\n'
+        f"\t\tXDim={size}\n"
+        f"\t\tYDim={size}\n"
+        f"\t\tUpperLeftPointMtrs=({x0 * 1_000_000:.6f},{y0 * 1_000_000:.6f})\n"
+        f"\t\tLowerRightMtrs=({x1 * 1_000_000:.6f},{y1 * 1_000_000:.6f})\n"
+        "\t\tProjection=HE5_GCTP_GEO\n"
+        "\t\tGridOrigin=HE5_HDFE_GD_UL\n"
+        "\tEND_GROUP=GRID_1\n"
+        "END_GROUP=GridStructure\n"
+        "END\n"
+    )
+
+
+def radianza_sintetica(rng: np.random.Generator, size: int, manchas: int = 40) -> np.ndarray:
+    """Fondo log-normal con manchas gaussianas brillantes (zonas urbanas) y algunos NaN."""
+    radianza = rng.lognormal(mean=0.0, sigma=0.6, size=(size, size)).astype(np.float32)
+    ys, xs = np.ogrid[:size, :size]
+    for _ in range(manchas):
+        cy, cx = rng.integers(0, size, 2)
+        radio = rng.uniform(size / 400, size / 60)
+        brillo = rng.uniform(20, 200)
+        y0, y1 = max(int(cy - 4 * radio), 0), min(int(cy + 4 * radio) + 1, size)
+        x0, x1 = max(int(cx - 4 * radio), 0), min(int(cx + 4 * radio) + 1, size)
+        d2 = (ys[y0:y1] - cy) ** 2 + (xs[:, x0:x1] - cx) ** 2
+        radianza[y0:y1, x0:x1] += (brillo * np.exp(-d2 / (2 * radio**2))).astype(np.float32)
+    radianza.ravel()[rng.integers(0, size * size, size)] = np.nan
+    return radianza
+
+
+def nombre_granulo(year: int, day: int, cuadrante: str) -> str:
+    return f"VNP46A1.A{year}{day:03d}.{cuadrante}.001.{year}{day:03d}000000.h5"
+
+
+def generar_granulo(
+    directorio: str,
+    year: int,
+    day: int,
+    cuadrante: str = "h08v07",
+    size: int = TILE_SIZE,
+    chunks: int = 240,
+    compression: str | None = "gzip",
+    compression_level: int = 4,
+    capas_auxiliares: int = len(CAPAS_AUXILIARES),
+) -> GranuloSintetico:
+    """Escribe un gránulo sintético en `directorio` (si no existe ya) y devuelve sus datos."""
+    os.makedirs(directorio, exist_ok=True)
+    filename = nombre_granulo(year, day, cuadrante)
+    path = os.path.join(directorio, filename)
+    if not os.path.exists(path):
+        semilla = int(hashlib.md5(f"{year}{day}{cuadrante}".encode()).hexdigest()[:8], 16)
+        rng = np.random.default_rng(semilla)
+        opciones = {"chunks": (min(chunks, size), min(chunks, size))}
+        if compression:
+            opciones["compression"] = compression
+            if compression == "gzip":
+                opciones["compression_opts"] = compression_level
+            opciones["shuffle"] = True
+        tmp_path = f"{path}.tmp"
+        with h5py.File(tmp_path, "w") as f:
+            f.create_dataset(IMAGE_PATH, data=radianza_sintetica(rng, size), **opciones)
+            campos = f[IMAGE_PATH].parent
+            for nombre, dtype in CAPAS_AUXILIARES[:capas_auxiliares]:
+                info = np.iinfo(dtype)
+                datos = rng.integers(max(info.min, -18000), min(info.max, 18000), (size, size), dtype=dtype)
+                campos.create_dataset(nombre, data=datos, **opciones)
+            metadata = struct_metadata(cuadrante, size)
+            f.create_dataset(
+                "HDFEOS INFORMATION/StructMetadata.0",
+                data=np.array(metadata, dtype=f"S{len(metadata) + 1}"),
+            )
+        os.replace(tmp_path, path)
+
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            md5.update(bloque)
+    return GranuloSintetico(year, day, cuadrante, filename, path, os.path.getsize(path), md5.hexdigest())
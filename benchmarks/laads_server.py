@@ -0,0 +1,200 @@
+"""
+Sustituto local de LAADS para los benchmarks.
+
+Sirve los gránulos sintéticos con las mismas rutas que LAADS:
+
+- `GET /archive/allData/5200/VNP46A1/{year}/{day}/`: listado HTML del día (solo nombres).
+- `GET /archive/allData/5200/VNP46A1/{year}/{day}.json`: listado JSON (con `size` y `md5sum`);
+  con `formato_listado="html"` responde 404, como un archivo sin listados JSON.
+- `GET /archive/allData/5200/VNP46A1/{year}/{day}/{archivo}`: redirección 302 a `/files/{archivo}`,
+  como hace LAADS hacia su servidor de descargas.
+- `GET /files/{archivo}`: el archivo, con soporte de `Range` (206) para reanudar y segmentar.
+
+Cada petición espera `latencia` segundos antes de responder y los cuerpos se envían a
+`ancho_banda` bytes/s como máximo (None = sin límite). El servidor corre en su propio hilo con
+su propio event loop, así que lo pueden usar tanto el código síncrono como el asíncrono.
+"""
+import asyncio
+import threading
+import time
+
+from aiohttp import web
+
+from satellite_async.config import COLLECTION
+
+from .granules import GranuloSintetico
+
+BLOQUE = 64 * 1024
+
+
+class LaadsStandIn:
+    """Servidor HTTP local que imita el archivo de LAADS para un conjunto de gránulos."""
+
+    def __init__(
+        self,
+        granulos: list[GranuloSintetico],
+        latencia: float = 0.0,
+        ancho_banda: float | None = None,
+        formato_listado: str = "json",
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        if formato_listado not in ("json", "html"):
+            raise ValueError(f"Formato de listado no soportado: {formato_listado!r} (usa 'json' o 'html')")
+        self.latencia = latencia
+        self.ancho_banda = ancho_banda
+        self.formato_listado = formato_listado
+        self.host = host
+        self.port = port
+        self._por_dia: dict[tuple[int, int], list[GranuloSintetico]] = {}
+        self._por_nombre: dict[str, GranuloSintetico] = {}
+        for granulo in granulos:
+            self._por_dia.setdefault((granulo.year, granulo.day), []).append(granulo)
+            self._por_nombre[granulo.filename] = granulo
+        self.peticiones = 0
+        self.bytes_enviados = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._runner: web.AppRunner | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """URL para VNP46A1_LAADS_URL."""
+        return f"http://{self.host}:{self.port}"
+
+    def _app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        prefijo = f"/archive/allData/{COLLECTION}/VNP46A1"
+        app.router.add_get(prefijo + "/{year}/{day}.json", self._listado_json)
+        app.router.add_get(prefijo + "/{year}/{day}/", self._listado)
+        app.router.add_get(prefijo + "/{year}/{day}/{archivo}", self._redireccion)
+        app.router.add_get("/files/{archivo}", self._archivo)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        self.peticiones += 1
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        return await handler(request)
+
+    def _granulos_del_dia(self, request: web.Request) -> list[GranuloSintetico]:
+        try:
+            clave = (int(request.match_info["year"]), int(request.match_info["day"]))
+        except ValueError:
+            raise web.HTTPNotFound()
+        granulos = self._por_dia.get(clave)
+        if granulos is None:
+            raise web.HTTPNotFound()
+        return granulos
+
+    async def _listado_json(self, request: web.Request) -> web.Response:
+        granulos = self._granulos_del_dia(request)
+        if self.formato_listado != "json":
+            raise web.HTTPNotFound()
+        contenido = [{"name": g.filename, "size": g.size, "md5sum": g.md5} for g in granulos]
+        return web.json_response({"content": contenido})
+
+    async def _listado(self, request: web.Request) -> web.Response:
+        granulos = self._granulos_del_dia(request)
+        enlaces = "\n".join(f'<a href="{g.filename}">{g.filename}</a>' for g in granulos)
+        return web.Response(text=f"<!DOCTYPE html>\n<html><body>\n{enlaces}\n</body></html>", content_type="text/html")
+
+    async def _redireccion(self, request: web.Request) -> web.Response:
+        if request.match_info["archivo"] not in self._por_nombre:
+            raise web.HTTPNotFound()
+        raise web.HTTPFound(f"/files/{request.match_info['archivo']}")
+
+    async def _archivo(self, request: web.Request) -> web.StreamResponse:
+        granulo = self._por_nombre.get(request.match_info["archivo"])
+        if granulo is None:
+            raise web.HTTPNotFound()
+        inicio, fin = 0, granulo.size - 1
+        status = 200
+        rango = request.http_range
+        if request.headers.get("Range"):
+            inicio = rango.start or 0
+            if inicio < 0:
+                inicio = max(granulo.size + inicio, 0)
+            fin = (rango.stop - 1) if rango.stop is not None else granulo.size - 1
+            if inicio >= granulo.size:
+                raise web.HTTPRequestRangeNotSatisfiable(headers={"Content-Range": f"bytes */{granulo.size}"})
+            fin = min(fin, granulo.size - 1)
+            status = 206
+        response = web.StreamResponse(status=status)
+        response.content_length = fin - inicio + 1
+        response.content_type = "application/x-hdf5"
+        response.headers["Accept-Ranges"] = "bytes"
+        if status == 206:
+            response.headers["Content-Range"] = f"bytes {inicio}-{fin}/{granulo.size}"
+        await response.prepare(request)
+
+        enviados = 0
+        comienzo = time.perf_counter()
+        with open(granulo.path, "rb") as f:
+            f.seek(inicio)
+            pendientes = fin - inicio + 1
+            while pendientes > 0:
+                bloque = f.read(min(BLOQUE, pendientes))
+                if not bloque:
+                    break
+                await response.write(bloque)
+                pendientes -= len(bloque)
+                enviados += len(bloque)
+                self.bytes_enviados += len(bloque)
+                if self.ancho_banda:
+                    # Dormir lo necesario para no superar el ancho de banda configurado
+                    adelanto = enviados / self.ancho_banda - (time.perf_counter() - comienzo)
+                    if adelanto > 0:
+                        await asyncio.sleep(adelanto)
+        await response.write_eof()
+        return response
+
+    async def _arrancar(self) -> None:
+        self._runner = web.AppRunner(self._app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    def start(self) -> "LaadsStandIn":
+        """Arranca el servidor en un hilo y espera a que acepte conexiones."""
+        listo = threading.Event()
+        errores: list[BaseException] = []
+
+        def _run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self._arrancar())
+            except BaseException as e:
+                errores.append(e)
+                listo.set()
+                return
+            listo.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._runner.cleanup())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=_run, name="laads-stand-in", daemon=True)
+        self._thread.start()
+        listo.wait()
+        if errores:
+            raise errores[0]
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "LaadsStandIn":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def stats(self) -> dict:
+        return {"peticiones": self.peticiones, "bytes_enviados": self.bytes_enviados}
+
@@ -0,0 +1,224 @@
+"""
+Harness de benchmarks: genera gránulos sintéticos, levanta el sustituto local de LAADS y corre
+los escenarios sync, async, api y micro, cada uno en un proceso nuevo con caché vacía.
+
+Reporta fechas/s, MB/s, percentiles de latencia, pico de RSS y segundos por etapa, y puede
+guardar el resultado como baseline o compararlo contra uno guardado:
+
+    python -m benchmarks.run --fechas 4 --latencia 0.05 --ancho-banda 50
+    python -m benchmarks.run --save-baseline main
+    python -m benchmarks.run --baseline main --tolerancia 0.2
+
+Con `--baseline` el proceso termina con código 1 si alguna métrica empeora más que la tolerancia.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+from .granules import generar_granulo
+from .laads_server import LaadsStandIn
+from .scenarios import PATHS
+
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (métrica, True si mayor es mejor)
+METRICAS_COMPARADAS = (
+    ("fechas_por_s", True),
+    ("mb_por_s", True),
+    ("latencia_s.p50", False),
+    ("latencia_s.p90", False),
+    ("rss_pico_mb", False),
+)
+
+
+def _valor(resultado: dict, metrica: str):
+    for parte in metrica.split("."):
+        if not isinstance(resultado, dict):
+            return None
+        resultado = resultado.get(parte)
+    return resultado
+
+
+def _entorno(directorio: str, laads_url: str) -> dict[str, str]:
+    """Variables de entorno de un escenario: LAADS local y caché, índices y resultados vacíos."""
+    env = dict(os.environ)
+    env.update(
+        {
+            "VNP46A1_LAADS_URL": laads_url,
+            "VNP46A1_CACHE_DIR": os.path.join(directorio, "cache"),
+            "VNP46A1_LISTING_INDEX": os.path.join(directorio, "laads_listing.jsonl"),
+            "VNP46A1_RESULTS_DB": os.path.join(directorio, "resultados.sqlite"),
+            "VNP46A1_RESULTS_DATASET": os.path.join(directorio, "mediciones"),
+            "VNP46A1_CHECKPOINT_DIR": os.path.join(directorio, "checkpoints"),
+            "VNP46A1_JOB_STORE": "memory",
+            "VNP46A1_METRICS": "true",
+            "PYTHONPATH": os.pathsep.join(filter(None, [PROJECT_ROOT, env.get("PYTHONPATH")])),
+        }
+    )
+    return env
+
+
+def correr_escenario(path: str, params: dict, laads_url: str) -> dict:
+    """Corre un escenario en un proceso nuevo y devuelve su resultado."""
+    with tempfile.TemporaryDirectory(prefix=f"vnp46a1-bench-{path}-") as directorio:
+        salida = os.path.join(directorio, "resultado.json")
+        proceso = subprocess.run(
+            [sys.executable, "-m", "benchmarks.scenarios", path, "--params", json.dumps(params), "--output", salida],
+            cwd=PROJECT_ROOT,
+            env=_entorno(directorio, laads_url),
+            capture_output=True,
+            text=True,
+        )
+        if proceso.returncode != 0 or not os.path.exists(salida):
+            return {"error": (proceso.stderr or proceso.stdout).strip().splitlines()[-20:]}
+        with open(salida, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def _formato(valor, decimales: int = 3) -> str:
+    return "-" if valor is None else f"{valor:.{decimales}f}"
+
+
+def imprimir_reporte(resultados: dict[str, dict]) -> None:
+    encabezado = f"{'ruta':<6} {'fechas/s':>9} {'MB/s':>8} {'p50 s':>8} {'p90 s':>8} {'p99 s':>8} {'RSS MB':>8}"
+    print(encabezado)
+    print("-" * len(encabezado))
+    for path, r in resultados.items():
+        if "error" in r:
+            print(f"{path:<6} ERROR: {r['error'][-1] if r['error'] else 'sin salida'}")
+            continue
+        lat = r["latencia_s"]
+        print(
+            f"{path:<6} {_formato(r['fechas_por_s'], 2):>9} {_formato(r['mb_por_s'], 1):>8} "
+            f"{_formato(lat['p50']):>8} {_formato(lat['p90']):>8} {_formato(lat['p99']):>8} "
+            f"{_formato(r['rss_pico_mb'], 0):>8}"
+        )
+    for path, r in resultados.items():
+        etapas = r.get("etapas_s") or {}
+        if etapas:
+            detalle = ", ".join(f"{k}={v:.3f}" for k, v in sorted(etapas.items(), key=lambda kv: -kv[1]))
+            print(f"  {path} etapas (s): {detalle}")
+        for funcion, lat in (r.get("funciones_s") or {}).items():
+            print(f"  {path} {funcion}: p50={_formato(lat['p50'], 4)} s, p90={_formato(lat['p90'], 4)} s")
+
+
+def comparar(resultados: dict[str, dict], baseline: dict[str, dict], tolerancia: float) -> list[str]:
+    """Métricas que empeoraron más que `tolerancia` (fracción) respecto al baseline."""
+    regresiones = []
+    print(f"\nComparación contra baseline (tolerancia {tolerancia:.0%}):")
+    for path, r in resultados.items():
+        base = baseline.get(path)
+        if not base or "error" in r or "error" in base:
+            continue
+        for metrica, mayor_es_mejor in METRICAS_COMPARADAS:
+            actual, anterior = _valor(r, metrica), _valor(base, metrica)
+            if not actual or not anterior:
+                continue
+            cambio = actual / anterior - 1
+            empeora = -cambio if mayor_es_mejor else cambio
+            marca = "REGRESIÓN" if empeora > tolerancia else ""
+            print(f"  {path:<6} {metrica:<15} {anterior:>10.3f} -> {actual:>10.3f} ({cambio:+.1%}) {marca}")
+            if marca:
+                regresiones.append(f"{path}.{metrica}")
+    return regresiones
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paths", default=",".join(PATHS), help="Escenarios a correr (coma)")
+    parser.add_argument("--municipios", default="iztapalapa,azcapotzalco", help="Municipios (coma)")
+    parser.add_argument("--cuadrante", default="h08v07")
+    parser.add_argument("--fecha-inicio", default="2024-01-01")
+    parser.add_argument("--fechas", type=int, default=4, help="Número de fechas (un gránulo por fecha)")
+    parser.add_argument("--size", type=int, default=2400, help="Píxeles por lado de los gránulos")
+    parser.add_argument("--chunks", type=int, default=240, help="Tamaño de chunk HDF5")
+    parser.add_argument("--compression", default="gzip", help="Compresión HDF5 ('none' para desactivar)")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Latencia por petición del servidor (s)")
+    parser.add_argument("--ancho-banda", type=float, default=None, help="Ancho de banda del servidor (MB/s)")
+    parser.add_argument("--listado", choices=("json", "html"), default="json", help="'html' desactiva los listados .json")
+    parser.add_argument("--repeticiones", type=int, default=20, help="Repeticiones del escenario micro")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "vnp46a1-bench"),
+                        help="Directorio de los gránulos sintéticos (se reutilizan entre ejecuciones)")
+    parser.add_argument("--save-baseline", metavar="NOMBRE", help="Guardar el resultado en baselines/NOMBRE.json")
+    parser.add_argument("--baseline", metavar="NOMBRE", help="Comparar contra baselines/NOMBRE.json")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Empeoramiento permitido (fracción)")
+    args = parser.parse_args(argv)
+
+    paths = [p.strip() for p in args.paths.split(",") if p.strip()]
+    desconocidos = set(paths) - set(PATHS)
+    if desconocidos:
+        parser.error(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+
+    inicio = date.fromisoformat(args.fecha_inicio)
+    compression = None if args.compression.lower() == "none" else args.compression
+    directorio_granulos = os.path.join(
+        args.workdir, f"{args.cuadrante}-{args.size}-{args.chunks}-{compression or 'raw'}"
+    )
+    print(f"Generando {args.fechas} gránulos sintéticos en {directorio_granulos}...")
+    granulos = []
+    for i in range(args.fechas):
+        dia = inicio + timedelta(days=i)
+        granulos.append(
+            generar_granulo(
+                directorio_granulos,
+                dia.year,
+                dia.timetuple().tm_yday,
+                args.cuadrante,
+                size=args.size,
+                chunks=args.chunks,
+                compression=compression,
+            )
+        )
+
+    params = {
+        "municipios": [m.strip() for m in args.municipios.split(",") if m.strip()],
+        "cuadrante": args.cuadrante,
+        "fecha_inicio": args.fecha_inicio,
+        "fechas": args.fechas,
+        "granulo": granulos[0].path,
+        "repeticiones": args.repeticiones,
+    }
+    ancho_banda = args.ancho_banda * 1024**2 if args.ancho_banda else None
+    resultados = {}
+    with LaadsStandIn(granulos, args.latencia, ancho_banda, args.listado) as servidor:
+        for path in paths:
+            print(f"Corriendo escenario {path}...")
+            resultados[path] = correr_escenario(path, params, servidor.base_url)
+    print()
+    imprimir_reporte(resultados)
+
+    if args.save_baseline:
+        os.makedirs(BASELINES_DIR, exist_ok=True)
+        destino = os.path.join(BASELINES_DIR, f"{args.save_baseline}.json")
+        with open(destino, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "creado": datetime.now().isoformat(timespec="seconds"),
+                    "plataforma": platform.platform(),
+                    "python": platform.python_version(),
+                    "argumentos": vars(args),
+                    "resultados": resultados,
+                },
+                f,
+                indent=2,
+            )
+        print(f"\nBaseline guardado en {destino}")
+
+    if args.baseline:
+        with open(os.path.join(BASELINES_DIR, f"{args.baseline}.json"), encoding="utf-8") as f:
+            baseline = json.load(f)["resultados"]
+        regresiones = comparar(resultados, baseline, args.tolerancia)
+        if regresiones:
+            print(f"\nRegresiones: {', '.join(regresiones)}")
+            return 1
+    return 1 if any("error" in r for r in resultados.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Escenarios de benchmark. Cada uno corre en su propio proceso (lo lanza `benchmarks.run`) para
+que el pico de RSS sea solo suyo y la configuración (VNP46A1_LAADS_URL, caché, etc.) se lea de
+las variables de entorno antes de importar los paquetes.
+
+    python -m benchmarks.scenarios {sync,async,api,micro} --params '{...}' --output resultado.json
+"""
+import argparse
+import asyncio
+import json
+import resource
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+PATHS = ("sync", "async", "api", "micro")
+
+
+def rss_pico_mb() -> float:
+    """Pico de memoria residente del proceso (ru_maxrss está en KB en Linux y en bytes en macOS)."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024**2 if sys.platform == "darwin" else maxrss / 1024
+
+
+def percentiles(latencias: list[float]) -> dict[str, float | None]:
+    if not latencias:
+        return {"p50": None, "p90": None, "p99": None}
+    p50, p90, p99 = np.percentile(latencias, [50, 90, 99])
+    return {"p50": float(p50), "p90": float(p90), "p99": float(p99)}
+
+
+def _metricas_pipeline() -> tuple[float, dict[str, float]]:
+    """Bytes descargados y segundos acumulados por etapa (satellite_async.metrics)."""
+    from satellite_async.metrics import get_metrics
+
+    registry = get_metrics()
+    return registry.counter("download_bytes_total"), registry.stage_seconds()
+
+
+def _resumen(fechas: int, mediciones: int, segundos: float, latencias: list[float]) -> dict:
+    descargados, etapas = _metricas_pipeline()
+    return {
+        "fechas": fechas,
+        "mediciones": mediciones,
+        "segundos": segundos,
+        "fechas_por_s": fechas / segundos if segundos else None,
+        "mb_por_s": descargados / 1024**2 / segundos if segundos else None,
+        "mb_descargados": descargados / 1024**2,
+        "latencia_s": percentiles(latencias),
+        "rss_pico_mb": rss_pico_mb(),
+        "etapas_s": etapas,
+    }
+
+
+def _fechas(params: dict) -> list[date]:
+    inicio = date.fromisoformat(params["fecha_inicio"])
+    return [inicio + timedelta(days=i) for i in range(params["fechas"])]
+
+
+def bench_sync(params: dict) -> dict:
+    """SatelliteProcessor.get_measures por municipio y fecha (latencia = una medición)."""
+    from satellite_sync import SatelliteProcessor
+
+    fechas = [f.strftime("%d-%m-%y") for f in _fechas(params)]
+    latencias, mediciones = [], 0
+    inicio = time.perf_counter()
+    for municipio in params["municipios"]:
+        processor = SatelliteProcessor(municipio)
+        for fecha in fechas:
+            t0 = time.perf_counter()
+            if processor.get_measures(fecha, params["cuadrante"], show_plots=False):
+                mediciones += 1
+            latencias.append(time.perf_counter() - t0)
+    return _resumen(len(fechas), mediciones, time.perf_counter() - inicio, latencias)
+
+
+async def _bench_async(params: dict) -> dict:
+    from satellite_async.satellite_async import SatelliteImagesAsync
+
+    fechas = [f.strftime("%d-%m-%y") for f in _fechas(params)]
+    sat = SatelliteImagesAsync(params["municipios"])
+    latencias, mediciones = [], 0
+    inicio = time.perf_counter()
+    async for lote in sat.iter_measures(fechas):
+        # Todas las fechas se programan al inicio: la latencia es el tiempo hasta su lote
+        latencias.append(time.perf_counter() - inicio)
+        mediciones += len(lote.filas)
+    return _resumen(len(fechas), mediciones, time.perf_counter() - inicio, latencias)
+
+
+def bench_async(params: dict) -> dict:
+    """SatelliteImagesAsync.iter_measures sobre todas las fechas (latencia = hasta cada lote)."""
+    return asyncio.run(_bench_async(params))
+
+
+async def _esperar_job(client, ruta: str) -> dict:
+    while True:
+        estado = (await client.get(ruta)).json()
+        if estado["status"] in ("completed", "failed"):
+            return estado
+        await asyncio.sleep(0.02)
+
+
+async def _bench_api(params: dict) -> dict:
+    import httpx
+
+    from api.main import app
+
+    fechas = _fechas(params)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        # Throughput: un job /jobs con todos los municipios y fechas
+        inicio = time.perf_counter()
+        resp = await client.post(
+            "/jobs",
+            json={
+                "municipios": params["municipios"],
+                "fecha_inicio": fechas[0].isoformat(),
+                "fecha_fin": fechas[-1].isoformat(),
+            },
+        )
+        resp.raise_for_status()
+        job_id = resp.json()["job_id"]
+        estado = await _esperar_job(client, f"/jobs/{job_id}")
+        segundos = time.perf_counter() - inicio
+        if estado["status"] != "completed":
+            raise RuntimeError(f"El job {job_id} falló: {estado.get('error')}")
+        mediciones = len((await client.get(f"/jobs/{job_id}/results")).json()["results"])
+
+        # Latencia: /matriz de punta a punta (alta, espera y resultado binario) por fecha
+        latencias = []
+        for fecha in fechas:
+            t0 = time.perf_counter()
+            resp = await client.post("/matriz", json={"municipio": params["municipios"][0], "fecha": fecha.isoformat()})
+            resp.raise_for_status()
+            matriz_id = resp.json()["job_id"]
+            await _esperar_job(client, f"/matriz/{matriz_id}")
+            resultado = await client.get(
+                f"/matriz/{matriz_id}/resultado", headers={"Accept": "application/octet-stream"}
+            )
+            resultado.raise_for_status()
+            latencias.append(time.perf_counter() - t0)
+    return _resumen(len(fechas), mediciones, segundos, latencias)
+
+
+def bench_api(params: dict) -> dict:
+    """POST /jobs para el throughput y POST /matriz por fecha para la latencia."""
+    return asyncio.run(_bench_api(params))
+
+
+def _poligono_circular(radio: int, centro: int) -> list[tuple[int, int]]:
+    angulos = np.linspace(0, 2 * np.pi, 8 * radio, endpoint=False)
+    puntos = zip(np.rint(centro + radio * np.cos(angulos)), np.rint(centro + radio * np.sin(angulos)))
+    return list(dict.fromkeys((int(x), int(y)) for x, y in puntos))
+
+
+def bench_micro(params: dict) -> dict:
+    """
+    Funciones CPU sobre un gránulo ya local: process_image y measure_granule (async) y
+    get_pixeles (sync), `repeticiones` veces cada una. La latencia es la de process_image.
+    """
+    from satellite_async.processing import process_image
+    from satellite_async.utils import load_coord_data
+    from satellite_async.config import PIXELES_MUNICIPIOS
+    from satellite_async.zonal import build_label_rasters, measure_granule
+    from satellite_sync.image_processor import get_pixeles
+
+    path = params["granulo"]
+    repeticiones = params.get("repeticiones", 20)
+    coord_data = {m: load_coord_data(m, PIXELES_MUNICIPIOS) for m in params["municipios"]}
+    rasters = build_label_rasters(coord_data)
+    dia = _fechas(params)[0]
+
+    def medir(func) -> list[float]:
+        tiempos = []
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            func()
+            tiempos.append(time.perf_counter() - t0)
+        return tiempos
+
+    municipio, coords = next(iter(coord_data.items()))
+    tiempos_process = medir(
+        lambda: process_image(path, list(coords.coordenadas_pixeles), dia, municipio, delete_file=False)
+    )
+    tiempos_zonal = medir(lambda: [measure_granule(path, r, dia) for r in rasters.values()])
+    imagen = np.zeros((64, 64), dtype=np.float32)
+    bordes = _poligono_circular(20, 32)
+    tiempos_pixeles = medir(lambda: get_pixeles(imagen, (32, 32), bordes))
+
+    resumen = _resumen(repeticiones, repeticiones, sum(tiempos_process), tiempos_process)
+    resumen["funciones_s"] = {
+        "process_image": percentiles(tiempos_process),
+        "measure_granule": percentiles(tiempos_zonal),
+        "get_pixeles": percentiles(tiempos_pixeles),
+    }
+    return resumen
+
+
+BENCHMARKS = {"sync": bench_sync, "async": bench_async, "api": bench_api, "micro": bench_micro}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", choices=PATHS)
+    parser.add_argument("--params", required=True, help="Parámetros del escenario en JSON")
+    parser.add_argument("--output", required=True, help="Archivo JSON donde escribir el resultado")
+    args = parser.parse_args(argv)
+    resultado = BENCHMARKS[args.path](json.loads(args.params))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
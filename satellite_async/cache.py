@@ -0,0 +1,220 @@
+"""Caché persistente en disco de gránulos VNP46A1, compartida por sync, async y la API."""
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+
+from .config import CACHE_DIR, CACHE_MAX_BYTES, COLLECTION
+from .metrics import inc
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin flock, cada descarga usa una ruta única
+    fcntl = None
+
+
+class GranuleCache:
+    """
+    Caché de archivos HDF5 indexada por (año, día del año, cuadrante, colección).
+
+    - Escrituras atómicas: cada descarga va a un archivo temporal dentro del directorio
+      de la caché y se publica con `os.replace`.
+    - Presupuesto en bytes con desalojo LRU: el mtime de cada archivo marca su último uso.
+    - Contadores de aciertos, fallos y desalojos (ver `stats`).
+    - Conteo de referencias: un gránulo fijado con `pin` (o `get(..., pin=True)`) no se
+      desaloja hasta que cada lector llama a `unpin`.
+    """
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._pins: dict[str, int] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def key(year, day, cuadrante: str, collection: str = COLLECTION) -> tuple[int, int, str, str]:
+        """Normaliza la llave del gránulo (el día puede venir como int o como '001')."""
+        return int(year), int(day), cuadrante, str(collection)
+
+    def path_for(self, key: tuple[int, int, str, str]) -> str:
+        """Ruta final del gránulo dentro de la caché."""
+        year, day, cuadrante, collection = key
+        return os.path.join(self.root, f"VNP46A1.{collection}.A{year}{day:03d}.{cuadrante}.h5")
+
+    def get(self, key: tuple[int, int, str, str], pin: bool = False) -> str | None:
+        """
+        Devuelve la ruta del gránulo si está en la caché (y lo marca como recién usado).
+        Con `pin=True` además lo fija; el llamador debe liberarlo con `unpin`.
+        """
+        path = self.path_for(key)
+        with self._lock:
+            try:
+                os.utime(path)
+            except OSError:
+                self.misses += 1
+                inc("cache_misses_total")
+                return None
+            self.hits += 1
+            if pin:
+                self._pin_locked(path)
+        inc("cache_hits_total")
+        return path
+
+    def _pin_locked(self, path: str) -> None:
+        path = os.path.abspath(path)
+        self._pins[path] = self._pins.get(path, 0) + 1
+
+    def pin(self, path: str) -> bool:
+        """Fija un gránulo publicado para que no se desaloje. Devuelve False si ya no existe."""
+        with self._lock:
+            if not os.path.exists(path):
+                return False
+            self._pin_locked(path)
+            return True
+
+    def unpin(self, path: str | None) -> None:
+        """Libera una referencia tomada con `pin` o `get(..., pin=True)`."""
+        if not path:
+            return
+        path = os.path.abspath(path)
+        with self._lock:
+            count = self._pins.get(path, 0) - 1
+            if count > 0:
+                self._pins[path] = count
+            else:
+                self._pins.pop(path, None)
+
+    @contextmanager
+    def leased(self, path: str | None):
+        """Contexto que libera al salir un gránulo ya fijado."""
+        try:
+            yield path
+        finally:
+            self.unpin(path)
+
+    def temp_path(self, key: tuple[int, int, str, str]) -> str:
+        """Ruta temporal única para descargar el gránulo antes de publicarlo con `put`."""
+        name = os.path.basename(self.path_for(key))
+        return os.path.join(self.root, f".{name}.{uuid.uuid4().hex}.tmp")
+
+    def staging_path(self, key: tuple[int, int, str, str]) -> str:
+        """
+        Ruta fija de descarga del gránulo dentro de la caché. A diferencia de `temp_path` no
+        cambia entre ejecuciones, así que el `.part` de una descarga interrumpida se reanuda.
+        """
+        name = os.path.basename(self.path_for(key))
+        return os.path.join(self.root, f".{name}.download")
+
+    @contextmanager
+    def claim_staging(self, key: tuple[int, int, str, str]):
+        """
+        Reserva una ruta de descarga para el gránulo. Quien obtiene el candado exclusivo
+        (`flock` sobre `staging_path + '.lock'`, que el sistema libera si el proceso muere) recibe
+        `staging_path` y puede reanudar su `.part`; si otro proceso o hilo ya lo tiene, se
+        recibe una ruta única (`temp_path`) cuyos restos (`.part`, `.seg`) se eliminan al salir.
+        """
+        staging = self.staging_path(key)
+        lock_file = None
+        if fcntl is not None:
+            lock_file = open(staging + ".lock", "a")
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                lock_file = None
+        path = staging if lock_file is not None else self.temp_path(key)
+        try:
+            yield path
+        finally:
+            if lock_file is not None:
+                lock_file.close()  # Cerrar el descriptor libera el flock
+            else:
+                self.discard(path + ".part")
+                self.discard(path + ".seg")
+                self.discard(path)
+
+    def put(self, key: tuple[int, int, str, str], src_path: str) -> str:
+        """
+        Publica `src_path` como el gránulo `key` de forma atómica y aplica el presupuesto.
+        Si `src_path` está fuera de la caché se copia (el original no se toca).
+        """
+        final_path = self.path_for(key)
+        if os.path.dirname(os.path.abspath(src_path)) != os.path.abspath(self.root):
+            tmp_path = self.temp_path(key)
+            shutil.copyfile(src_path, tmp_path)
+            src_path = tmp_path
+        os.replace(src_path, final_path)
+        self.evict(keep=final_path)
+        return final_path
+
+    def discard(self, path: str | None) -> None:
+        """Elimina un archivo temporal de una descarga fallida."""
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Error eliminando archivo temporal {path}: {e}")
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.name.startswith(".") or not entry.name.endswith(".h5"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def size_bytes(self) -> int:
+        """Bytes ocupados por los gránulos publicados."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, keep: str | None = None) -> None:
+        """Elimina los gránulos menos usados recientemente hasta respetar `max_bytes`."""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                if keep and os.path.abspath(path) == os.path.abspath(keep):
+                    continue
+                if self._pins.get(os.path.abspath(path)):
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.evictions += 1
+                print(f"Gránulo desalojado de la caché: {path}")
+
+    def stats(self) -> dict:
+        """Contadores de la caché."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "pinned": len(self._pins),
+            "size_bytes": self.size_bytes(),
+            "max_bytes": self.max_bytes,
+        }
+
+
+_default_cache: GranuleCache | None = None
+
+
+def get_granule_cache() -> GranuleCache:
+    """Instancia de la caché compartida por el proceso."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = GranuleCache()
+    return _default_cache
@@ -0,0 +1,132 @@
+"""
+Bitácora de checkpoints para reanudar ejecuciones largas.
+
+Cada ejecución con `job_id` escribe un archivo JSONL en VNP46A1_CHECKPOINT_DIR: una primera línea
+con los parámetros (municipios, fechas, chunks, incremental) y después una línea por cambio de
+estado de cada unidad (fecha, cuadrante): `en_curso`, `completada` (con sus filas y los municipios
+medidos) o `fallida`.
+Cada línea se escribe con `fsync`, así que tras una caída del proceso la bitácora indica qué
+unidades faltan; una línea truncada al final se ignora al leer.
+"""
+import json
+import os
+from datetime import datetime, timezone
+
+from .config import CHECKPOINT_DIR
+
+EN_CURSO = "en_curso"
+COMPLETADA = "completada"
+FALLIDA = "fallida"
+
+_checkpoint_dir = CHECKPOINT_DIR
+
+
+class JournalState:
+    """Estado reconstruido de una bitácora: parámetros y último estado de cada unidad."""
+
+    def __init__(self, params: dict):
+        self.params = params
+        self.estados: dict[tuple[str, str], str] = {}
+        self.filas: dict[tuple[str, str], list[dict]] = {}
+        # Municipios medidos en cada unidad completada (None: todos los del cuadrante)
+        self.medidos: dict[tuple[str, str], set[str] | None] = {}
+        self.errores: dict[tuple[str, str], str] = {}
+
+    def completed(self, fecha: str, cuadrante: str) -> bool:
+        return self.estados.get((fecha, cuadrante)) == COMPLETADA
+
+    def measured(self, fecha: str, cuadrante: str) -> set[str] | None:
+        """Municipios medidos en una unidad completada (None si se midieron todos los del cuadrante)."""
+        return self.medidos.get((fecha, cuadrante))
+
+    def counts(self) -> dict[str, int]:
+        """Número de unidades en cada estado (las `en_curso` quedaron interrumpidas)."""
+        counts = {EN_CURSO: 0, COMPLETADA: 0, FALLIDA: 0}
+        for estado in self.estados.values():
+            counts[estado] += 1
+        return counts
+
+
+class CheckpointJournal:
+    """Bitácora de una ejecución identificada por `job_id`."""
+
+    def __init__(self, job_id: str, directory: str | None = None):
+        self.job_id = job_id
+        self.directory = directory or _checkpoint_dir
+        self.path = os.path.join(self.directory, f"{job_id}.jsonl")
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _append(self, record: dict) -> None:
+        record["ts"] = datetime.now(timezone.utc).isoformat()
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def begin(self, params: dict) -> None:
+        """Crea la bitácora con los parámetros de la ejecución (si ya existe no la toca)."""
+        if not self.exists():
+            self._append({"tipo": "job", "job_id": self.job_id, **params})
+
+    def running(self, fecha: str, cuadrante: str) -> None:
+        self._append({"tipo": "unidad", "fecha": fecha, "cuadrante": cuadrante, "estado": EN_CURSO})
+
+    def done(self, fecha: str, cuadrante: str, rows: list[dict], municipios: list[str] | None = None) -> None:
+        """Unidad completada con sus filas y los municipios medidos (None: todos los del cuadrante)."""
+        record = {"tipo": "unidad", "fecha": fecha, "cuadrante": cuadrante, "estado": COMPLETADA, "filas": rows}
+        if municipios is not None:
+            record["municipios"] = list(municipios)
+        self._append(record)
+
+    def failed(self, fecha: str, cuadrante: str, error: str) -> None:
+        self._append(
+            {"tipo": "unidad", "fecha": fecha, "cuadrante": cuadrante, "estado": FALLIDA, "error": error}
+        )
+
+    def load(self) -> JournalState | None:
+        """
+        Estado de la bitácora, o None si no existe. Gana la última línea de cada unidad, pero las
+        filas de varias `completada` (reanudaciones que midieron otros municipios) se suman.
+        """
+        if not self.exists():
+            return None
+        state = None
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Línea a medio escribir cuando el proceso se detuvo
+                    continue
+                tipo = record.pop("tipo", None)
+                if tipo == "job":
+                    record.pop("ts", None)
+                    record.pop("job_id", None)
+                    state = JournalState(record)
+                elif tipo == "unidad" and state is not None:
+                    key = (record["fecha"], record["cuadrante"])
+                    state.estados[key] = record["estado"]
+                    if record["estado"] == COMPLETADA:
+                        filas = record.get("filas") or []
+                        medidos = set(record["municipios"]) if "municipios" in record else None
+                        if key in state.filas:
+                            por_municipio = {f.get("Municipio"): f for f in state.filas[key]}
+                            por_municipio.update({f.get("Municipio"): f for f in filas})
+                            filas = list(por_municipio.values())
+                            anteriores = state.medidos.get(key)
+                            medidos = None if anteriores is None or medidos is None else anteriores | medidos
+                        state.filas[key] = filas
+                        state.medidos[key] = medidos
+                    elif record["estado"] == FALLIDA:
+                        state.errores[key] = record.get("error") or ""
+        return state
+
+    def discard(self) -> None:
+        """Elimina la bitácora."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
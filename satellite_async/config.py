@@ -4,8 +4,13 @@ from importlib import resources
 
 load_dotenv()
 
-BASE_URL = "https://ladsweb.modaps.eosdis.nasa.gov/archive/allData/5200/VNP46A1/{year}/{day}/"
+COLLECTION = "5200"
+# Servidor de LAADS (se puede apuntar a un sustituto local, p. ej. el de benchmarks/)
+LAADS_URL = os.getenv("VNP46A1_LAADS_URL", "https://ladsweb.modaps.eosdis.nasa.gov").rstrip("/")
+BASE_URL = LAADS_URL + "/archive/allData/" + COLLECTION + "/VNP46A1/{year}/{day}/"
 IMAGE_PATH = "HDFEOS/GRIDS/VNP_Grid_DNB/Data Fields/DNB_At_Sensor_Radiance_500m"
+# Píxeles por lado de un cuadrante VNP46A1
+TILE_SIZE = 2400
 
 
 def find_image_path(hdf_file) -> str:
@@ -48,4 +53,45 @@ def find_image_path(hdf_file) -> str:
 _DATA_ROOT = resources.files("vnp46a1_data")
 PIXELES_MUNICIPIOS = str(_DATA_ROOT.joinpath("municipios_coordenadas_pixeles.json"))
 TOKEN = os.getenv("NASA_API_TOKEN")
-HEADERS = {"Authorization": f"Bearer {TOKEN}"} if TOKEN else {}
\ No newline at end of file
+HEADERS = {"Authorization": f"Bearer {TOKEN}"} if TOKEN else {}
+
+# Caché persistente de gránulos (compartida por sync, async y la API)
+CACHE_DIR = os.getenv("VNP46A1_CACHE_DIR", "../cache")
+CACHE_MAX_BYTES = int(os.getenv("VNP46A1_CACHE_MAX_BYTES", str(20 * 1024**3)))
+LISTING_INDEX_PATH = os.getenv("VNP46A1_LISTING_INDEX", os.path.join(CACHE_DIR, "laads_listing.jsonl"))
+# Tiempo durante el que un cuadrante ausente del listado de un día no se vuelve a consultar
+LISTING_MISS_TTL_SECONDS = int(os.getenv("VNP46A1_LISTING_MISS_TTL", str(24 * 3600)))
+
+# Resultados ya calculados (ejecuciones incrementales). Cambiar ALGORITHM_VERSION cuando cambie
+# la forma de calcular las estadísticas para que los resultados anteriores se recalculen.
+RESULTS_DB_PATH = os.getenv("VNP46A1_RESULTS_DB", os.path.join(CACHE_DIR, "resultados.sqlite"))
+ALGORITHM_VERSION = "zonal-1"
+
+# Dataset Parquet particionado (municipio=/year=/) donde `run` agrega los resultados por chunk
+RESULTS_DATASET_DIR = os.getenv("VNP46A1_RESULTS_DATASET", "../data/mediciones")
+RESULTS_FLUSH_ROWS = int(os.getenv("VNP46A1_RESULTS_FLUSH_ROWS", "500"))
+
+# Bitácoras de checkpoint (una por job_id) para reanudar ejecuciones interrumpidas
+CHECKPOINT_DIR = os.getenv("VNP46A1_CHECKPOINT_DIR", os.path.join(CACHE_DIR, "checkpoints"))
+
+# Concurrencia del pipeline asíncrono
+MAX_DOWNLOADS = int(os.getenv("VNP46A1_MAX_DOWNLOADS", "4"))
+MAX_PROCESSING = int(os.getenv("VNP46A1_MAX_PROCESSING", "2"))
+LIMIT_PER_HOST = int(os.getenv("VNP46A1_LIMIT_PER_HOST", "4"))
+
+# Descargas: buffer de lectura y descarga segmentada en N rangos (1 = un solo stream)
+DOWNLOAD_BUFFER_SIZE = int(os.getenv("VNP46A1_DOWNLOAD_BUFFER_SIZE", str(256 * 1024)))
+DOWNLOAD_SEGMENTS = int(os.getenv("VNP46A1_DOWNLOAD_SEGMENTS", "1"))
+SEGMENT_MIN_BYTES = int(os.getenv("VNP46A1_SEGMENT_MIN_BYTES", str(16 * 1024**2)))
+
+# /matriz y el agente: procesar el gránulo descargado en memoria, sin escribirlo en disco
+IN_MEMORY_GRANULES = os.getenv("VNP46A1_IN_MEMORY", "false").strip().lower() in ("1", "true", "yes")
+
+# Executor para las etapas CPU ("thread" o "process")
+CPU_EXECUTOR = os.getenv("VNP46A1_CPU_EXECUTOR", "thread")
+CPU_WORKERS = int(os.getenv("VNP46A1_CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+CPU_MAX_PENDING = int(os.getenv("VNP46A1_CPU_MAX_PENDING", str(2 * CPU_WORKERS)))
+
+# Métricas por etapa y contadores (endpoint /metrics de la API); apagadas no cuestan nada
+METRICS_ENABLED = os.getenv("VNP46A1_METRICS", "false").strip().lower() in ("1", "true", "yes")
+METRICS_MAX_JOBS = int(os.getenv("VNP46A1_METRICS_MAX_JOBS", "100"))
@@ -0,0 +1,103 @@
+"""
+Cubo de radianza (fecha, filas, columnas) de un municipio para un rango de fechas.
+
+Todas las fechas comparten una sola sesión HTTP, una sola resolución de listados de LAADS y
+el mismo bounding box y máscara (calculados una vez a partir de las coordenadas). Las descargas
+corren en paralelo (acotadas por `max_downloads`) y, conforme llega cada gránulo, solo su
+ventana se lee en el executor CPU y se copia en su posición de un arreglo float32 reservado de
+antemano. Las fechas sin gránulo quedan en NaN.
+"""
+import asyncio
+from datetime import date
+from typing import Any, Callable
+
+import aiohttp
+import numpy as np
+
+from .cache import get_granule_cache
+from .config import IN_MEMORY_GRANULES, LIMIT_PER_HOST, MAX_DOWNLOADS, PIXELES_MUNICIPIOS
+from .downloader import fetch_granule, fetch_granule_source, find_files
+from .processing import municipality_window, read_radiance_window
+from .utils import load_coord_data, normalize_municipio, parse_date
+from .workers import run_cpu
+
+
+async def build_radiance_cube(
+    municipio: str,
+    fechas: list[date],
+    in_memory: bool = IN_MEMORY_GRANULES,
+    max_downloads: int = MAX_DOWNLOADS,
+    limit_per_host: int = LIMIT_PER_HOST,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> dict[str, Any] | None:
+    """
+    Construye el cubo de radianza del municipio para `fechas` (en ese orden).
+    Devuelve dict con municipio, fechas, bbox, rows, cols, radiance_cube (float32 de forma
+    (len(fechas), rows, cols), NaN donde no hay dato), municipality_mask (uint8, compartida)
+    y available (una bandera por fecha). Devuelve None si el municipio no tiene píxeles válidos.
+    `on_progress(terminadas, total)` se llama cada vez que termina una fecha.
+    """
+    municipio_norm = normalize_municipio(municipio)
+    coord_data = load_coord_data(municipio_norm, PIXELES_MUNICIPIOS)
+    cuadrante = coord_data.cuadrante
+    window = municipality_window(list(coord_data.coordenadas_pixeles))
+    if window is None:
+        print(f"No se encontraron coordenadas válidas para {municipio_norm}")
+        return None
+    bbox, mask = window
+    rows, cols = mask.shape
+
+    cube = np.full((len(fechas), rows, cols), np.nan, dtype=np.float32)
+    available = np.zeros(len(fechas), dtype=bool)
+    dias = [parse_date(f.strftime("%d-%m-%y"))[:2] for f in fechas]
+    semaphore = asyncio.Semaphore(max_downloads)
+    terminadas = 0
+
+    async def _fill(t: int, session) -> None:
+        nonlocal terminadas
+        year, day = dias[t]
+        try:
+            async with semaphore:
+                if in_memory:
+                    source = await fetch_granule_source(session, year, day, cuadrante)
+                else:
+                    source = await fetch_granule(session, year, day, cuadrante, pin=True)
+            if not source:
+                return
+            try:
+                ventana = await run_cpu(read_radiance_window, source, bbox)
+            finally:
+                if isinstance(source, str):
+                    get_granule_cache().unpin(source)
+            if ventana is not None and ventana.size:
+                h, w = ventana.shape
+                cube[t, :h, :w] = ventana
+                available[t] = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Error obteniendo {year}-{day} ({cuadrante}) para el cubo: {e}")
+        finally:
+            terminadas += 1
+            if on_progress is not None:
+                on_progress(terminadas, len(fechas))
+
+    connector = aiohttp.TCPConnector(limit_per_host=limit_per_host)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        try:
+            await find_files(session, dias, cuadrante)
+        except Exception as e:
+            # Si falla, cada fecha vuelve a intentar su listado individualmente
+            print(f"⚠️ Error precargando listados para {cuadrante}: {e}")
+        await asyncio.gather(*(_fill(t, session) for t in range(len(fechas))))
+
+    return {
+        "municipio": municipio_norm,
+        "fechas": list(fechas),
+        "bbox": bbox,
+        "rows": rows,
+        "cols": cols,
+        "radiance_cube": cube,
+        "municipality_mask": mask,
+        "available": available.tolist(),
+    }
@@ -0,0 +1,179 @@
+"""
+Dataset Parquet particionado (estilo Hive: `municipio=<nombre>/year=<año>/`) con los resultados.
+
+Cada `append` escribe archivos nuevos solo con las filas recibidas (el costo es proporcional al
+chunk, no al total acumulado). Cada fila lleva la marca de tiempo de su escritura
+(`escrito_ns`) para que, si una fecha se agregó más de una vez, gane siempre la más reciente sin
+depender del orden de los archivos. `compact` une los archivos de cada partición en uno solo y es
+una operación explícita. `read_results` filtra por partición, así que solo lee los archivos de
+los municipios y años pedidos.
+"""
+import glob
+import os
+import shutil
+import time
+import uuid
+from datetime import date
+from urllib.parse import unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .config import RESULTS_DATASET_DIR
+from .metrics import timed_stage
+from .models import MedicionResultado
+
+_ARROW_TYPES = {
+    date: pa.date32(),
+    int: pa.int64(),
+    float: pa.float64(),
+    str: pa.string(),
+}
+
+PARTITION_SCHEMA = pa.schema([("municipio", pa.string()), ("year", pa.int32())])
+_DEDUP_KEYS = ["Municipio", "Fecha"]
+WRITE_STAMP = pa.field("escrito_ns", pa.int64())
+
+
+def schema_from_model(model=MedicionResultado) -> pa.Schema:
+    """Esquema Arrow con un campo por atributo del modelo Pydantic."""
+    return pa.schema(
+        [
+            pa.field(name, _ARROW_TYPES[field.annotation], nullable=not field.is_required())
+            for name, field in model.model_fields.items()
+        ]
+    )
+
+
+MEDICIONES_SCHEMA = schema_from_model(MedicionResultado)
+
+
+def _partitioning() -> ds.Partitioning:
+    return ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+
+
+def _latest(df: pd.DataFrame) -> pd.DataFrame:
+    """Una fila por (municipio, fecha): la de la escritura más reciente (sin marca cuenta como la más antigua)."""
+    orden = df[WRITE_STAMP.name].fillna(0).sort_values(kind="stable").index
+    return df.loc[orden].drop_duplicates(_DEDUP_KEYS, keep="last")
+
+
+class ResultsDatasetWriter:
+    """Agrega filas de `MedicionResultado` al dataset particionado, sin reescribir lo anterior."""
+
+    def __init__(self, root: str = RESULTS_DATASET_DIR, model=MedicionResultado):
+        self.root = root
+        self.model = model
+        self.schema = schema_from_model(model)
+
+    def _to_table(self, rows: list[dict]) -> pa.Table:
+        records = [self.model.model_validate(row).model_dump() for row in rows]
+        table = pa.Table.from_pylist(records, schema=self.schema)
+        table = table.append_column(WRITE_STAMP, pa.array([time.time_ns()] * len(records), pa.int64()))
+        table = table.append_column("municipio", pa.array([r["Municipio"] for r in records], pa.string()))
+        return table.append_column("year", pa.array([r["Fecha"].year for r in records], pa.int32()))
+
+    @timed_stage("serialization")
+    def append(self, rows: list[dict]) -> list[str]:
+        """
+        Escribe las filas como archivos nuevos en sus particiones y devuelve sus rutas.
+        Los archivos se generan en un directorio temporal y se mueven con `os.replace`, así un
+        lector nunca ve un archivo Parquet a medio escribir.
+        """
+        if not rows:
+            return []
+        staging = os.path.join(self.root, f".staging-{uuid.uuid4().hex}")
+        written = []
+        try:
+            ds.write_dataset(
+                self._to_table(rows),
+                staging,
+                format="parquet",
+                partitioning=_partitioning(),
+                basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                file_visitor=lambda f: written.append(f.path),
+            )
+            final_paths = []
+            for path in written:
+                final_path = os.path.join(self.root, os.path.relpath(path, staging))
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(path, final_path)
+                final_paths.append(final_path)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        print(f"✅ {len(rows)} registros agregados al dataset {self.root} ({len(final_paths)} archivos)")
+        return final_paths
+
+
+def _partition_dirs(root: str, municipios: list[str] | None = None) -> list[str]:
+    pattern = os.path.join(root, "municipio=*", "year=*")
+    dirs = sorted(d for d in glob.glob(pattern) if os.path.isdir(d))
+    if municipios is not None:
+        # pyarrow codifica los valores de partición como URI ("cuajimalpa de morelos" -> "cuajimalpa%20de%20morelos")
+        wanted = set(municipios)
+        dirs = [d for d in dirs if unquote(os.path.basename(os.path.dirname(d)).partition("=")[2]) in wanted]
+    return dirs
+
+
+def compact(root: str = RESULTS_DATASET_DIR, municipios: list[str] | None = None, model=MedicionResultado) -> int:
+    """
+    Une los archivos de cada partición en uno solo, ordenado por fecha y sin duplicados
+    (si una fecha se agregó más de una vez gana la escritura más reciente).
+    Devuelve el número de particiones compactadas.
+    """
+    schema = schema_from_model(model).append(WRITE_STAMP)
+    compactadas = 0
+    for partition in _partition_dirs(root, municipios):
+        files = sorted(glob.glob(os.path.join(partition, "*.parquet")))
+        if len(files) < 2:
+            continue
+        # Los archivos escritos antes de la marca de tiempo la leen como nula
+        df = ds.dataset(files, schema=schema, format="parquet").to_table().to_pandas()
+        df = _latest(df).sort_values("Fecha", ignore_index=True)
+        tmp_path = os.path.join(partition, f".compact-{uuid.uuid4().hex}.tmp")
+        pq.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False), tmp_path)
+        os.replace(tmp_path, os.path.join(partition, f"compacted-{uuid.uuid4().hex}-0.parquet"))
+        for f in files:
+            os.remove(f)
+        compactadas += 1
+    print(f"Compactadas {compactadas} particiones en {root}")
+    return compactadas
+
+
+def read_results(
+    root: str = RESULTS_DATASET_DIR,
+    municipios: list[str] | None = None,
+    fecha_inicio: date | None = None,
+    fecha_fin: date | None = None,
+    model=MedicionResultado,
+) -> pd.DataFrame:
+    """
+    Lee el dataset filtrando por municipio y rango de fechas. Los filtros sobre `municipio` y
+    `year` podan particiones completas antes de abrir archivos.
+    """
+    schema = schema_from_model(model)
+    if not _partition_dirs(root):
+        return pd.DataFrame(columns=schema.names)
+
+    dataset = ds.dataset(
+        root,
+        schema=pa.unify_schemas([schema, pa.schema([WRITE_STAMP]), PARTITION_SCHEMA]),
+        format="parquet",
+        partitioning=_partitioning(),
+    )
+    condiciones = []
+    if municipios is not None:
+        condiciones.append(ds.field("municipio").isin(list(municipios)))
+    if fecha_inicio is not None:
+        condiciones += [ds.field("year") >= fecha_inicio.year, ds.field("Fecha") >= fecha_inicio]
+    if fecha_fin is not None:
+        condiciones += [ds.field("year") <= fecha_fin.year, ds.field("Fecha") <= fecha_fin]
+    filtro = None
+    for condicion in condiciones:
+        filtro = condicion if filtro is None else filtro & condicion
+
+    df = dataset.to_table(columns=schema.names + [WRITE_STAMP.name], filter=filtro).to_pandas()
+    df = _latest(df).drop(columns=WRITE_STAMP.name)
+    return df.sort_values(_DEDUP_KEYS, ignore_index=True)
@@ -1,123 +1,599 @@
 import os
+import re
+import weakref
+from contextlib import asynccontextmanager
+from typing import Callable
 from urllib.parse import urljoin
 
 import aiohttp
 import asyncio
-from bs4 import BeautifulSoup
 
-from .config import BASE_URL, HEADERS
+from .cache import GranuleCache, get_granule_cache
+from .config import BASE_URL, DOWNLOAD_BUFFER_SIZE, DOWNLOAD_SEGMENTS, HEADERS, SEGMENT_MIN_BYTES
+from .integrity import content_length, verify_bytes, verify_file
+from .listing import ListingIndex, get_listing_index, json_listing_url, parse_listing
+from .metrics import inc, timed
 
-async def find_file(session, year, day, cuadrante):
-    url = BASE_URL.format(year=year, day=day)
+HDF5_SIGNATURE = b"\x89HDF\r\n\x1a\n"
+
+
+class SingleFlight:
+    """
+    Registro de operaciones en curso: las llamadas concurrentes con la misma llave esperan una
+    sola ejecución y comparten su resultado. El registro es por event loop, porque una tarea
+    de asyncio no puede esperarse desde otro loop.
+    """
+
+    def __init__(self):
+        self._calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+    def in_flight(self) -> int:
+        """Número de operaciones en curso en el loop actual."""
+        return len(self._calls.get(asyncio.get_running_loop(), {}))
+
+    async def do(self, key, coro_factory):
+        """
+        Ejecuta `coro_factory()` si no hay otra ejecución con `key` en curso; si la hay, espera
+        la existente. La tarea compartida se protege con `shield`: cancelar a uno de los
+        llamadores no cancela la descarga de los demás.
+        """
+        calls = self._calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_factory())
+            calls[key] = task
+            task.add_done_callback(lambda _: calls.pop(key, None))
+        return await asyncio.shield(task)
+
+
+_in_flight = SingleFlight()
+
+
+async def _get_text(session, url) -> str | None:
     async with session.get(url, headers=HEADERS) as resp:
         if resp.status != 200:
+            return None
+        return await resp.text()
+
+
+async def fetch_listing(session, year, day) -> list[dict] | None:
+    """
+    Descarga y parsea el listado de LAADS de un día (sin consultar el índice). Pide primero el
+    listado JSON (`.../{day}.json`), el único que trae tamaño y md5 para verificar la descarga;
+    si no está disponible usa el HTML del directorio, que solo trae los nombres.
+    """
+    url = BASE_URL.format(year=year, day=day)
+    with timed("listing"):
+        text = await _get_text(session, json_listing_url(url))
+        entries = parse_listing(text, url) if text is not None else []
+        if entries:
+            return entries
+        text = await _get_text(session, url)
+        if text is None:
             print(f"Error al acceder a {url}")
             return None
-        text = await resp.text()
-        soup = BeautifulSoup(text, "html.parser")
-        for link in soup.find_all("a"):
-            filename = link.get("href")
-            if filename and cuadrante in filename and filename.endswith(".h5"):
-                # Limpiar el href de espacios y saltos de línea
-                filename = filename.strip()
-                
-                # Verificar si el href ya es una URL completa
-                if filename.startswith("http"):
-                    # Reemplazar saltos de línea y espacios extra
-                    filename = filename.replace('\n', '').replace('\r', '').strip()
-                    return filename
-                else:
-                    # Si es solo el nombre del archivo, concatenar con la URL base
-                    full_url = url + filename
-                    return full_url
-    print(f"No se encontró archivo para cuadrante {cuadrante} en {url}")
+        return parse_listing(text, url)
+
+
+async def find_entry(session, year, day, cuadrante, index: ListingIndex | None = None) -> dict | None:
+    """
+    Entrada del listado (filename, url, size, checksum) para el cuadrante. El listado de cada
+    día se descarga una sola vez y queda en el índice persistente; si el cuadrante no aparece,
+    la consulta negativa se registra y el listado solo se vuelve a pedir (por si se publicó
+    después) cuando expira (VNP46A1_LISTING_MISS_TTL).
+    """
+    index = index or get_listing_index()
+    entry = index.lookup(year, day, cuadrante)
+    if entry:
+        return entry
+    if index.known_missing(year, day, cuadrante):
+        return None
+    entries = await fetch_listing(session, year, day)
+    if entries is not None:
+        index.store_day(year, day, entries)
+        entry = index.lookup(year, day, cuadrante)
+        if not entry:
+            index.store_missing(year, day, cuadrante)
+    if not entry:
+        print(f"No se encontró archivo para cuadrante {cuadrante} en {BASE_URL.format(year=year, day=day)}")
+    return entry
+
+
+async def find_files(session, dias, cuadrante, max_concurrency: int = 8) -> dict:
+    """
+    Resuelve de una vez un rango de días [(año, día), ...] para un cuadrante.
+    Solo se descargan (con concurrencia acotada) los listados que faltan en el índice.
+    Devuelve {(año, día): entrada o None}.
+    """
+    index = get_listing_index()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _one(year, day):
+        if index.lookup(year, day, cuadrante) is None:
+            async with semaphore:
+                return await find_entry(session, year, day, cuadrante, index)
+        return index.lookup(year, day, cuadrante)
+
+    dias = list(dict.fromkeys(dias))
+    entries = await asyncio.gather(*(_one(y, d) for y, d in dias))
+    return dict(zip(dias, entries))
+
+
+async def find_file(session, year, day, cuadrante):
+    entry = await find_entry(session, year, day, cuadrante)
+    return entry["url"] if entry else None
+
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+)")
+
+
+@asynccontextmanager
+async def _open_following_redirects(session, url, headers, timeout, max_redirects=10):
+    """
+    Abre `url` siguiendo los redirects a mano para conservar el header Authorization (aiohttp
+    lo elimina al redirigir a otro host, p.ej. Earthdata, y LAADS requiere el token).
+    Entrega (respuesta, url_final); un redirect sin Location se entrega tal cual.
+    """
+    current_url = url
+    for _ in range(max_redirects):
+        async with session.get(
+            current_url, headers=headers, timeout=timeout, allow_redirects=False
+        ) as resp:
+            location = resp.headers.get("Location") if resp.status in _REDIRECT_STATUSES else None
+            if not location:
+                yield resp, current_url
+                return
+        current_url = location if location.startswith("http") else urljoin(current_url, location)
+    raise RuntimeError(f"Demasiados redirects al descargar {url}")
+
+
+async def _read_stream(resp, on_chunk, buffer_size: int) -> int:
+    """Lee el cuerpo de la respuesta por bloques de `buffer_size` y devuelve los bytes leídos."""
+    received = 0
+    while True:
+        chunk = await resp.content.read(buffer_size)
+        if not chunk:
+            return received
+        on_chunk(chunk)
+        received += len(chunk)
+        inc("download_bytes_total", len(chunk))
+
+
+async def _fetch_into_part(
+    session,
+    url,
+    part_path,
+    expected_size=None,
+    attempt=0,
+    max_retries=3,
+    buffer_size: int = DOWNLOAD_BUFFER_SIZE,
+    on_bytes: Callable[[int, int | None], None] | None = None,
+) -> bool:
+    """
+    Un intento de descarga hacia `part_path`, reanudando desde los bytes que ya tiene con un
+    header `Range`. Devuelve True si la transferencia terminó (falta verificarla) y False si
+    el servidor respondió con error o la conexión se cortó antes de tiempo.
+    """
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if expected_size is not None and offset >= int(expected_size):
+        if offset == int(expected_size):
+            return True
+        os.remove(part_path)  # Más grande de lo esperado: no es reanudable
+        offset = 0
+
+    headers = dict(HEADERS)
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        print(f"Reanudando {url} desde el byte {offset}")
+
+    timeout = aiohttp.ClientTimeout(total=300, connect=60)
+    async with _open_following_redirects(session, url, headers, timeout) as (resp, _):
+        if resp.status == 416 and offset:
+            # El servidor ya no tiene bytes que enviar: el .part está completo
+            return True
+        if resp.status not in (200, 206):
+            print(f"Fallo la descarga del archivo: {url} - Status: {resp.status} (intento {attempt + 1}/{max_retries})")
+            try:
+                error_text = await resp.text()
+                print(f"Respuesta del servidor: {error_text[:200]}")
+            except Exception:
+                pass
+            return False
+
+        # Un 200 a una petición con Range significa que el servidor manda el archivo completo
+        if resp.status == 200:
+            offset = 0
+        print(f"Descargando: {url} (intento {attempt + 1}/{max_retries})")
+        expected_length = content_length(resp.headers)
+        total = expected_size or (offset + expected_length if expected_length is not None else None)
+        written = offset
+        with open(part_path, "ab" if resp.status == 206 else "wb") as f:
+
+            def _write(chunk):
+                nonlocal written
+                f.write(chunk)
+                written += len(chunk)
+                if on_bytes is not None:
+                    on_bytes(written, total)
+
+            received = await _read_stream(resp, _write, buffer_size)
+        if expected_length is not None and received < expected_length:
+            print(f"Transferencia incompleta: {received}/{expected_length} bytes de {url}")
+            return False
+        return True
+
+
+def _split_ranges(total: int, segments: int) -> list[tuple[int, int]]:
+    """Divide [0, total) en `segments` rangos contiguos (inicio, fin inclusive)."""
+    segments = max(1, min(segments, total))
+    step = -(-total // segments)
+    return [(start, min(start + step, total) - 1) for start in range(0, total, step)]
+
+
+async def _probe_ranges(session, url) -> tuple[str, int] | None:
+    """
+    Pide el primer byte para conocer la URL final (tras los redirects) y el tamaño total.
+    Devuelve None si el servidor no soporta peticiones por rangos.
+    """
+    headers = {**HEADERS, "Range": "bytes=0-0"}
+    timeout = aiohttp.ClientTimeout(total=60, connect=60)
+    async with _open_following_redirects(session, url, headers, timeout) as (resp, final_url):
+        if resp.status != 206:
+            return None
+        match = _CONTENT_RANGE_RE.match(resp.headers.get("Content-Range", ""))
+        return (final_url, int(match.group(3))) if match else None
+
+
+async def _fetch_segment(
+    session,
+    url,
+    f,
+    start: int,
+    end: int,
+    buffer_size: int,
+    on_chunk: Callable[[int], None],
+    max_retries: int = 3,
+    delay: float = 2,
+) -> None:
+    """Descarga el rango [start, end] escribiéndolo en su posición; reanuda el rango si se corta."""
+    position = start
+    timeout = aiohttp.ClientTimeout(total=300, connect=60)
+    for attempt in range(max_retries):
+        try:
+            headers = {**HEADERS, "Range": f"bytes={position}-{end}"}
+            async with _open_following_redirects(session, url, headers, timeout) as (resp, _):
+                if resp.status != 206:
+                    raise RuntimeError(f"El servidor respondió {resp.status} al rango {position}-{end}")
+
+                def _write(chunk):
+                    nonlocal position
+                    _write_at(f, position, chunk)
+                    position += len(chunk)
+                    on_chunk(len(chunk))
+
+                await _read_stream(resp, _write, buffer_size)
+            if position > end:
+                return
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error de red en el rango {start}-{end} de {url}: {e!r} (intento {attempt + 1}/{max_retries})")
+        if attempt < max_retries - 1:
+            inc("download_retries_total")
+            await asyncio.sleep(delay)
+    raise RuntimeError(f"No se pudo descargar el rango {start}-{end} de {url}")
+
+
+def _write_at(f, offset: int, data: bytes) -> None:
+    """Escribe `data` en `offset` sin mover el cursor compartido (pwrite cuando existe)."""
+    if hasattr(os, "pwrite"):
+        os.pwrite(f.fileno(), data, offset)
+    else:
+        f.seek(offset)
+        f.write(data)
+
+
+async def download_segmented(
+    session,
+    url,
+    path,
+    segments: int = DOWNLOAD_SEGMENTS,
+    expected_size: int | None = None,
+    checksum: str | None = None,
+    buffer_size: int = DOWNLOAD_BUFFER_SIZE,
+    on_bytes: Callable[[int, int | None], None] | None = None,
+    min_bytes: int = SEGMENT_MIN_BYTES,
+) -> str | None:
+    """
+    Descarga el archivo en `segments` rangos concurrentes sobre la misma sesión. Cada rango se
+    escribe en su posición de un archivo preasignado (`path + '.seg'`), que se verifica y se
+    publica en `path` con un rename atómico.
+    Devuelve None (sin dejar archivos) si el servidor no acepta rangos, si el archivo es menor
+    que `min_bytes` o si algún rango falla (los demás rangos se cancelan antes de borrar el
+    archivo); el llamador puede usar la descarga de un stream.
+    """
+    probe = await _probe_ranges(session, url)
+    if probe is None:
+        print(f"El servidor no acepta rangos; se descarga en un solo stream: {url}")
+        return None
+    final_url, total = probe
+    if total < min_bytes:
+        return None
+
+    seg_path = path + ".seg"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    received = 0
+
+    def _on_chunk(n: int) -> None:
+        nonlocal received
+        received += n
+        if on_bytes is not None:
+            on_bytes(received, total)
+
+    ranges = _split_ranges(total, segments)
+    print(f"Descargando {url} en {len(ranges)} segmentos ({total} bytes)")
+    try:
+        with open(seg_path, "wb") as f:
+            f.truncate(total)
+            # Si un rango falla, el TaskGroup cancela y espera a los demás antes de cerrar el archivo
+            async with asyncio.TaskGroup() as tg:
+                for a, b in ranges:
+                    tg.create_task(_fetch_segment(session, final_url, f, a, b, buffer_size, _on_chunk))
+        if not await asyncio.to_thread(verify_file, seg_path, expected_size or total, checksum):
+            raise RuntimeError("La descarga segmentada no coincide con el listado de LAADS")
+        os.replace(seg_path, path)
+        print(f"Descarga completada: {path} ({total} bytes)")
+        return path
+    except Exception as e:
+        if isinstance(e, ExceptionGroup):
+            e = e.exceptions[0]
+        print(f"Error en la descarga segmentada de {url}: {e}")
+        return None
+    finally:
+        # También si se cancela: el .seg preasignado ocupa el tamaño completo del gránulo
+        if os.path.exists(seg_path):
+            os.remove(seg_path)
+
+
+async def download_file(
+    session,
+    url,
+    path,
+    max_retries=3,
+    delay=2,
+    expected_size: int | None = None,
+    checksum: str | None = None,
+    segments: int = DOWNLOAD_SEGMENTS,
+    buffer_size: int = DOWNLOAD_BUFFER_SIZE,
+    on_bytes: Callable[[int, int | None], None] | None = None,
+):
+    """
+    Descarga un archivo con reintentos que reanudan la transferencia.
+    Los bytes se escriben en `path + '.part'` y cada reintento pide solo lo que falta con un
+    header `Range`. Al terminar se verifica contra el tamaño y el md5 del listado de LAADS
+    (si se conocen) y el archivo se publica en `path` con un rename atómico. Si todos los
+    intentos fallan el `.part` se conserva para reanudarlo en la siguiente ejecución.
+
+    Con `segments > 1` primero se intenta la descarga segmentada (`download_segmented`).
+    `on_bytes(recibidos, total)` se llama con cada bloque escrito (total puede ser None).
+    """
+    part_path = path + ".part"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    if segments > 1 and not os.path.exists(part_path):
+        try:
+            segmented = await download_segmented(
+                session, url, path, segments, expected_size, checksum, buffer_size, on_bytes
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError) as e:
+            print(f"No se pudo iniciar la descarga segmentada de {url}: {e!r}")
+            segmented = None
+        if segmented:
+            return segmented
+
+    for attempt in range(max_retries):
+        try:
+            if await _fetch_into_part(
+                session, url, part_path, expected_size, attempt, max_retries, buffer_size, on_bytes
+            ):
+                if await asyncio.to_thread(verify_file, part_path, expected_size, checksum):
+                    os.replace(part_path, path)
+                    print(f"Descarga completada: {path} ({os.path.getsize(path)} bytes)")
+                    return path
+                print(f"La descarga no coincide con el listado de LAADS, se descarta: {url}")
+                os.remove(part_path)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error de red al descargar {url}: {e!r} (intento {attempt + 1}/{max_retries})")
+        except Exception as e:
+            print(f"Error inesperado al descargar {url}: {e} (intento {attempt + 1}/{max_retries})")
+
+        if attempt < max_retries - 1:
+            inc("download_retries_total")
+            print(f"Reintentando en {delay} segundos...")
+            await asyncio.sleep(delay)
+
     return None
 
-async def download_file(session, url, path, max_retries=3, delay=2):
+
+async def download_bytes(
+    session,
+    url,
+    max_retries=3,
+    delay=2,
+    expected_size: int | None = None,
+    checksum: str | None = None,
+    buffer_size: int = DOWNLOAD_BUFFER_SIZE,
+    on_bytes: Callable[[int, int | None], None] | None = None,
+) -> bytes | None:
     """
-    Descarga un archivo con sistema de retry.
-    Sigue redirects manualmente preservando el header Authorization, ya que aiohttp
-    lo elimina en redirects a otro host (p.ej. Earthdata) y LAADS requiere el token.
+    Descarga un archivo a memoria (sin escribir en disco). Como `download_file`, los reintentos
+    piden solo los bytes que faltan con `Range` y el resultado se verifica contra el tamaño y
+    el md5 del listado de LAADS.
     """
+    buffer = bytearray()
+    timeout = aiohttp.ClientTimeout(total=300, connect=60)
+
     for attempt in range(max_retries):
         try:
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-
-            timeout = aiohttp.ClientTimeout(total=300, connect=60)
-            current_url = url
-            max_redirects = 10
-
-            for _ in range(max_redirects):
-                async with session.get(
-                    current_url, headers=HEADERS, timeout=timeout, allow_redirects=False
-                ) as resp:
-                    if resp.status in (301, 302, 303, 307, 308):
-                        location = resp.headers.get("Location")
-                        if not location:
-                            break
-                        current_url = (
-                            location
-                            if location.startswith("http")
-                            else urljoin(current_url, location)
-                        )
-                        continue
+            headers = dict(HEADERS)
+            if buffer:
+                headers["Range"] = f"bytes={len(buffer)}-"
+            async with _open_following_redirects(session, url, headers, timeout) as (resp, _):
+                if resp.status == 416 and buffer:
+                    complete = True
+                elif resp.status in (200, 206):
+                    # Un 200 a una petición con Range significa que llega el archivo completo
                     if resp.status == 200:
-                        print(f"Descargando: {url} (intento {attempt + 1}/{max_retries})")
-                        total_size = 0
-                        with open(path, "wb") as f:
-                            while True:
-                                chunk = await resp.content.read(8192)
-                                if not chunk:
-                                    break
-                                f.write(chunk)
-                                total_size += len(chunk)
-                        print(f"Descarga completada: {path} ({total_size} bytes)")
-                        return path
+                        buffer.clear()
+                    expected_length = content_length(resp.headers)
+                    total = expected_size or (
+                        len(buffer) + expected_length if expected_length is not None else None
+                    )
+
+                    def _append(chunk):
+                        buffer.extend(chunk)
+                        if on_bytes is not None:
+                            on_bytes(len(buffer), total)
+
+                    received = await _read_stream(resp, _append, buffer_size)
+                    complete = expected_length is None or received >= expected_length
+                else:
                     print(f"Fallo la descarga del archivo: {url} - Status: {resp.status} (intento {attempt + 1}/{max_retries})")
-                    try:
-                        error_text = await resp.text()
-                        print(f"Respuesta del servidor: {error_text[:200]}")
-                    except Exception:
-                        pass
-                    break
-
-            if attempt < max_retries - 1:
-                print(f"Reintentando en {delay} segundos...")
-                await asyncio.sleep(delay)
-                continue
+                    complete = False
+            if complete:
+                data = bytes(buffer)
+                if verify_bytes(data, expected_size, checksum):
+                    print(f"Descarga en memoria completada: {url} ({len(data)} bytes)")
+                    return data
+                print(f"La descarga no coincide con el listado de LAADS, se descarta: {url}")
+                buffer.clear()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error de red al descargar {url}: {e!r} (intento {attempt + 1}/{max_retries})")
+
+        if attempt < max_retries - 1:
+            inc("download_retries_total")
+            print(f"Reintentando en {delay} segundos...")
+            await asyncio.sleep(delay)
+    return None
+
+
+def has_hdf5_signature(path: str) -> bool:
+    """Verifica la firma HDF5 del archivo (descarta páginas de error HTML)."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(8) == HDF5_SIGNATURE
+    except OSError:
+        return False
+
+
+async def fetch_granule(
+    session,
+    year,
+    day,
+    cuadrante,
+    cache: GranuleCache | None = None,
+    pin: bool = False,
+    on_bytes: Callable[[int, int | None], None] | None = None,
+):
+    """
+    Devuelve la ruta local del gránulo (año, día, cuadrante). Si no está en la caché
+    persistente lo busca en LAADS, lo descarga a un temporal y lo publica en la caché.
+
+    Las peticiones concurrentes del mismo gránulo (varios jobs, /jobs y /matriz) comparten
+    una sola descarga. Con `pin=True` el gránulo queda fijado en la caché para el llamador,
+    que debe liberarlo con `cache.unpin(path)` al terminar de leerlo.
+    `on_bytes(recibidos, total)` informa el avance de la descarga (solo lo recibe quien la
+    inicia; quienes se suman a una descarga en curso solo esperan el resultado).
+    """
+    cache = cache or get_granule_cache()
+    key = cache.key(year, day, cuadrante)
+    cached_path = cache.get(key, pin=pin)
+    if cached_path:
+        print(f"✅ Usando archivo H5 de la caché: {cached_path}")
+        return cached_path
+
+    path = await _in_flight.do(
+        (os.path.abspath(cache.root), key),
+        lambda: _download_granule(session, year, day, cuadrante, cache, key, on_bytes),
+    )
+    if path and pin and not cache.pin(path):
+        # Desalojado entre la publicación y el pin: se vuelve a pedir
+        return await fetch_granule(session, year, day, cuadrante, cache, pin, on_bytes)
+    return path
+
+
+async def _download_granule(
+    session, year, day, cuadrante, cache: GranuleCache, key, on_bytes=None
+) -> str | None:
+    """Busca el gránulo en LAADS, lo descarga a un temporal y lo publica en la caché."""
+    print(f"🔍 Buscando archivo H5 para: {year}-{day} ({cuadrante})")
+    h5_url = await find_file(session, year, day, cuadrante)
+    if not h5_url:
+        print(f"❌ No se encontró archivo H5 para: {year}-{day} ({cuadrante})")
+        return None
+
+    # Tamaño y md5 del listado (el listado HTML no los trae; el JSON de LAADS sí)
+    entry = get_listing_index().lookup(year, day, cuadrante) or {}
+    # Otro proceso puede estar descargando el mismo gránulo: solo quien tiene el candado usa el .part fijo
+    with cache.claim_staging(key) as staging_path:
+        print(f"📥 Descargando: {h5_url} -> {staging_path}")
+        with timed("download"):
+            downloaded_path = await download_file(
+                session,
+                h5_url,
+                staging_path,
+                expected_size=entry.get("size"),
+                checksum=entry.get("checksum"),
+                on_bytes=on_bytes,
+            )
+        if not downloaded_path or not has_hdf5_signature(downloaded_path):
+            print(f"❌ Error descargando archivo H5: {h5_url}")
+            cache.discard(staging_path)
             return None
-                        
-        except aiohttp.ClientError as e:
-            print(f"Error de cliente HTTP al descargar {url}: {e} (intento {attempt + 1}/{max_retries})")
-            if attempt < max_retries - 1:
-                print(f"Reintentando en {delay} segundos...")
-                await asyncio.sleep(delay)
-                continue
-            else:
-                return None
-        except asyncio.TimeoutError as e:
-            print(f"Timeout al descargar {url}: {e} (intento {attempt + 1}/{max_retries})")
-            if attempt < max_retries - 1:
-                print(f"Reintentando en {delay} segundos...")
-                await asyncio.sleep(delay)
-                continue
-            else:
-                return None
-        except RuntimeError as e:
-            print(f"Error de runtime al descargar {url}: {e} (intento {attempt + 1}/{max_retries})")
-            if attempt < max_retries - 1:
-                print(f"Reintentando en {delay} segundos...")
-                await asyncio.sleep(delay)
-                continue
-            else:
-                return None
-        except Exception as e:
-            print(f"Error inesperado al descargar {url}: {e} (intento {attempt + 1}/{max_retries})")
-            if attempt < max_retries - 1:
-                print(f"Reintentando en {delay} segundos...")
-                await asyncio.sleep(delay)
-                continue
-            else:
-                return None
-    
-    return None
\ No newline at end of file
+        return cache.put(key, downloaded_path)
+
+
+async def fetch_granule_source(
+    session,
+    year,
+    day,
+    cuadrante,
+    on_bytes: Callable[[int, int | None], None] | None = None,
+) -> str | bytes | None:
+    """
+    Variante de `fetch_granule` para procesar en memoria: si el gránulo ya está en la caché
+    devuelve su ruta (fijada; liberarla con `cache.unpin`), si no lo descarga a memoria y
+    devuelve los bytes sin escribirlos en disco. Funciona aunque la caché no se pueda crear
+    (contenedores de solo lectura).
+    """
+    try:
+        cache = get_granule_cache()
+    except OSError as e:
+        print(f"Caché de gránulos no disponible ({e}); se descarga en memoria")
+        cache = None
+    if cache is not None:
+        cached_path = cache.get(cache.key(year, day, cuadrante), pin=True)
+        if cached_path:
+            print(f"✅ Usando archivo H5 de la caché: {cached_path}")
+            return cached_path
+
+    async def _download():
+        print(f"🔍 Buscando archivo H5 para: {year}-{day} ({cuadrante})")
+        h5_url = await find_file(session, year, day, cuadrante)
+        if not h5_url:
+            print(f"❌ No se encontró archivo H5 para: {year}-{day} ({cuadrante})")
+            return None
+        entry = get_listing_index().lookup(year, day, cuadrante) or {}
+        print(f"📥 Descargando a memoria: {h5_url}")
+        with timed("download"):
+            data = await download_bytes(
+                session,
+                h5_url,
+                expected_size=entry.get("size"),
+                checksum=entry.get("checksum"),
+                on_bytes=on_bytes,
+            )
+        if not data or not data.startswith(HDF5_SIGNATURE):
+            print(f"❌ Error descargando archivo H5: {h5_url}")
+            return None
+        return data
+
+    return await _in_flight.do(("memoria", GranuleCache.key(year, day, cuadrante)), _download)
@@ -0,0 +1,52 @@
+"""Verificación de descargas contra el tamaño y el md5 publicados en el listado de LAADS."""
+import hashlib
+import os
+
+
+def file_md5(path: str, buffer_size: int = 1 << 20) -> str:
+    """md5 hexadecimal del archivo, leído por bloques."""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(buffer_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def verify_file(path: str, expected_size: int | None = None, checksum: str | None = None) -> bool:
+    """
+    True si el archivo coincide con el tamaño y el md5 esperados. Los valores que el listado
+    no trae (None) no se verifican.
+    """
+    if not os.path.exists(path):
+        return False
+    size = os.path.getsize(path)
+    if expected_size is not None and size != int(expected_size):
+        print(f"Tamaño inesperado en {path}: {size} bytes (esperado {expected_size})")
+        return False
+    if checksum:
+        actual = file_md5(path)
+        if actual.lower() != checksum.lower():
+            print(f"md5 inesperado en {path}: {actual} (esperado {checksum})")
+            return False
+    return True
+
+
+def verify_bytes(data: bytes, expected_size: int | None = None, checksum: str | None = None) -> bool:
+    """Como `verify_file`, para un archivo descargado en memoria."""
+    if expected_size is not None and len(data) != int(expected_size):
+        print(f"Tamaño inesperado: {len(data)} bytes (esperado {expected_size})")
+        return False
+    if checksum:
+        actual = hashlib.md5(data).hexdigest()
+        if actual.lower() != checksum.lower():
+            print(f"md5 inesperado: {actual} (esperado {checksum})")
+            return False
+    return True
+
+
+def content_length(headers) -> int | None:
+    """Valor de Content-Length como entero, o None si no viene o no es válido."""
+    value = headers.get("Content-Length") if headers is not None else None
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
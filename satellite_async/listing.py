@@ -0,0 +1,175 @@
+"""Índice persistente de los listados de directorios de LAADS (un solo fetch por año/día)."""
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from html import unescape
+
+from .config import LISTING_INDEX_PATH, LISTING_MISS_TTL_SECONDS
+
+# Extractor de enlaces a .h5: evita construir el DOM completo del listado
+_HREF_RE = re.compile(r"""href\s*=\s*["']([^"']+?\.h5)\s*["']""", re.IGNORECASE)
+_QUADRANT_RE = re.compile(r"\.(h\d{2}v\d{2})\.")
+
+
+def _quadrant_of(filename: str) -> str | None:
+    match = _QUADRANT_RE.search(filename)
+    return match.group(1) if match else None
+
+
+def _entry(name: str, base_url: str, size=None, checksum=None) -> dict:
+    name = name.replace("\n", "").replace("\r", "").strip()
+    url = name if name.startswith("http") else base_url + name
+    filename = url.rsplit("/", 1)[-1]
+    return {
+        "filename": filename,
+        "url": url,
+        "cuadrante": _quadrant_of(filename),
+        "size": int(size) if size is not None else None,
+        "checksum": checksum,
+    }
+
+
+def json_listing_url(url: str) -> str:
+    """URL del listado JSON de un directorio de LAADS (el directorio sin `/` final más `.json`)."""
+    return url.rstrip("/") + ".json"
+
+
+def parse_listing(text: str, base_url: str) -> list[dict]:
+    """
+    Extrae los gránulos .h5 de un listado de LAADS.
+    Acepta el listado HTML (solo nombres) o el JSON de LAADS, que además trae tamaño y md5.
+    """
+    stripped = text.lstrip()
+    if stripped.startswith(("{", "[")):
+        try:
+            data = json.loads(stripped)
+        except ValueError:
+            data = None
+        if data is not None:
+            items = data.get("content", []) if isinstance(data, dict) else data
+            return [
+                _entry(item["name"], base_url, item.get("size"), item.get("md5sum") or item.get("checksum"))
+                for item in items
+                if isinstance(item, dict) and str(item.get("name", "")).endswith(".h5")
+            ]
+    return [_entry(unescape(href), base_url) for href in _HREF_RE.findall(text)]
+
+
+class ListingIndex:
+    """
+    Índice local de listados por (año, día) guardado como JSON-lines.
+    Cada línea es un día completo o una consulta negativa (un cuadrante que no estaba en el
+    listado del día, con su marca de tiempo); al cargar, la última línea de un día gana. Un día
+    solo se vuelve a escribir si su listado cambió, y el archivo se compacta al cargarlo si
+    tiene líneas repetidas.
+    """
+
+    def __init__(self, path: str = LISTING_INDEX_PATH, miss_ttl: float = LISTING_MISS_TTL_SECONDS):
+        self.path = path
+        self.miss_ttl = miss_ttl
+        self._days: dict[tuple[int, int], dict[str, dict]] = {}
+        self._entries: dict[tuple[int, int], list[dict]] = {}
+        self._missing: dict[tuple[int, int], dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def _key(year, day) -> tuple[int, int]:
+        return int(year), int(day)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        lines = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                lines += 1
+                key = self._key(record["year"], record["day"])
+                if "missing" in record:
+                    self._missing.setdefault(key, {})[record["missing"]] = record["checked_at"]
+                else:
+                    self._set_day(key, record["entries"])
+        records = len(self._entries) + sum(len(m) for m in self._missing.values())
+        if lines > records:
+            self._rewrite()
+
+    def _set_day(self, key: tuple[int, int], entries: list[dict]) -> None:
+        self._entries[key] = entries
+        self._days[key] = {e["cuadrante"]: e for e in entries if e.get("cuadrante")}
+        # Los cuadrantes que ahora aparecen dejan de estar ausentes
+        missing = self._missing.get(key, {})
+        for cuadrante in self._days[key]:
+            missing.pop(cuadrante, None)
+
+    def _records(self) -> list[dict]:
+        records = [{"year": y, "day": d, "entries": entries} for (y, d), entries in self._entries.items()]
+        for (y, d), missing in self._missing.items():
+            records += [{"year": y, "day": d, "missing": c, "checked_at": t} for c, t in missing.items()]
+        return records
+
+    def _write(self, records: list[dict], mode: str = "a") -> None:
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            path = self.path if mode == "a" else f"{self.path}.{uuid.uuid4().hex}.tmp"
+            with open(path, mode, encoding="utf-8") as f:
+                f.writelines(json.dumps(record) + "\n" for record in records)
+            if mode != "a":
+                os.replace(path, self.path)
+        except OSError as e:
+            # Sistema de archivos de solo lectura: el índice queda solo en memoria
+            print(f"No se pudo guardar el índice de listados en {self.path}: {e}")
+
+    def _rewrite(self) -> None:
+        """Reescribe el archivo con una línea por día y por consulta negativa."""
+        self._write(self._records(), mode="w")
+
+    def has_day(self, year, day) -> bool:
+        return self._key(year, day) in self._days
+
+    def lookup(self, year, day, cuadrante: str) -> dict | None:
+        """Entrada (filename, url, size, checksum) del cuadrante, o None si no está indexada."""
+        return self._days.get(self._key(year, day), {}).get(cuadrante)
+
+    def known_missing(self, year, day, cuadrante: str, now: float | None = None) -> bool:
+        """True si el cuadrante no estaba en el listado del día hace menos de `miss_ttl` segundos."""
+        checked_at = self._missing.get(self._key(year, day), {}).get(cuadrante)
+        return checked_at is not None and (now or time.time()) - checked_at < self.miss_ttl
+
+    def store_day(self, year, day, entries: list[dict]) -> None:
+        """Guarda el listado completo de un día (no se guardan listados vacíos ni repetidos)."""
+        if not entries:
+            return
+        key = self._key(year, day)
+        with self._lock:
+            if self._entries.get(key) == entries:
+                return
+            self._set_day(key, entries)
+            self._write([{"year": key[0], "day": key[1], "entries": entries}])
+
+    def store_missing(self, year, day, cuadrante: str, now: float | None = None) -> None:
+        """Registra que el cuadrante no estaba en el listado del día (consulta negativa)."""
+        key = self._key(year, day)
+        checked_at = now or time.time()
+        with self._lock:
+            self._missing.setdefault(key, {})[cuadrante] = checked_at
+            self._write([{"year": key[0], "day": key[1], "missing": cuadrante, "checked_at": checked_at}])
+
+
+_default_index: ListingIndex | None = None
+
+
+def get_listing_index() -> ListingIndex:
+    """Instancia del índice compartida por el proceso."""
+    global _default_index
+    if _default_index is None:
+        _default_index = ListingIndex()
+    return _default_index
@@ -0,0 +1,238 @@
+"""
+Métricas del pipeline (tiempos por etapa y contadores) en formato de texto de Prometheus.
+
+Las etapas se miden con `timed("etapa")` (context manager) o `@timed_stage("etapa")`
+(decorador) y los contadores se incrementan con `inc(nombre, valor)`. Cada observación se
+agrega al total del proceso y, si hay un job activo (`job_scope`), también a las métricas de
+ese job. Con VNP46A1_METRICS desactivado `timed` devuelve un context manager vacío
+compartido e `inc` regresa de inmediato, así que el costo es una comparación por llamada.
+
+Con el executor CPU de procesos (VNP46A1_CPU_EXECUTOR=process) las etapas que corren dentro
+de los procesos hijos no se registran; solo el tiempo total de la etapa `cpu`.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+from .config import METRICS_ENABLED, METRICS_MAX_JOBS
+
+PREFIX = "vnp46a1"
+STAGE_METRIC = f"{PREFIX}_stage_seconds"
+STAGES = (
+    "listing",
+    "download",
+    "hdf5_open",
+    "dataset_read",
+    "mask",
+    "statistics",
+    "serialization",
+    "cpu",
+)
+# Límites (en segundos) de las cubetas del histograma de etapas
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+COUNTERS = {
+    "download_bytes_total": "Bytes descargados de LAADS",
+    "cache_hits_total": "Gránulos encontrados en la caché persistente",
+    "cache_misses_total": "Gránulos que no estaban en la caché persistente",
+    "download_retries_total": "Reintentos de descarga (archivos completos o rangos)",
+}
+
+_current_job: contextvars.ContextVar[str | None] = contextvars.ContextVar("vnp46a1_job", default=None)
+
+
+class Histogram:
+    """Histograma acumulativo con las cubetas de BUCKETS."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(BUCKETS, value)
+        if i < len(BUCKETS):
+            self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Scope:
+    """Contadores e histogramas de un ámbito (todo el proceso o un job)."""
+
+    def __init__(self):
+        self.counters: dict[str, float] = {}
+        self.stages: dict[str, Histogram] = {}
+
+    def inc(self, name: str, value: float) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, stage: str, seconds: float) -> None:
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = Histogram()
+        histogram.observe(seconds)
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{v}"' for k, v in labels.items() if v is not None)
+
+
+def _render_scope(scope: _Scope, job_id: str | None) -> list[str]:
+    lines = [
+        f"# HELP {STAGE_METRIC} Duración de cada etapa del pipeline en segundos",
+        f"# TYPE {STAGE_METRIC} histogram",
+    ]
+    for stage in sorted(scope.stages):
+        histogram = scope.stages[stage]
+        base = _labels(job_id=job_id, stage=stage)
+        acumulado = 0
+        for le, n in zip(BUCKETS, histogram.counts):
+            acumulado += n
+            lines.append(f'{STAGE_METRIC}_bucket{{{base},le="{le}"}} {acumulado}')
+        lines.append(f'{STAGE_METRIC}_bucket{{{base},le="+Inf"}} {histogram.count}')
+        lines.append(f"{STAGE_METRIC}_sum{{{base}}} {histogram.sum}")
+        lines.append(f"{STAGE_METRIC}_count{{{base}}} {histogram.count}")
+    labels = f"{{{_labels(job_id=job_id)}}}" if job_id is not None else ""
+    for name, help_text in COUNTERS.items():
+        metric = f"{PREFIX}_{name}"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{labels} {scope.counters.get(name, 0)}")
+    return lines
+
+
+class MetricsRegistry:
+    """
+    Métricas del proceso y de los últimos `max_jobs` jobs. Es seguro usarlo desde varios hilos
+    (las etapas CPU corren en el executor).
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED, max_jobs: int = METRICS_MAX_JOBS):
+        self.enabled = enabled
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._process = _Scope()
+        self._jobs: OrderedDict[str, _Scope] = OrderedDict()
+
+    def _job_scope_locked(self, job_id: str) -> _Scope:
+        scope = self._jobs.get(job_id)
+        if scope is None:
+            scope = self._jobs[job_id] = _Scope()
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        return scope
+
+    def inc(self, name: str, value: float = 1) -> None:
+        job_id = _current_job.get()
+        with self._lock:
+            self._process.inc(name, value)
+            if job_id is not None:
+                self._job_scope_locked(job_id).inc(name, value)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        job_id = _current_job.get()
+        with self._lock:
+            self._process.observe(stage, seconds)
+            if job_id is not None:
+                self._job_scope_locked(job_id).observe(stage, seconds)
+
+    def render(self, job_id: str | None = None) -> str | None:
+        """Texto de Prometheus del proceso, o del job pedido (None si no tiene métricas)."""
+        with self._lock:
+            if job_id is None:
+                lines = _render_scope(self._process, None)
+            elif job_id in self._jobs:
+                lines = _render_scope(self._jobs[job_id], job_id)
+            else:
+                return None
+        return "\n".join(lines) + "\n"
+
+    def stage_count(self, stage: str, job_id: str | None = None) -> int:
+        """Número de observaciones de una etapa (del proceso o de un job)."""
+        with self._lock:
+            scope = self._process if job_id is None else self._jobs.get(job_id)
+            histogram = scope.stages.get(stage) if scope else None
+            return histogram.count if histogram else 0
+
+    def stage_seconds(self, job_id: str | None = None) -> dict[str, float]:
+        """Segundos acumulados por etapa (del proceso o de un job)."""
+        with self._lock:
+            scope = self._process if job_id is None else self._jobs.get(job_id)
+            return {stage: h.sum for stage, h in scope.stages.items()} if scope else {}
+
+    def counter(self, name: str, job_id: str | None = None) -> float:
+        with self._lock:
+            scope = self._process if job_id is None else self._jobs.get(job_id)
+            return scope.counters.get(name, 0) if scope else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._process = _Scope()
+            self._jobs.clear()
+
+
+_registry = MetricsRegistry()
+_NOOP = nullcontext()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Registro de métricas compartido del proceso (activado con VNP46A1_METRICS)."""
+    return _registry
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _registry.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+def timed(stage: str):
+    """Context manager que mide la duración de `stage` (vacío si las métricas están apagadas)."""
+    return _Timer(stage) if _registry.enabled else _NOOP
+
+
+def timed_stage(stage: str):
+    """Decorador equivalente a envolver la función en `with timed(stage)`."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _registry.enabled:
+                return func(*args, **kwargs)
+            with _Timer(stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def inc(name: str, value: float = 1) -> None:
+    """Incrementa un contador de COUNTERS."""
+    if _registry.enabled:
+        _registry.inc(name, value)
+
+
+@contextmanager
+def job_scope(job_id: str | None):
+    """Asocia las métricas registradas dentro del bloque (y sus tareas hijas) a `job_id`."""
+    token = _current_job.set(job_id)
+    try:
+        yield
+    finally:
+        _current_job.reset(token)
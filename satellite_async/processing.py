@@ -1,79 +1,179 @@
 import h5py
-import math
+import io
 import numpy as np
 import os
 from datetime import date
 from typing import Any
 
-from .config import IMAGE_PATH, find_image_path
+from .config import IMAGE_PATH, TILE_SIZE, find_image_path
+from .metrics import timed, timed_stage
 from .models import MedicionResultado
 
 
-def _float_to_json_safe(value: float) -> float | None:
-    """Convert float to JSON-serializable value; NaN and Inf become None."""
-    if math.isfinite(value):
-        return float(value)
-    return None
+@timed_stage("serialization")
+def radiance_to_json(matrix) -> list[list[float | None]]:
+    """
+    Convierte la matriz de radianza a listas anidadas serializables a JSON (NaN/Inf -> None)
+    con una sola pasada vectorizada. Las listas ya convertidas se devuelven tal cual.
+    """
+    if not isinstance(matrix, np.ndarray):
+        return matrix
+    values = matrix.astype(np.float64).astype(object)
+    values[~np.isfinite(matrix)] = None
+    return values.tolist()
+
+
+@timed_stage("serialization")
+def mask_to_json(mask) -> list[list[int]]:
+    """Convierte la máscara del municipio a listas anidadas de 0/1."""
+    if not isinstance(mask, np.ndarray):
+        return mask
+    return mask.astype(np.int64).tolist()
+
+
+def _valid_pixel_arrays(
+    coordenadas_pixeles, shape: tuple[int, ...]
+) -> tuple[np.ndarray, np.ndarray]:
+    """Devuelve (xs, ys) de las coordenadas (x, y) que caen dentro de una imagen de forma `shape`."""
+    coords = np.asarray(coordenadas_pixeles, dtype=np.int64).reshape(-1, 2)
+    xs, ys = coords[:, 0], coords[:, 1]
+    valid = (ys >= 0) & (ys < shape[0]) & (xs >= 0) & (xs < shape[1])
+    return xs[valid], ys[valid]
+
+
+def read_window(
+    dataset,
+    min_x: int,
+    max_x: int,
+    min_y: int,
+    max_y: int,
+    margin: int = 0,
+) -> tuple[np.ndarray, int, int]:
+    """
+    Lee del dataset HDF5 solo la ventana [min_y, max_y] x [min_x, max_x] (inclusive) más un margen.
+    h5py traduce el slice a un hyperslab, así que solo se descomprimen los chunks que lo intersectan
+    en lugar de la malla completa de 2400x2400.
+    Devuelve (ventana, x0, y0), donde (x0, y0) es el origen de la ventana en la imagen completa.
+    """
+    rows, cols = dataset.shape[:2]
+    y0 = max(int(min_y) - margin, 0)
+    y1 = min(int(max_y) + margin + 1, rows)
+    x0 = max(int(min_x) - margin, 0)
+    x1 = min(int(max_x) + margin + 1, cols)
+    with timed("dataset_read"):
+        return np.asarray(dataset[y0:y1, x0:x1]), x0, y0
+
+
+@timed_stage("mask")
+def municipality_window(
+    coordenadas_pixeles, shape: tuple[int, int] = (TILE_SIZE, TILE_SIZE)
+) -> tuple[dict[str, int], np.ndarray] | None:
+    """
+    Bounding box y máscara binaria (uint8) del municipio calculadas solo a partir de sus
+    coordenadas, sin abrir ningún gránulo. Sirve para varias fechas del mismo cuadrante.
+    Devuelve None si ninguna coordenada cae dentro de un cuadrante de forma `shape`.
+    """
+    xs, ys = _valid_pixel_arrays(coordenadas_pixeles, shape)
+    if len(xs) == 0:
+        return None
+    min_x, max_x = int(xs.min()), int(xs.max())
+    min_y, max_y = int(ys.min()), int(ys.max())
+    mask = np.zeros((max_y - min_y + 1, max_x - min_x + 1), dtype=np.uint8)
+    mask[ys - min_y, xs - min_x] = 1
+    return {"min_x": min_x, "max_x": max_x, "min_y": min_y, "max_y": max_y}, mask
+
+
+def _looks_like_html(start: bytes) -> bool:
+    return b"<html" in start or b"<!DOCTYPE html" in start
+
+
+def open_granule(source: str | bytes) -> h5py.File | None:
+    """
+    Abre un gránulo desde una ruta o desde los bytes ya descargados (archivo en memoria vía
+    `io.BytesIO`, sin tocar el disco). Devuelve None si no existe o si es una página HTML.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        if _looks_like_html(bytes(source[:15])):
+            print("Contenido HTML recibido en vez de HDF5")
+            return None
+        with timed("hdf5_open"):
+            return h5py.File(io.BytesIO(source), "r")
+
+    if not os.path.exists(source):
+        print(f"Archivo no encontrado: {source}")
+        return None
+    with open(source, "rb") as f:
+        if _looks_like_html(f.read(15)):
+            print(f"Archivo HTML recibido en vez de HDF5: {source}")
+            return None
+    with timed("hdf5_open"):
+        return h5py.File(source, "r")
+
+
+def read_radiance_window(source: str | bytes, bbox: dict[str, int]) -> np.ndarray | None:
+    """
+    Lee del gránulo (ruta o bytes en memoria) solo la ventana `bbox` de radianza, como float32.
+    La ventana se recorta a la imagen, así que puede ser menor que el bbox en los bordes.
+    Devuelve None si el gránulo no se puede abrir o leer.
+    """
+    label = source if isinstance(source, str) else f"<{len(source)} bytes en memoria>"
+    try:
+        hdf_file = open_granule(source)
+        if hdf_file is None:
+            return None
+        with hdf_file:
+            dataset = hdf_file[find_image_path(hdf_file)]
+            window, _, _ = read_window(dataset, **bbox)
+            return window.astype(np.float32, copy=False)
+    except Exception as e:
+        print(f"Error leyendo ventana de {label}: {e}")
+        return None
 
 
 def extract_radiance_matrix(
-    downloaded_path: str,
+    source: str | bytes,
     coordenadas_pixeles: list[tuple[int, int]],
     date_obj: date,
     municipio: str,
 ) -> dict[str, Any] | None:
     """
     Extrae la submatriz de radianza y la máscara binaria del municipio, recortadas al bounding box.
+    `source` es la ruta del gránulo o su contenido en memoria (ver `open_granule`).
     Devuelve dict con radiance_matrix, municipality_mask, bbox, rows, cols, municipio, fecha.
+    La radianza se devuelve como arreglo float32 (NaN/Inf se conservan) y la máscara como uint8;
+    la conversión a JSON se hace solo si el cliente la pide (ver `radiance_to_json`).
     """
-    if not os.path.exists(downloaded_path):
-        print(f"Archivo no encontrado: {downloaded_path}")
-        return None
-
+    label = source if isinstance(source, str) else f"<{len(source)} bytes en memoria>"
     try:
-        with open(downloaded_path, "rb") as f:
-            start = f.read(15)
-            if b"<html" in start or b"<!DOCTYPE html" in start:
-                print(f"Archivo HTML recibido en vez de HDF5: {downloaded_path}")
-                return None
+        hdf_file = open_granule(source)
+        if hdf_file is None:
+            return None
 
-        with h5py.File(downloaded_path, "r") as hdf_file:
+        with hdf_file:
             radiance_path = find_image_path(hdf_file)
-            image_matrix = hdf_file[radiance_path][()]
+            dataset = hdf_file[radiance_path]
 
             # Filtrar coordenadas válidas dentro de la imagen
-            coordenadas_validas = [
-                (x, y)
-                for x, y in coordenadas_pixeles
-                if 0 <= y < image_matrix.shape[0] and 0 <= x < image_matrix.shape[1]
-            ]
+            xs, ys = _valid_pixel_arrays(coordenadas_pixeles, dataset.shape)
 
-            if len(coordenadas_validas) == 0:
+            if len(xs) == 0:
                 print(
                     f"No se encontraron coordenadas válidas para {municipio} en {date_obj}"
                 )
                 return None
 
             # Bounding box
-            min_x = min(x for x, _ in coordenadas_validas)
-            max_x = max(x for x, _ in coordenadas_validas)
-            min_y = min(y for _, y in coordenadas_validas)
-            max_y = max(y for _, y in coordenadas_validas)
+            min_x, max_x = int(xs.min()), int(xs.max())
+            min_y, max_y = int(ys.min()), int(ys.max())
 
-            # Submatriz de radianza recortada al bounding box
-            submatrix = image_matrix[min_y : max_y + 1, min_x : max_x + 1]
+            # Submatriz de radianza recortada al bounding box (solo se lee esa ventana)
+            submatrix, _, _ = read_window(dataset, min_x, max_x, min_y, max_y)
             rows, cols = submatrix.shape
 
             # Máscara binaria: 1 = municipio, 0 = no municipio
-            mask = np.zeros((rows, cols), dtype=int)
-            for x, y in coordenadas_validas:
-                mask[y - min_y, x - min_x] = 1
-
-            # Convertir a listas anidadas con NaN/Inf -> None
-            radiance_list: list[list[float | None]] = [
-                [_float_to_json_safe(float(v)) for v in row] for row in submatrix
-            ]
-            mask_list: list[list[int]] = [list(row) for row in mask]
+            with timed("mask"):
+                mask = np.zeros((rows, cols), dtype=np.uint8)
+                mask[ys - min_y, xs - min_x] = 1
 
             return {
                 "municipio": municipio,
@@ -81,11 +181,11 @@ def extract_radiance_matrix(
                 "bbox": {"min_x": min_x, "max_x": max_x, "min_y": min_y, "max_y": max_y},
                 "rows": rows,
                 "cols": cols,
-                "radiance_matrix": radiance_list,
-                "municipality_mask": mask_list,
+                "radiance_matrix": submatrix.astype(np.float32, copy=False),
+                "municipality_mask": mask,
             }
     except Exception as e:
-        print(f"Error extrayendo matriz de {downloaded_path}: {e}")
+        print(f"Error extrayendo matriz de {label}: {e}")
         return None
 
 
@@ -101,48 +201,48 @@ def process_image(downloaded_path, coordendas_pixeles, date_obj, municipio, dele
                 print(f"Archivo HTML recibido en vez de HDF5: {downloaded_path}")
                 return None
         
-        with h5py.File(downloaded_path, "r") as hdf_file:
+        with timed("hdf5_open"):
+            hdf_file = h5py.File(downloaded_path, "r")
+        with hdf_file:
             radiance_path = find_image_path(hdf_file)
-            image_matrix = hdf_file[radiance_path][()]
-            copia = np.clip(image_matrix.copy(), 0, np.percentile(image_matrix, 99))
+            dataset = hdf_file[radiance_path]
 
             # Filtrar coordenadas válidas
-            coordenadas_validas = [
-                (x, y) for x, y in coordendas_pixeles
-                if 0 <= y < image_matrix.shape[0] and 0 <= x < image_matrix.shape[1]
-            ]
+            xs, ys = _valid_pixel_arrays(coordendas_pixeles, dataset.shape)
             
             # Verificar que tenemos coordenadas válidas
-            if len(coordenadas_validas) == 0:
+            if len(xs) == 0:
                 print(f"⚠️ No se encontraron coordenadas válidas para {municipio} en {date_obj}")
                 print(f"   - Total coordenadas: {len(coordendas_pixeles)}")
-                print(f"   - Dimensiones imagen: {image_matrix.shape}")
-                print(f"   - Rango X: [0, {image_matrix.shape[1]-1}]")
-                print(f"   - Rango Y: [0, {image_matrix.shape[0]-1}]")
+                print(f"   - Dimensiones imagen: {dataset.shape}")
+                print(f"   - Rango X: [0, {dataset.shape[1]-1}]")
+                print(f"   - Rango Y: [0, {dataset.shape[0]-1}]")
                 return None
             
-            # Extraer píxeles válidos
-            pixeles_imagen = [image_matrix[y, x] for x, y in coordenadas_validas]
+            # Leer solo la ventana del municipio y extraer píxeles válidos
+            window, x0, y0 = read_window(dataset, xs.min(), xs.max(), ys.min(), ys.max())
+            pixeles_imagen = window[ys - y0, xs - x0]
             
             # Informar sobre coordenadas filtradas
-            if len(coordenadas_validas) < len(coordendas_pixeles):
-                print(f"ℹ️ Filtradas {len(coordendas_pixeles) - len(coordenadas_validas)} coordenadas inválidas para {municipio}")
-                print(f"   - Coordenadas válidas: {len(coordenadas_validas)}")
+            if len(xs) < len(coordendas_pixeles):
+                print(f"ℹ️ Filtradas {len(coordendas_pixeles) - len(xs)} coordenadas inválidas para {municipio}")
+                print(f"   - Coordenadas válidas: {len(xs)}")
                 print(f"   - Coordenadas totales: {len(coordendas_pixeles)}")
 
-            datos = MedicionResultado(
-                Fecha=date_obj,
-                Municipio=municipio,
-                Cantidad_de_pixeles=len(pixeles_imagen),
-                Suma_de_radianza=float(np.sum(pixeles_imagen)),
-                Media_de_radianza=float(np.mean(pixeles_imagen)),
-                Desviacion_estandar_de_radianza=float(np.std(pixeles_imagen)),
-                Maximo_de_radianza=float(np.max(pixeles_imagen)),
-                Minimo_de_radianza=float(np.min(pixeles_imagen)),
-                Percentil_25_de_radianza=float(np.percentile(pixeles_imagen, 25)),
-                Percentil_50_de_radianza=float(np.percentile(pixeles_imagen, 50)),
-                Percentil_75_de_radianza=float(np.percentile(pixeles_imagen, 75)),
-            )
+            with timed("statistics"):
+                datos = MedicionResultado(
+                    Fecha=date_obj,
+                    Municipio=municipio,
+                    Cantidad_de_pixeles=len(pixeles_imagen),
+                    Suma_de_radianza=float(np.sum(pixeles_imagen)),
+                    Media_de_radianza=float(np.mean(pixeles_imagen)),
+                    Desviacion_estandar_de_radianza=float(np.std(pixeles_imagen)),
+                    Maximo_de_radianza=float(np.max(pixeles_imagen)),
+                    Minimo_de_radianza=float(np.min(pixeles_imagen)),
+                    Percentil_25_de_radianza=float(np.percentile(pixeles_imagen, 25)),
+                    Percentil_50_de_radianza=float(np.percentile(pixeles_imagen, 50)),
+                    Percentil_75_de_radianza=float(np.percentile(pixeles_imagen, 75)),
+                )
         
         return datos
     
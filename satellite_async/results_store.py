@@ -0,0 +1,113 @@
+"""
+Resultados ya calculados, para ejecuciones incrementales.
+
+Cada medición se guarda en SQLite por (municipio, fecha, cuadrante, colección, versión del
+algoritmo). Antes de descargar, el pipeline pregunta qué pares (municipio, fecha) faltan para
+la versión actual y solo procesa esos; cambiar la versión del algoritmo invalida lo anterior.
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import date
+from typing import Iterable
+
+from .config import COLLECTION, RESULTS_DB_PATH
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mediciones (
+    municipio TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    cuadrante TEXT NOT NULL,
+    coleccion TEXT NOT NULL,
+    version TEXT NOT NULL,
+    datos TEXT,
+    PRIMARY KEY (municipio, fecha, cuadrante, coleccion, version)
+)
+"""
+
+
+class ResultsStore:
+    """
+    Almacén SQLite de mediciones. `datos` es el JSON de la medición, o NULL si la fecha se
+    procesó pero el municipio no tuvo píxeles válidos (así tampoco se vuelve a descargar).
+    """
+
+    def __init__(self, path: str = RESULTS_DB_PATH, collection: str = COLLECTION):
+        self.path = path
+        self.collection = str(collection)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(_SCHEMA)
+
+    def lookup(
+        self,
+        cuadrantes: dict[str, str],
+        fechas: Iterable[date],
+        version: str,
+    ) -> dict[tuple[str, date], dict | None]:
+        """
+        Resultados guardados para los municipios ({municipio: cuadrante}) y fechas pedidos con
+        la versión `version`. Devuelve {(municipio, fecha): datos o None}; los pares ausentes
+        son los que faltan por calcular.
+        """
+        fechas = {f.isoformat(): f for f in fechas}
+        if not cuadrantes or not fechas:
+            return {}
+        municipios = list(cuadrantes)
+        query = (
+            "SELECT municipio, fecha, cuadrante, datos FROM mediciones "
+            "WHERE coleccion = ? AND version = ? AND fecha BETWEEN ? AND ? "
+            f"AND municipio IN ({', '.join('?' * len(municipios))})"
+        )
+        params = [self.collection, version, min(fechas), max(fechas), *municipios]
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        found = {}
+        for municipio, fecha, cuadrante, datos in rows:
+            if fecha in fechas and cuadrantes.get(municipio) == cuadrante:
+                found[(municipio, fechas[fecha])] = json.loads(datos) if datos is not None else None
+        return found
+
+    def save(
+        self,
+        items: Iterable[tuple[str, date, str, dict | None]],
+        version: str,
+    ) -> None:
+        """Guarda (o reemplaza) mediciones [(municipio, fecha, cuadrante, datos o None), ...]."""
+        rows = [
+            (
+                municipio,
+                fecha.isoformat(),
+                cuadrante,
+                self.collection,
+                version,
+                json.dumps(datos, default=str) if datos is not None else None,
+            )
+            for municipio, fecha, cuadrante, datos in items
+        ]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO mediciones VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_store: ResultsStore | None = None
+
+
+def get_results_store() -> ResultsStore:
+    """Instancia del almacén compartida por el proceso."""
+    global _default_store
+    if _default_store is None:
+        _default_store = ResultsStore()
+    return _default_store
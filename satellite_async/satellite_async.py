@@ -2,13 +2,38 @@ import asyncio
 import pandas as pd
 import os
 import glob
-from typing import Callable
+import weakref
+from typing import AsyncIterator, Callable, NamedTuple
 
-from .config import PIXELES_MUNICIPIOS
+from .config import (
+    ALGORITHM_VERSION,
+    LIMIT_PER_HOST,
+    MAX_DOWNLOADS,
+    MAX_PROCESSING,
+    PIXELES_MUNICIPIOS,
+    RESULTS_DATASET_DIR,
+    RESULTS_FLUSH_ROWS,
+)
 from .utils import normalize_municipio, parse_date, load_coord_data
-from .downloader import find_file, download_file
-from .processing import process_image
+from .cache import get_granule_cache
+from .downloader import fetch_granule, find_files
+from .workers import run_cpu
+from .zonal import build_label_rasters, measure_granule
 from .models import MedicionResultado
+from .dataset import ResultsDatasetWriter
+from .checkpoint import CheckpointJournal
+from .results_store import ResultsStore, get_results_store
+
+class LoteMediciones(NamedTuple):
+    """
+    Resultados producidos por `SatelliteImagesAsync.iter_measures`. `origen` es "calculado"
+    (una fecha procesada ahora), "bitacora" (unidades completadas antes de reanudar) o
+    "almacen" (resultados ya guardados, en modo incremental); en los dos últimos `fecha` es None.
+    """
+    fecha: str | None
+    filas: list[dict]
+    origen: str
+
 
 def chunk_list(lst, chunk_size):
     """Divide una lista en chunks del tamaño especificado"""
@@ -26,234 +51,424 @@ def cleanup_temp_files():
             except Exception as e:
                 print(f"Error eliminando archivo residual {file_path}: {e}")
 
-def save_progress(df, municipio, chunk_number=None):
-    """Guarda el progreso actual en Parquet"""
+def save_progress(rows, root=None):
+    """
+    Agrega las filas nuevas al dataset Parquet particionado (municipio=/year=/), por defecto
+    en VNP46A1_RESULTS_DATASET. Solo se escriben las filas recibidas; lo guardado antes no se
+    reescribe.
+    """
     try:
-        # Crear directorio si no existe
-        os.makedirs("../data", exist_ok=True)
-        
-        # Nombre del archivo con información del chunk
-        if chunk_number is not None:
-            filename = f"../data/{municipio}_progress_chunk_{chunk_number}.parquet"
-        else:
-            filename = f"../data/{municipio}_progress.parquet"
-        
-        # Guardar Parquet
-        df.to_parquet(filename, index=False)
-        print(f"✅ Progreso guardado: {filename} ({len(df)} registros)")
-        return filename
+        return ResultsDatasetWriter(root or RESULTS_DATASET_DIR).append(rows)
     except Exception as e:
         print(f"❌ Error guardando progreso: {e}")
-        return None
-
-async def process_chunks(satellite_instance, fechas, chunks, session, municipio):
-    """Procesa las fechas en chunks de forma asíncrona con guardado progresivo"""
-    results = []
-    fechas_chunks = chunk_list(fechas, chunks)
-    
-    for i, chunk_fechas in enumerate(fechas_chunks):
-        print(f"Procesando chunk {i+1}/{len(fechas_chunks)} con {len(chunk_fechas)} fechas")
-        
-        try:
-            # Procesar el chunk actual de forma asíncrona
-            tasks = [satellite_instance.get_measures(session, f) for f in chunk_fechas]
-            chunk_results = []
-            
-            for result in asyncio.as_completed(tasks):
-                datos = await result
-                if datos:
-                    chunk_results.append(datos.model_dump())
-            
-            # Agregar resultados del chunk actual
-            results.extend(chunk_results)
-            print(f"Chunk {i+1} completado. Resultados obtenidos: {len(chunk_results)}")
-            
-            # Guardar progreso después de cada chunk
-            if chunk_results:
-                temp_df = pd.DataFrame(results)
-                save_progress(temp_df, municipio, i+1)
-            
-        except Exception as e:
-            print(f"❌ Error procesando chunk {i+1}: {e}")
-            # Guardar progreso hasta el momento en caso de error
-            if results:
-                temp_df = pd.DataFrame(results)
-                save_progress(temp_df, municipio, f"error_chunk_{i+1}")
-            raise e
-    
-    return results
+        return []
 
 class SatelliteImagesAsync:
     """
     Class for get the measures of the satellite images for multiple municipalities
     """
     
-    def __init__(self, municipios):
+    def __init__(
+        self,
+        municipios,
+        max_downloads: int = MAX_DOWNLOADS,
+        max_processing: int = MAX_PROCESSING,
+        limit_per_host: int = LIMIT_PER_HOST,
+    ):
         """
         Inicializa con una lista de municipios
         
         Args:
             municipios: Lista de nombres de municipios o string único
+            max_downloads: Máximo de gránulos descargándose a la vez
+            max_processing: Máximo de gránulos procesándose (HDF5 + estadísticas) a la vez
+            limit_per_host: Máximo de conexiones simultáneas por host en el TCPConnector
         """
         if isinstance(municipios, str):
             municipios = [municipios]
         
         self.municipios = [normalize_municipio(m) for m in municipios]
         self.coord_data_dict = {}
-        self.cache_h5_files = {}  # Cache para archivos H5 ya descargados
         
         # Cargar datos de coordenadas para todos los municipios
         for municipio in self.municipios:
             self.coord_data_dict[municipio] = load_coord_data(municipio, PIXELES_MUNICIPIOS)
+
+        # Rasters de etiquetas precalculados (uno por cuadrante)
+        self.label_rasters = build_label_rasters(self.coord_data_dict)
+
+        # Límites de concurrencia: descargas y procesamiento se acotan por separado
+        self.max_downloads = max_downloads
+        self.max_processing = max_processing
+        self.limit_per_host = limit_per_host
+        # Un par de semáforos por event loop: la instancia puede usarse en varios `asyncio.run`
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+        # Bytes descargados en la ejecución actual (ver `on_download` en `run`)
+        self.bytes_downloaded = 0
+        self._on_download: Callable[[int], None] | None = None
+        # Almacén de resultados cuando la ejecución es incremental (ver `run`)
+        self._results_store: ResultsStore | None = None
+        # Bitácora de checkpoints cuando la ejecución tiene job_id (ver `run` y `resume`)
+        self._journal: CheckpointJournal | None = None
         
         print(f"✅ Inicializado con {len(self.municipios)} municipios: {', '.join(self.municipios)}")
 
+    def _limits(self) -> tuple[asyncio.Semaphore, asyncio.Semaphore]:
+        """Semáforos (descargas, procesamiento) del event loop en curso."""
+        loop = asyncio.get_running_loop()
+        limits = self._semaphores.get(loop)
+        if limits is None:
+            limits = self._semaphores[loop] = (
+                asyncio.Semaphore(self.max_downloads),
+                asyncio.Semaphore(self.max_processing),
+            )
+        return limits
+
+    async def _prefetch_listings(self, session, fechas):
+        """Resuelve en una sola pasada los listados de LAADS de todo el rango de fechas"""
+        dias = []
+        for fecha in fechas:
+            year, day, _ = parse_date(fecha)
+            dias.append((year, day))
+        cuadrantes = {coord_data.cuadrante for coord_data in self.coord_data_dict.values()}
+        for cuadrante in cuadrantes:
+            try:
+                await find_files(session, dias, cuadrante)
+            except Exception as e:
+                # Si falla, cada fecha vuelve a intentar su listado individualmente
+                print(f"⚠️ Error precargando listados para {cuadrante}: {e}")
+
     async def _download_and_cache_h5(self, session, year, day, cuadrante, date_obj):
-        """Descarga un archivo H5 y lo cachea para reutilización"""
-        cache_key = f"{year}_{day}_{cuadrante}"
-        
-        if cache_key in self.cache_h5_files:
-            print(f"✅ Usando archivo H5 cacheado: {cache_key}")
-            return self.cache_h5_files[cache_key]
-        
-        # Buscar y descargar el archivo
-        print(f"🔍 Buscando archivo H5 para: {year}-{day} ({cuadrante})")
-        h5_url = await find_file(session, year, day, cuadrante)
-        if not h5_url:
-            print(f"❌ No se encontró archivo H5 para: {year}-{day} ({cuadrante})")
-            return None
-            
-        save_path = f"../temp/{date_obj}_{cuadrante}.h5"
-        print(f"📥 Descargando: {h5_url} -> {save_path}")
-        downloaded_path = await download_file(session, h5_url, save_path)
-        
-        if downloaded_path:
-            self.cache_h5_files[cache_key] = downloaded_path
-            print(f"✅ Archivo H5 descargado y cacheado: {cache_key}")
-            return downloaded_path
-        else:
-            print(f"❌ Error descargando archivo H5: {h5_url}")
-        
-        return None
+        """
+        Obtiene el archivo H5 desde la caché persistente de gránulos (descargándolo si falta).
+        El gránulo queda fijado en la caché; hay que liberarlo con `unpin` tras leerlo.
+        """
+        recibidos_granulo = 0
+
+        def _on_bytes(recibidos: int, total: int | None) -> None:
+            nonlocal recibidos_granulo
+            self.bytes_downloaded += recibidos - recibidos_granulo
+            recibidos_granulo = recibidos
+            if self._on_download is not None:
+                self._on_download(self.bytes_downloaded)
+
+        async with self._limits()[0]:
+            return await fetch_granule(session, year, day, cuadrante, pin=True, on_bytes=_on_bytes)
 
-    async def get_measures_for_date(self, session, date_str):
-        """Obtiene medidas para todos los municipios en una fecha específica"""
+    async def get_measures_for_date(self, session, date_str, municipios=None):
+        """
+        Obtiene medidas para todos los municipios (o solo `municipios`) en una fecha específica.
+        En modo incremental guarda cada resultado en el almacén de resultados, y con bitácora
+        registra el estado de cada unidad (fecha, cuadrante).
+        """
         year, day, date_obj = parse_date(date_str)
         results = []
         
-        # Agrupar municipios por cuadrante para optimizar descargas
-        municipios_por_cuadrante = {}
-        for municipio in self.municipios:
-            coord_data = self.coord_data_dict[municipio]
-            cuadrante = coord_data.cuadrante
-            if cuadrante not in municipios_por_cuadrante:
-                municipios_por_cuadrante[cuadrante] = []
-            municipios_por_cuadrante[cuadrante].append({
-                'nombre': municipio,
-                'coordenadas_pixeles': coord_data.coordenadas_pixeles
-            })
-        
-        # Procesar cada cuadrante
-        for cuadrante, municipios_in_cuadrante in municipios_por_cuadrante.items():
-            # Descargar archivo H5 una sola vez para todos los municipios del cuadrante
-            h5_path = await self._download_and_cache_h5(session, year, day, cuadrante, date_obj)
+        # Un raster de etiquetas por cuadrante: una descarga y una lectura por cuadrante
+        for cuadrante, raster in self.label_rasters.items():
+            names = raster.names if municipios is None else [n for n in raster.names if n in municipios]
+            if not names:
+                continue
+            if self._journal is not None:
+                self._journal.running(date_str, cuadrante)
+            try:
+                h5_path = await self._download_and_cache_h5(session, year, day, cuadrante, date_obj)
+            except Exception as e:
+                if self._journal is not None:
+                    self._journal.failed(date_str, cuadrante, str(e))
+                raise
             if not h5_path:
+                if self._journal is not None:
+                    self._journal.failed(date_str, cuadrante, "No se pudo obtener el gránulo")
                 continue
             
-            # Procesar cada municipio con el mismo archivo H5
-            for municipio_data in municipios_in_cuadrante:
-                try:
-                    datos = process_image(
-                        h5_path, 
-                        municipio_data['coordenadas_pixeles'], 
-                        date_obj, 
-                        municipio_data['nombre'],
-                        delete_file=False  # No eliminar el archivo hasta procesar todos los municipios
-                    )
-                    if datos:
-                        results.append(datos.model_dump())
-                        print(f"✅ Procesado: {municipio_data['nombre']} - {date_obj}")
-                    else:
-                        print(f"⚠️ Sin datos para: {municipio_data['nombre']} - {date_obj}")
-                except Exception as e:
-                    print(f"❌ Error procesando {municipio_data['nombre']} para {date_obj}: {e}")
-            
-            # Eliminar el archivo H5 después de procesar todos los municipios del cuadrante
+            # Estadísticas de todos los municipios del cuadrante en una sola pasada
             try:
-                if os.path.exists(h5_path):
-                    os.remove(h5_path)
-                    print(f"Archivo eliminado después de procesar todos los municipios: {h5_path}")
+                with get_granule_cache().leased(h5_path):
+                    async with self._limits()[1]:
+                        mediciones = await run_cpu(measure_granule, h5_path, raster, date_obj, names)
             except Exception as e:
-                print(f"Error eliminando archivo {h5_path}: {e}")
-        
+                print(f"❌ Error procesando {', '.join(names)} para {date_obj}: {e}")
+                if self._journal is not None:
+                    self._journal.failed(date_str, cuadrante, str(e))
+                continue
+            for datos in mediciones:
+                results.append(datos.model_dump())
+                print(f"✅ Procesado: {datos.Municipio} - {date_obj}")
+
+            if self._results_store is not None:
+                # Los municipios sin píxeles válidos se guardan como None para no reintentarlos
+                por_municipio = {m.Municipio: m.model_dump(mode="json") for m in mediciones}
+                self._results_store.save(
+                    [(n, date_obj, cuadrante, por_municipio.get(n)) for n in names],
+                    ALGORITHM_VERSION,
+                )
+            if self._journal is not None:
+                self._journal.done(
+                    date_str,
+                    cuadrante,
+                    [m.model_dump(mode="json") for m in mediciones],
+                    names,
+                )
+
         return results
 
-    async def run(self, fechas, chunks=None, save_progress_enabled=True, on_progress: Callable[[str], None] | None = None):
-        results = []
+    def _plan_resume(self, fechas, journal_state):
+        """
+        Compara las fechas con la bitácora de una ejecución anterior.
+        Devuelve (filas de las unidades completadas, {fecha: municipios que faltan o None}).
+        """
+        restored_rows, pendientes = [], {}
+        for fecha in fechas:
+            faltan = []
+            for cuadrante, raster in self.label_rasters.items():
+                if not journal_state.completed(fecha, cuadrante):
+                    faltan.extend(raster.names)
+                    continue
+                # La unidad pudo completarse solo para algunos municipios (p. ej. el resto venía del memo de la API)
+                medidos = journal_state.measured(fecha, cuadrante)
+                faltan.extend(n for n in raster.names if medidos is not None and n not in medidos)
+                restored_rows.extend(
+                    MedicionResultado.model_validate(row).model_dump()
+                    for row in journal_state.filas[(fecha, cuadrante)]
+                    if row.get("Municipio") in raster.names
+                )
+            if len(faltan) == len(self.municipios):
+                pendientes[fecha] = None
+            elif faltan:
+                pendientes[fecha] = faltan
+        return restored_rows, pendientes
+
+    def _plan_incremental(self, pendientes, store: ResultsStore):
+        """
+        Compara las fechas pendientes ({fecha: municipios o None}) con el almacén de resultados.
+        Devuelve (filas ya calculadas, {fecha: municipios que faltan}) para la versión actual.
+        """
+        fechas_obj = {fecha: parse_date(fecha)[2] for fecha in pendientes}
+        cuadrantes = {m: c.cuadrante for m, c in self.coord_data_dict.items()}
+        guardados = store.lookup(cuadrantes, fechas_obj.values(), ALGORITHM_VERSION)
+
+        cached_rows, faltantes = [], {}
+        for fecha, date_obj in fechas_obj.items():
+            faltan = []
+            for municipio in pendientes[fecha] or self.municipios:
+                if (municipio, date_obj) not in guardados:
+                    faltan.append(municipio)
+                elif guardados[(municipio, date_obj)] is not None:
+                    cached_rows.append(
+                        MedicionResultado.model_validate(guardados[(municipio, date_obj)]).model_dump()
+                    )
+            if faltan:
+                faltantes[fecha] = faltan
+        return cached_rows, faltantes
+
+    def _prepare(self, fechas, chunks, incremental, job_id, journal_params=None):
+        """
+        Prepara la ejecución (bitácora de `job_id` y almacén de resultados si es incremental).
+        `journal_params` reemplaza los parámetros que se registran al crear la bitácora.
+        Devuelve (fechas por procesar, {fecha: municipios o None}, [(origen, filas previas)]).
+        """
+        self._results_store = get_results_store() if incremental else None
+        self._journal = CheckpointJournal(job_id) if job_id is not None else None
+
+        previos = []
+        pendientes = {fecha: None for fecha in fechas}
+        journal_state = self._journal.load() if self._journal is not None else None
+        if journal_state is not None:
+            restored_rows, pendientes = self._plan_resume(fechas, journal_state)
+            previos.append(("bitacora", restored_rows))
+            print(
+                f"⏯️ Reanudando {job_id}: {len(restored_rows)} resultados en la bitácora; "
+                f"{len(pendientes)}/{len(fechas)} fechas por procesar"
+            )
+        elif self._journal is not None:
+            self._journal.begin(
+                journal_params
+                or {"municipios": self.municipios, "fechas": list(fechas), "chunks": chunks, "incremental": incremental}
+            )
+        if self._results_store is not None:
+            total_pendientes = len(pendientes)
+            cached_rows, pendientes = self._plan_incremental(pendientes, self._results_store)
+            previos.append(("almacen", cached_rows))
+            print(
+                f"♻️ {len(cached_rows)} resultados ya calculados; "
+                f"{len(pendientes)}/{total_pendientes} fechas por procesar"
+            )
+        return [fecha for fecha in fechas if fecha in pendientes], pendientes, previos
+
+    async def _measures_with_date(self, session, date_str, municipios):
+        return date_str, await self.get_measures_for_date(session, date_str, municipios)
+
+    async def iter_measures(
+        self,
+        fechas,
+        chunks=None,
+        on_progress: Callable[[str], None] | None = None,
+        on_download: Callable[[int], None] | None = None,
+        incremental: bool = False,
+        job_id: str | None = None,
+        journal_params: dict | None = None,
+    ) -> AsyncIterator[LoteMediciones]:
+        """
+        Generador asíncrono con los resultados a medida que se producen: primero los que ya
+        estaban disponibles (bitácora de `job_id`, almacén de resultados si `incremental`) y
+        después un `LoteMediciones` por cada fecha en cuanto termina de procesarse.
+        Las opciones son las de `run`; `journal_params` son los parámetros que se registran en la
+        bitácora cuando esta ejecución es solo una parte del trabajo (p. ej. el hueco del memo de la API).
+        Si el consumidor deja de iterar, las fechas en curso se cancelan.
+        """
+        self.bytes_downloaded = 0
+        self._on_download = on_download
+        fechas, pendientes, previos = self._prepare(fechas, chunks, incremental, job_id, journal_params)
+        for origen, filas in previos:
+            if filas:
+                yield LoteMediciones(None, filas, origen)
+
         import aiohttp
         total_fechas = len(fechas)
         completed_count = 0
 
-        def _report_progress():
-            nonlocal completed_count
-            completed_count += 1
-            if on_progress is not None:
-                on_progress(f"{completed_count}/{total_fechas} fechas")
+        connector = aiohttp.TCPConnector(limit_per_host=self.limit_per_host)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await self._prefetch_listings(session, fechas)
+            # Flujo continuo: todas las fechas se programan a la vez y los semáforos acotan
+            # cuántas descargan y cuántas procesan. Con `chunks`, cada grupo espera al anterior.
+            grupos = [fechas] if chunks is None else chunk_list(fechas, chunks)
+            for i, grupo in enumerate(grupos):
+                if chunks is not None:
+                    print(f"Procesando chunk {i+1}/{len(grupos)} con {len(grupo)} fechas")
+                tasks = [
+                    asyncio.ensure_future(self._measures_with_date(session, f, pendientes[f]))
+                    for f in grupo
+                ]
+                chunk_count = 0
+                try:
+                    for result in asyncio.as_completed(tasks):
+                        fecha, datos_list = await result
+                        completed_count += 1
+                        chunk_count += len(datos_list)
+                        if on_progress is not None:
+                            on_progress(f"{completed_count}/{total_fechas} fechas")
+                        yield LoteMediciones(fecha, datos_list, "calculado")
+                except Exception as e:
+                    if chunks is not None:
+                        print(f"❌ Error procesando chunk {i+1}: {e}")
+                    raise
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                if chunks is not None:
+                    print(f"Chunk {i+1} completado. Resultados obtenidos: {chunk_count}")
+
+    async def run(
+        self,
+        fechas,
+        chunks=None,
+        save_progress_enabled: bool | None = None,
+        on_progress: Callable[[str], None] | None = None,
+        on_download: Callable[[int], None] | None = None,
+        incremental: bool = False,
+        job_id: str | None = None,
+    ):
+        """
+        Procesa todas las fechas. `on_progress` recibe el avance por fechas ("3/10 fechas") y
+        `on_download` el total de bytes descargados hasta el momento. Para recibir los
+        resultados a medida que se producen, usar `iter_measures`.
+
+        Con `incremental=True` solo se descargan y procesan los pares (municipio, fecha) que no
+        están en el almacén de resultados para la versión actual del algoritmo; el DataFrame
+        devuelto combina esos resultados nuevos con los ya guardados, ordenados por fecha.
+
+        Con `save_progress_enabled=True` las filas nuevas se agregan al dataset Parquet
+        particionado (ver `satellite_async.dataset`): después de cada chunk o, en flujo continuo,
+        cada VNP46A1_RESULTS_FLUSH_ROWS filas; lo pendiente se escribe también si hay un error.
+        Por omisión (None) solo se escribe cuando se procesa por chunks; en flujo continuo hay
+        que pedirlo explícitamente.
 
+        Con `job_id` el estado de cada unidad (fecha, cuadrante) se registra en una bitácora de
+        checkpoints (ver `satellite_async.checkpoint`). Si la bitácora ya existe, la ejecución la
+        continúa: las unidades completadas se toman de la bitácora y solo se procesan las demás.
+        """
+        if save_progress_enabled is None:
+            save_progress_enabled = chunks is not None
+        results = []
+        sin_guardar = []
+
+        def _flush_progress():
+            if save_progress_enabled and sin_guardar:
+                save_progress(list(sin_guardar))
+            sin_guardar.clear()
+
+        procesadas = 0
+        con_previos = False
         try:
-            async with aiohttp.ClientSession() as session:
+            async for lote in self.iter_measures(
+                fechas,
+                chunks=chunks,
+                on_progress=on_progress,
+                on_download=on_download,
+                incremental=incremental,
+                job_id=job_id,
+            ):
+                results.extend(lote.filas)
+                if lote.origen == "almacen":
+                    # Ya calculadas en una ejecución anterior; no se vuelven a escribir
+                    con_previos = True
+                    continue
+                # Si el proceso se detuvo antes de escribir las filas de la bitácora, faltan en
+                # el dataset; agregarlas de nuevo es inofensivo porque `read_results` deduplica
+                sin_guardar.extend(lote.filas)
+                if lote.origen == "bitacora":
+                    con_previos = True
+                    continue
+                procesadas += 1
                 if chunks is None:
-                    # Procesamiento original: todas las fechas de forma asíncrona
-                    tasks = [self.get_measures_for_date(session, f) for f in fechas]
-                    for result in asyncio.as_completed(tasks):
-                        datos_list = await result
-                        if datos_list:
-                            results.extend(datos_list)
-                        _report_progress()
-                else:
-                    # Procesamiento por chunks
-                    fechas_chunks = chunk_list(fechas, chunks)
-                    
-                    for i, chunk_fechas in enumerate(fechas_chunks):
-                        print(f"Procesando chunk {i+1}/{len(fechas_chunks)} con {len(chunk_fechas)} fechas")
-                        
-                        try:
-                            # Procesar el chunk actual de forma asíncrona
-                            tasks = [self.get_measures_for_date(session, f) for f in chunk_fechas]
-                            chunk_results = []
-                            
-                            for result in asyncio.as_completed(tasks):
-                                datos_list = await result
-                                if datos_list:
-                                    chunk_results.extend(datos_list)
-                            
-                            # Agregar resultados del chunk actual
-                            results.extend(chunk_results)
-                            for _ in chunk_fechas:
-                                _report_progress()
-                            print(f"Chunk {i+1} completado. Resultados obtenidos: {len(chunk_results)}")
-                            
-                            # Guardar progreso después de cada chunk
-                            if chunk_results and save_progress_enabled:
-                                temp_df = pd.DataFrame(results)
-                                save_progress(temp_df, "multi_municipio", i+1)
-                            
-                        except Exception as e:
-                            print(f"❌ Error procesando chunk {i+1}: {e}")
-                            # Guardar progreso hasta el momento en caso de error
-                            if results and save_progress_enabled:
-                                temp_df = pd.DataFrame(results)
-                                save_progress(temp_df, "error_chunk", i+1)
-                            raise e
+                    if len(sin_guardar) >= RESULTS_FLUSH_ROWS:
+                        _flush_progress()
+                elif procesadas % chunks == 0:
+                    # Agregar solo este chunk al dataset (sin reescribir los anteriores)
+                    _flush_progress()
+            # Filas que no alcanzaron RESULTS_FLUSH_ROWS o del último chunk
+            _flush_progress()
         except Exception as e:
             print(f"❌ Error durante el procesamiento: {e}")
-            # Guardar progreso hasta el momento en caso de error
-            if results and save_progress_enabled:
-                temp_df = pd.DataFrame(results)
-                save_progress(temp_df, "error_final", None)
+            # Guardar lo que aún no estaba en el dataset
+            _flush_progress()
             raise e
         finally:
             # Limpiar archivos residuales al final
             cleanup_temp_files()
-        
-        return pd.DataFrame(results)
\ No newline at end of file
+
+        df = pd.DataFrame(results)
+        if (incremental or con_previos) and not df.empty:
+            df = df.sort_values(["Fecha", "Municipio"], ignore_index=True)
+        return df
+
+    @classmethod
+    async def resume(
+        cls,
+        job_id: str,
+        save_progress_enabled: bool | None = None,
+        on_progress: Callable[[str], None] | None = None,
+        on_download: Callable[[int], None] | None = None,
+    ):
+        """
+        Reanuda la ejecución `job_id` a partir de su bitácora de checkpoints, con los mismos
+        municipios, fechas y opciones. Solo se procesan las unidades que no se completaron; los
+        gránulos que ya estaban descargados se toman de la caché.
+        """
+        journal_state = CheckpointJournal(job_id).load()
+        if journal_state is None:
+            raise FileNotFoundError(f"No hay bitácora de checkpoints para {job_id}")
+        params = journal_state.params
+        sat = cls(params["municipios"])
+        return await sat.run(
+            params["fechas"],
+            chunks=params.get("chunks"),
+            save_progress_enabled=save_progress_enabled,
+            on_progress=on_progress,
+            on_download=on_download,
+            incremental=params.get("incremental", False),
+            job_id=job_id,
+        )
\ No newline at end of file
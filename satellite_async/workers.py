@@ -0,0 +1,72 @@
+"""Ejecución de las etapas CPU (decodificación HDF5 y estadísticas) fuera del event loop."""
+import asyncio
+import contextvars
+import functools
+import threading
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from .config import CPU_EXECUTOR, CPU_MAX_PENDING, CPU_WORKERS
+from .metrics import get_metrics, timed
+
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+# Un semáforo de backpressure por event loop (la API y los scripts pueden usar loops distintos)
+_pending: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _create_executor(kind: str, workers: int) -> Executor:
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vnp46a1-cpu")
+    raise ValueError(f"Tipo de executor no soportado: {kind!r} (usa 'thread' o 'process')")
+
+
+def get_cpu_executor() -> Executor:
+    """Executor compartido del proceso (configurable con VNP46A1_CPU_EXECUTOR / VNP46A1_CPU_WORKERS)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = _create_executor(CPU_EXECUTOR, CPU_WORKERS)
+        return _executor
+
+
+def configure_cpu_executor(kind: str = CPU_EXECUTOR, workers: int = CPU_WORKERS) -> Executor:
+    """Reemplaza el executor compartido (el anterior termina sus tareas en segundo plano)."""
+    global _executor
+    new_executor = _create_executor(kind, workers)
+    with _executor_lock:
+        old, _executor = _executor, new_executor
+    if old is not None:
+        old.shutdown(wait=False)
+    return new_executor
+
+
+def shutdown_cpu_executor() -> None:
+    """Cierra el executor compartido (por ejemplo al apagar la API)."""
+    global _executor
+    with _executor_lock:
+        old, _executor = _executor, None
+    if old is not None:
+        old.shutdown(wait=True)
+
+
+async def run_cpu(func, *args):
+    """
+    Ejecuta `func(*args)` en el executor compartido con `run_in_executor`.
+    Como backpressure, cada event loop tiene como máximo VNP46A1_CPU_MAX_PENDING tareas
+    enviadas al executor; las demás esperan aquí sin bloquear el loop.
+    Con métricas activas, en el executor de hilos la función corre con el contexto del
+    llamador para que sus etapas se atribuyan al job en curso.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _pending.get(loop)
+    if semaphore is None:
+        semaphore = _pending[loop] = asyncio.Semaphore(CPU_MAX_PENDING)
+    executor = get_cpu_executor()
+    if get_metrics().enabled and isinstance(executor, ThreadPoolExecutor):
+        func = functools.partial(contextvars.copy_context().run, func)
+    async with semaphore:
+        with timed("cpu"):
+            return await loop.run_in_executor(executor, func, *args)
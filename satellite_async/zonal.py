@@ -0,0 +1,164 @@
+"""
+Estadísticas zonales vectorizadas.
+
+En lugar de abrir el HDF5 y recorrer los píxeles una vez por municipio, se precalcula un raster
+int16 de etiquetas por cuadrante (una etiqueta por municipio) y todas las estadísticas de una
+fecha se obtienen con una sola lectura de la ventana y operaciones agrupadas de NumPy.
+"""
+from datetime import date
+
+import h5py
+import numpy as np
+
+from .config import find_image_path
+from .metrics import timed, timed_stage
+from .models import CoordenadasPixeles, MedicionResultado
+from .processing import read_window
+
+SIN_ETIQUETA = -1
+PERCENTILES = (25, 50, 75)
+
+
+class LabelRaster:
+    """
+    Raster de etiquetas de los municipios de un cuadrante, recortado al bounding box que los
+    contiene a todos. Cada píxel guarda el índice del municipio en `names` o -1.
+    """
+
+    @timed_stage("mask")
+    def __init__(self, cuadrante: str, coordenadas: dict[str, list[tuple[int, int]]]):
+        self.cuadrante = cuadrante
+        self.names = list(coordenadas)
+        arrays = [np.asarray(c, dtype=np.int64).reshape(-1, 2) for c in coordenadas.values()]
+        todas = np.concatenate(arrays) if arrays else np.zeros((0, 2), dtype=np.int64)
+        if len(todas) == 0:
+            self.x0 = self.y0 = 0
+            self.labels = np.full((0, 0), SIN_ETIQUETA, dtype=np.int16)
+        else:
+            self.x0, self.y0 = (int(v) for v in todas.min(axis=0))
+            x1, y1 = (int(v) for v in todas.max(axis=0))
+            self.labels = np.full((y1 - self.y0 + 1, x1 - self.x0 + 1), SIN_ETIQUETA, dtype=np.int16)
+
+        # Bounding box (en coordenadas del cuadrante) de cada municipio
+        self.bboxes: dict[str, tuple[int, int, int, int] | None] = {}
+        for label, (name, coords) in enumerate(zip(self.names, arrays)):
+            if len(coords) == 0:
+                self.bboxes[name] = None
+                continue
+            xs, ys = coords[:, 0], coords[:, 1]
+            ocupados = self.labels[ys - self.y0, xs - self.x0] != SIN_ETIQUETA
+            if ocupados.any():
+                print(f"⚠️ {int(ocupados.sum())} píxeles de {name} ya pertenecían a otro municipio")
+            self.labels[ys - self.y0, xs - self.x0] = label
+            self.bboxes[name] = (int(xs.min()), int(xs.max()), int(ys.min()), int(ys.max()))
+
+    def window_for(self, names: list[str]) -> tuple[int, int, int, int] | None:
+        """Bounding box (min_x, max_x, min_y, max_y) que cubre a los municipios pedidos."""
+        bboxes = [self.bboxes[n] for n in names if self.bboxes.get(n)]
+        if not bboxes:
+            return None
+        return (
+            min(b[0] for b in bboxes),
+            max(b[1] for b in bboxes),
+            min(b[2] for b in bboxes),
+            max(b[3] for b in bboxes),
+        )
+
+    def compute(self, dataset, date_obj: date, names: list[str] | None = None) -> list[MedicionResultado]:
+        """
+        Calcula las estadísticas de todos los municipios pedidos con una sola lectura de la
+        ventana del dataset. Los municipios sin píxeles válidos se omiten.
+        """
+        names = self.names if names is None else [n for n in names if n in self.names]
+        bbox = self.window_for(names)
+        if bbox is None:
+            return []
+        window, x0, y0 = read_window(dataset, *bbox)
+        if window.size == 0:
+            return []
+        rows, cols = window.shape
+        labels = self.labels[y0 - self.y0 : y0 - self.y0 + rows, x0 - self.x0 : x0 - self.x0 + cols]
+        ids = np.array([self.names.index(n) for n in names], dtype=np.int64)
+        return zonal_statistics(labels, window, ids, [self.names[i] for i in ids], date_obj)
+
+
+@timed_stage("statistics")
+def zonal_statistics(
+    labels: np.ndarray,
+    values: np.ndarray,
+    ids: np.ndarray,
+    names: list[str],
+    date_obj: date,
+) -> list[MedicionResultado]:
+    """
+    Estadísticas agrupadas por etiqueta en una sola pasada: sumas, conteos y sumas de cuadrados
+    con `np.bincount` (centradas en la media del grupo para estabilidad numérica) y percentiles
+    con interpolación lineal (como `np.percentile`) sobre los valores ordenados por grupo.
+    """
+    n_labels = int(ids.max()) + 1 if len(ids) else 0
+    lab = labels.ravel().astype(np.int64)
+    sel = lab >= 0
+    lab = lab[sel]
+    vals = values.ravel()[sel].astype(np.float64)
+
+    counts = np.bincount(lab, minlength=n_labels)
+    sums = np.bincount(lab, weights=vals, minlength=n_labels)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    sq = np.bincount(lab, weights=(vals - means[lab]) ** 2, minlength=n_labels)
+
+    order = np.lexsort((vals, lab))
+    sorted_vals = vals[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    results = []
+    for label, name in zip(ids, names):
+        count = int(counts[label])
+        if count == 0:
+            print(f"⚠️ No se encontraron píxeles válidos para {name} en {date_obj}")
+            continue
+        grupo = sorted_vals[starts[label] : starts[label] + count]
+        percentiles = {}
+        for q in PERCENTILES:
+            pos = q / 100 * (count - 1)
+            lo = int(np.floor(pos))
+            hi = min(lo + 1, count - 1)
+            percentiles[q] = float(grupo[lo] + (grupo[hi] - grupo[lo]) * (pos - lo))
+        results.append(
+            MedicionResultado(
+                Fecha=date_obj,
+                Municipio=name,
+                Cantidad_de_pixeles=count,
+                Suma_de_radianza=float(sums[label]),
+                Media_de_radianza=float(means[label]),
+                Desviacion_estandar_de_radianza=float(np.sqrt(sq[label] / count)),
+                Maximo_de_radianza=float(grupo[-1]),
+                Minimo_de_radianza=float(grupo[0]),
+                Percentil_25_de_radianza=percentiles[25],
+                Percentil_50_de_radianza=percentiles[50],
+                Percentil_75_de_radianza=percentiles[75],
+            )
+        )
+    return results
+
+
+def build_label_rasters(coord_data_dict: dict[str, CoordenadasPixeles]) -> dict[str, LabelRaster]:
+    """Agrupa los municipios por cuadrante y construye un raster de etiquetas por cuadrante."""
+    por_cuadrante: dict[str, dict[str, list[tuple[int, int]]]] = {}
+    for municipio, coord_data in coord_data_dict.items():
+        por_cuadrante.setdefault(coord_data.cuadrante, {})[municipio] = list(coord_data.coordenadas_pixeles)
+    return {cuadrante: LabelRaster(cuadrante, coords) for cuadrante, coords in por_cuadrante.items()}
+
+
+def measure_granule(
+    downloaded_path: str,
+    raster: LabelRaster,
+    date_obj: date,
+    names: list[str] | None = None,
+) -> list[MedicionResultado]:
+    """Abre el gránulo una sola vez y calcula las estadísticas de todos los municipios del raster."""
+    with timed("hdf5_open"):
+        hdf_file = h5py.File(downloaded_path, "r")
+    with hdf_file:
+        dataset = hdf_file[find_image_path(hdf_file)]
+        return raster.compute(dataset, date_obj, names)
@@ -26,14 +26,17 @@ from .utils import (
     parse_date,
     extraer_coordenadas,
     left_right_coords,
-    polygon_centroid
+    polygon_centroid,
+    cuadrante_de_coordenadas
 )
 from .downloader import find_file, download_file
 from .image_processor import (
     recortar_imagen,
     completar_bordes,
     get_pixeles,
-    aumentar_imagen
+    seleccionar_pixeles,
+    aumentar_imagen,
+    leer_ventana
 )
 
 __version__ = "1.0.0"
@@ -48,10 +51,13 @@ __all__ = [
     "extraer_coordenadas",
     "left_right_coords",
     "polygon_centroid",
+    "cuadrante_de_coordenadas",
     "find_file",
     "download_file",
     "recortar_imagen",
     "completar_bordes",
     "get_pixeles",
-    "aumentar_imagen"
+    "seleccionar_pixeles",
+    "aumentar_imagen",
+    "leer_ventana"
 ]
\ No newline at end of file
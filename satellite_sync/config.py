@@ -5,8 +5,9 @@ from importlib import resources
 
 load_dotenv()
 
-# URLs y rutas
-BASE_URL = "https://ladsweb.modaps.eosdis.nasa.gov/archive/allData/5200/VNP46A1/{year}/{day}/"
+# URLs y rutas (VNP46A1_LAADS_URL permite apuntar a un sustituto local de LAADS)
+LAADS_URL = os.getenv("VNP46A1_LAADS_URL", "https://ladsweb.modaps.eosdis.nasa.gov").rstrip("/")
+BASE_URL = LAADS_URL + "/archive/allData/5200/VNP46A1/{year}/{day}/"
 IMAGE_PATH = "HDFEOS/GRIDS/VNP_Grid_DNB/Data Fields/DNB_At_Sensor_Radiance_500m"
 _DATA_ROOT = resources.files("vnp46a1_data")
 RUTA_MUNICIPIOS = str(_DATA_ROOT.joinpath("limite-de-las-alcaldias.json"))
@@ -53,5 +54,14 @@ TOKEN = os.getenv("NASA_API_TOKEN")
 HEADERS = {"Authorization": f"Bearer {TOKEN}"}
 
 # Configuración de procesamiento
-CHUNK_SIZE = 8192
-CONVERSION_FACTOR = 1_000_000 
\ No newline at end of file
+CHUNK_SIZE = int(os.getenv("VNP46A1_DOWNLOAD_BUFFER_SIZE", str(256 * 1024)))
+CONVERSION_FACTOR = 1_000_000
+
+# Ejecución paralela de SatelliteProcessor.run(parallel=True): hilos de descarga, procesos de
+# medición y gránulos a la vez entre la descarga y el fin de su medición
+SYNC_IO_WORKERS = int(os.getenv("VNP46A1_SYNC_IO_WORKERS", "4"))
+SYNC_CPU_WORKERS = int(os.getenv("VNP46A1_SYNC_CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+SYNC_MAX_IN_FLIGHT = int(os.getenv("VNP46A1_SYNC_MAX_IN_FLIGHT", str(2 * SYNC_CPU_WORKERS)))
+
+# Versión del algoritmo de medición síncrono (se guarda junto a cada resultado incremental)
+ALGORITHM_VERSION = "sync-1" 
\ No newline at end of file
@@ -1,71 +1,156 @@
 import requests
-from bs4 import BeautifulSoup
 import os
+import time
+from typing import Dict, Iterable, Optional, Tuple
 from .config import BASE_URL, HEADERS, CHUNK_SIZE
+from satellite_async.integrity import content_length, verify_file
+from satellite_async.listing import ListingIndex, get_listing_index, json_listing_url, parse_listing
+from satellite_async.metrics import inc, timed
+
+def fetch_listing(year: int, day: int) -> Optional[list]:
+    """
+    Descarga y parsea el listado de LAADS de un día (sin consultar el índice). Pide primero el
+    listado JSON (`.../{day}.json`), el único que trae tamaño y md5 para verificar la descarga;
+    si no está disponible usa el HTML del directorio, que solo trae los nombres.
+    """
+    url = BASE_URL.format(year=year, day=day)
+    with timed("listing"):
+        response = requests.get(json_listing_url(url), headers=HEADERS)
+        entries = parse_listing(response.text, url) if response.status_code == 200 else []
+        if entries:
+            return entries
+
+        response = requests.get(url, headers=HEADERS)
+        if response.status_code != 200:
+            print(f"Error al acceder a {url}")
+            return None
+        return parse_listing(response.text, url)
+
+def find_entry(year: int, day: int, quadrant: str, index: ListingIndex = None) -> Optional[dict]:
+    """
+    Busca la entrada (filename, url, size, checksum) del cuadrante en el índice persistente de
+    listados; solo descarga el listado del día si no está indexado o si la última consulta
+    negativa del cuadrante ya expiró.
+    """
+    index = index or get_listing_index()
+    entry = index.lookup(year, day, quadrant)
+    if entry:
+        return entry
+    if index.known_missing(year, day, quadrant):
+        return None
+
+    entries = fetch_listing(year, day)
+    if entries is not None:
+        index.store_day(year, day, entries)
+        entry = index.lookup(year, day, quadrant)
+        if not entry:
+            index.store_missing(year, day, quadrant)
+    if not entry:
+        print(f"No se encontró archivo para {quadrant} en {year}-{day}")
+    return entry
+
+def find_files(dias: Iterable[Tuple[int, int]], quadrant: str) -> Dict[Tuple[int, int], Optional[dict]]:
+    """
+    Resuelve de una vez un rango de días [(año, día), ...] para un cuadrante.
+    Cada listado faltante se descarga una sola vez.
+    """
+    index = get_listing_index()
+    return {(year, day): find_entry(year, day, quadrant, index) for year, day in dict.fromkeys(dias)}
 
 def find_file(year: int, day: int, quadrant: str) -> str:
     """
     Busca el archivo .h5 correspondiente al año, día y cuadrante especificado.
     """
-    url = BASE_URL.format(year=year, day=day)
-    response = requests.get(url, headers=HEADERS)
+    entry = find_entry(year, day, quadrant)
+    return entry["url"] if entry else None
+
+def _fetch_into_part(file_url: str, part_path: str, expected_size: Optional[int] = None) -> Optional[bool]:
+    """
+    Un intento de descarga hacia `part_path`, reanudando con un header `Range` desde los bytes
+    que ya tiene. Devuelve True si la transferencia terminó, False si se cortó antes de tiempo
+    (se puede reanudar) y None si el servidor respondió con un error.
+    """
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if expected_size is not None and offset >= int(expected_size):
+        if offset == int(expected_size):
+            return True
+        os.remove(part_path)
+        offset = 0
 
-    if response.status_code != 200:
-        print(f"Error al acceder a {url}")
+    headers = dict(HEADERS)
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        print(f"Reanudando {file_url} desde el byte {offset}")
+
+    response = requests.get(file_url, headers=headers, stream=True, timeout=30)
+    if response.status_code == 416 and offset:
+        return True
+    if response.status_code not in (200, 206):
+        print(f"Error al descargar: {file_url} (Status: {response.status_code})")
         return None
 
-    soup = BeautifulSoup(response.text, "html.parser")
-    for link in soup.find_all("a"):
-        filename = link.get("href")
-        if filename and quadrant in filename and filename.endswith(".h5"):
-            # Limpiar el href de espacios y saltos de línea
-            filename = filename.strip()
-            
-            # Verificar si el href ya es una URL completa
-            if filename.startswith("http"):
-                # Reemplazar saltos de línea y espacios extra
-                filename = filename.replace('\n', '').replace('\r', '').strip()
-                return filename
-            else:
-                # Si es solo el nombre del archivo, concatenar con la URL base
-                return url + filename
-
-    print(f"No se encontró archivo para {quadrant} en {year}-{day}")
-    return None
+    # Un 200 a una petición con Range significa que el servidor manda el archivo completo
+    mode = "ab" if response.status_code == 206 else "wb"
+    expected_length = content_length(response.headers)
+    received = 0
+    with open(part_path, mode) as file:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            file.write(chunk)
+            received += len(chunk)
+            inc("download_bytes_total", len(chunk))
+    if expected_length is not None and received < expected_length:
+        print(f"Transferencia incompleta: {received}/{expected_length} bytes de {file_url}")
+        return False
+    return True
 
-def download_file(file_url: str, save_path: str) -> str:
+def download_file(
+    file_url: str,
+    save_path: str,
+    expected_size: Optional[int] = None,
+    checksum: Optional[str] = None,
+    max_retries: int = 3,
+    delay: float = 2,
+) -> str:
     """
     Descarga un archivo desde una URL dada y lo guarda en la ruta especificada.
+    Los bytes van a `save_path + '.part'`; si la conexión se corta, el reintento pide solo lo
+    que falta con un header `Range`. El archivo se verifica contra el tamaño y el md5 del
+    listado de LAADS (si se conocen) y como HDF5 antes de publicarse con un rename atómico.
     """
-    try:
-        # Crear directorio si no existe
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        print("DEBUG: Descargando archivo desde: ", file_url)
-        response = requests.get(file_url, headers=HEADERS, stream=True, timeout=30)
-        
-        if response.status_code == 200:
-            with open(save_path, "wb") as file:
-                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
-                    file.write(chunk)
-            
+    part_path = save_path + ".part"
+    # Crear directorio si no existe
+    os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+    print("DEBUG: Descargando archivo desde: ", file_url)
+
+    for attempt in range(max_retries):
+        try:
+            completed = _fetch_into_part(file_url, part_path, expected_size)
+        except requests.RequestException as e:
+            print(f"Error durante la descarga: {e} (intento {attempt + 1}/{max_retries})")
+            completed = False
+        except Exception as e:
+            print(f"Error durante la descarga: {e}")
+            return None
+
+        if completed is None:
+            return None
+        if completed:
             # Verificar que el archivo descargado es válido
-            if not is_valid_hdf5_file(save_path):
+            if not verify_file(part_path, expected_size, checksum) or not is_valid_hdf5_file(part_path):
                 print(f"El archivo descargado no es un archivo HDF5 válido: {save_path}")
-                os.remove(save_path)  # Eliminar archivo inválido
+                os.remove(part_path)  # Eliminar archivo inválido
                 return None
-                
+            os.replace(part_path, save_path)
             print(f"Archivo descargado: {save_path}")
             return save_path
-        else:
-            print(f"Error al descargar: {file_url} (Status: {response.status_code})")
-            return None
-            
-    except Exception as e:
-        print(f"Error durante la descarga: {e}")
-        # Eliminar archivo parcial si existe
-        if os.path.exists(save_path):
-            os.remove(save_path)
-        return None
+
+        if attempt < max_retries - 1:
+            inc("download_retries_total")
+            print(f"Reanudando la descarga en {delay} segundos...")
+            time.sleep(delay)
+
+    # El .part se conserva para reanudar en la siguiente ejecución
+    return None
 
 def is_valid_hdf5_file(file_path: str) -> bool:
     """
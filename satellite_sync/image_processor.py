@@ -1,4 +1,5 @@
 import numpy as np
+from scipy import ndimage
 from typing import Tuple, List
 from .utils import distancia_puntos, polygon_centroid, es_borde
 
@@ -7,13 +8,78 @@ def aumentar_imagen(image_matrix: np.ndarray, factor_escala: int) -> np.ndarray:
     imagen_aumentada = np.kron(image_matrix, np.ones((factor_escala, factor_escala)))
     return imagen_aumentada
 
+def area_recorte(shape: Tuple[int, int], coordenadas_municipio: np.ndarray,
+                 upper_left: Tuple[float, float]) -> Tuple[np.ndarray, np.ndarray, Tuple[int, int], Tuple[int, int]]:
+    """
+    Convierte las coordenadas del municipio a píxeles de una imagen de `shape` y calcula el
+    área de recorte (con margen de 1 píxel, limitada por arriba y a la izquierda).
+
+    Returns:
+        Tuple con (x_pixels, y_pixels, (fila_inicio, fila_fin), (columna_inicio, columna_fin))
+    """
+    # Resolución en la imagen original (cuadrantes de 10 grados)
+    resolucion_x = 10 / shape[1]
+    resolucion_y = 10 / shape[0]
+
+    x_pixels = (coordenadas_municipio[:, 0] - upper_left[0]) / resolucion_x
+    y_pixels = (upper_left[1] - coordenadas_municipio[:, 1]) / resolucion_y
+
+    recorte_y = (max(int(np.ceil(y_pixels.min())) - 1, 0), int(np.ceil(y_pixels.max())) + 1)
+    recorte_x = (max(int(np.ceil(x_pixels.min())) - 1, 0), int(np.ceil(x_pixels.max())) + 1)
+    return x_pixels, y_pixels, recorte_y, recorte_x
+
+class VentanaImagen:
+    """
+    Ventana ya leída de una imagen (o dataset HDF5) más grande. Expone el `shape` de la imagen
+    completa y se recorta con coordenadas de la imagen completa, así que `recortar_imagen` la
+    usa igual que al dataset pero sin volver a leer del archivo.
+    """
+
+    def __init__(self, datos: np.ndarray, fila0: int, columna0: int, shape: Tuple[int, int]):
+        self.datos = datos
+        self.fila0 = fila0
+        self.columna0 = columna0
+        self.shape = shape
+
+    def __getitem__(self, key):
+        filas, columnas = key
+        return self.datos[
+            filas.start - self.fila0:filas.stop - self.fila0,
+            columnas.start - self.columna0:columnas.stop - self.columna0,
+        ]
+
+def leer_ventana(image_dataset, coordenadas_municipios: List[np.ndarray],
+                 upper_left: Tuple[float, float]) -> VentanaImagen:
+    """
+    Lee de una sola vez la ventana que cubre las áreas de recorte de varios municipios.
+
+    Args:
+        image_dataset: Matriz (o dataset HDF5) de la imagen completa
+        coordenadas_municipios: Coordenadas de cada municipio
+        upper_left: Coordenadas de la esquina superior izquierda
+
+    Returns:
+        VentanaImagen para pasar a `recortar_imagen` en lugar del dataset
+    """
+    shape = tuple(image_dataset.shape)
+    areas = [area_recorte(shape, coordenadas, upper_left)[2:] for coordenadas in coordenadas_municipios]
+    fila0 = min(recorte_y[0] for recorte_y, _ in areas)
+    fila1 = min(max(recorte_y[1] for recorte_y, _ in areas), shape[0])
+    columna0 = min(recorte_x[0] for _, recorte_x in areas)
+    columna1 = min(max(recorte_x[1] for _, recorte_x in areas), shape[1])
+    datos = np.asarray(image_dataset[fila0:fila1, columna0:columna1])
+    return VentanaImagen(datos, fila0, columna0, shape)
+
 def recortar_imagen(image_matrix: np.ndarray, coordenadas_municipio: np.ndarray, 
                    upper_left: Tuple[float, float], factor_escala: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
     Recorta una imagen según las coordenadas del municipio y aplica factor de escala.
     
+    `image_matrix` puede ser un dataset h5py abierto: solo se usa su `shape` y el slice del
+    recorte, que h5py lee como hyperslab sin descomprimir la malla completa.
+    
     Args:
-        image_matrix: Matriz de la imagen original
+        image_matrix: Matriz (o dataset HDF5) de la imagen original
         coordenadas_municipio: Coordenadas del municipio
         upper_left: Coordenadas de la esquina superior izquierda
         factor_escala: Factor de escala para aumentar la imagen
@@ -21,20 +87,11 @@ def recortar_imagen(image_matrix: np.ndarray, coordenadas_municipio: np.ndarray,
     Returns:
         Tuple con (imagen_aumentada, nuevos_x_pixels, nuevos_y_pixels)
     """
-    # 1. Calcular resolución en la imagen original
-    resolucion_x = 10 / image_matrix.shape[1]
-    resolucion_y = 10 / image_matrix.shape[0]
-
-    # 2. Convertir coordenadas a píxeles
-    x_pixels = (coordenadas_municipio[:, 0] - upper_left[0]) / resolucion_x
-    y_pixels = (upper_left[1] - coordenadas_municipio[:, 1]) / resolucion_y
-
-    # 3. Definir área de recorte
-    recorte_y = (np.ceil(y_pixels.min()).astype(int)-1, np.ceil(y_pixels.max()).astype(int)+1)
-    recorte_x = (np.ceil(x_pixels.min()).astype(int)-1, np.ceil(x_pixels.max()).astype(int)+1)
+    # 1-3. Coordenadas en píxeles y área de recorte
+    x_pixels, y_pixels, recorte_y, recorte_x = area_recorte(image_matrix.shape, coordenadas_municipio, upper_left)
 
-    # 4. Recortar la imagen original
-    image_matrix_recortada = image_matrix[recorte_y[0]:recorte_y[1], recorte_x[0]:recorte_x[1]]
+    # 4. Recortar la imagen original (solo se lee la ventana si es un dataset HDF5)
+    image_matrix_recortada = np.asarray(image_matrix[recorte_y[0]:recorte_y[1], recorte_x[0]:recorte_x[1]])
 
     # 5. Aumentar imagen recortada
     if factor_escala == 1:
@@ -117,6 +174,58 @@ def get_pixeles(imagen: np.ndarray, centroide: Tuple[float, float],
     
     return pixeles_imagen 
 
+def seleccionar_pixeles(shape: Tuple[int, int], centroide: Tuple[float, float],
+                        bordes: List[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Versión vectorizada de `get_pixeles` + `detect_orphan_pixels` basada en etiquetado de
+    componentes 4-conexas (scipy.ndimage.label) sobre los píxeles que no son borde.
+    
+    - Principales: la componente que contiene al centroide (si el centroide cae sobre un borde,
+      el propio centroide más las componentes de sus vecinos), igual que el BFS de `get_pixeles`.
+    - Huérfanos: las demás componentes que no tocan el borde de la imagen, igual que
+      `detect_orphan_pixels`.
+    
+    Args:
+        shape: Forma (alto, ancho) de la imagen recortada
+        centroide: Coordenadas del centroide del polígono
+        bordes: Lista de coordenadas que forman el borde del polígono
+        
+    Returns:
+        Tuple con (mascara_principales, mascara_huerfanos) como arreglos booleanos de forma `shape`
+    """
+    height, width = shape
+    mascara_bordes = np.zeros((height, width), dtype=bool)
+    coords_bordes = np.asarray(bordes, dtype=np.int64).reshape(-1, 2)
+    en_imagen = ((coords_bordes[:, 0] >= 0) & (coords_bordes[:, 0] < width) &
+                 (coords_bordes[:, 1] >= 0) & (coords_bordes[:, 1] < height))
+    mascara_bordes[coords_bordes[en_imagen, 1], coords_bordes[en_imagen, 0]] = True
+
+    libres = ~mascara_bordes
+    etiquetas, _ = ndimage.label(libres)  # estructura por defecto: 4-conectividad
+
+    # Píxeles principales: componente(s) alcanzables desde el centroide
+    x_centroide, y_centroide = int(centroide[0]), int(centroide[1])
+    principales = np.zeros((height, width), dtype=bool)
+    principales[y_centroide, x_centroide] = True
+    if libres[y_centroide, x_centroide]:
+        componentes = {etiquetas[y_centroide, x_centroide]}
+    else:
+        componentes = set()
+        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+            x_vecino, y_vecino = x_centroide + dx, y_centroide + dy
+            if 0 <= x_vecino < width and 0 <= y_vecino < height and libres[y_vecino, x_vecino]:
+                componentes.add(etiquetas[y_vecino, x_vecino])
+    componentes.discard(0)
+    if componentes:
+        principales |= np.isin(etiquetas, list(componentes))
+
+    # Píxeles huérfanos: componentes restantes que no tocan el borde de la imagen
+    etiquetas_exteriores = np.unique(np.concatenate((
+        etiquetas[0, :], etiquetas[-1, :], etiquetas[:, 0], etiquetas[:, -1]
+    )))
+    huerfanos = libres & ~principales & ~np.isin(etiquetas, etiquetas_exteriores)
+    return principales, huerfanos
+
 def detect_orphan_pixels(imagen: np.ndarray, bordes: List[Tuple[int, int]], 
                         main_pixels: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
     """
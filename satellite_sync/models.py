@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from datetime import date
 
 class CoordenadasPixeles(BaseModel):
@@ -8,6 +8,7 @@ class CoordenadasPixeles(BaseModel):
 
 class MedicionResultado(BaseModel):
     Fecha: date = Field(..., description="Date of the measurement")
+    Municipio: Optional[str] = Field(None, description="Name of the municipality")
     Cantidad_de_pixeles: int = Field(..., description="Total number of pixels")
     Cantidad_de_pixeles_principales: int = Field(..., description="Number of main pixels")
     Suma_de_radianza: float = Field(..., description="Sum of the radiance")
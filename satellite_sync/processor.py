@@ -7,12 +7,25 @@ matplotlib.use('Agg')  # Configurar backend no interactivo
 #matplotlib.use('TkAgg')
 import matplotlib.pyplot as plt
 import os
-from typing import Optional, Tuple, List
-from .config import IMAGE_PATH, find_image_path
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple, List, Union
+from .config import (
+    IMAGE_PATH,
+    ALGORITHM_VERSION,
+    SYNC_CPU_WORKERS,
+    SYNC_IO_WORKERS,
+    SYNC_MAX_IN_FLIGHT,
+    find_image_path,
+)
 from .models import MedicionResultado
-from .utils import parse_date, extraer_coordenadas, left_right_coords, polygon_centroid
+from .utils import parse_date, extraer_coordenadas, left_right_coords, polygon_centroid, cuadrante_de_coordenadas
 from .downloader import find_file, download_file
-from .image_processor import recortar_imagen, completar_bordes, get_pixeles, detect_orphan_pixels
+from satellite_async.cache import get_granule_cache
+from satellite_async.listing import get_listing_index
+from satellite_async.metrics import timed
+from satellite_async.results_store import get_results_store
+from .image_processor import recortar_imagen, completar_bordes, seleccionar_pixeles, leer_ventana
 
 pd.set_option('display.max_columns', None)
 pd.set_option('display.max_rows', None)
@@ -20,10 +33,17 @@ pd.set_option('display.max_rows', None)
 class SatelliteProcessor:
     """
     Clase principal para procesar imágenes satelitales del producto VNP46A1.
+
+    Acepta un municipio o una lista. Con varios, `run` agrupa los municipios por cuadrante y
+    descarga y lee cada gránulo una sola vez por fecha; `get_measures` y `recortar_imagen_solo`
+    siempre miden un solo municipio (el primero de la lista).
     """
     
-    def __init__(self, municipio: str, factor_escala: int = 1):
-        self.municipio = municipio
+    def __init__(self, municipio: Union[str, List[str]], factor_escala: int = 1):
+        self.municipios = [municipio] if isinstance(municipio, str) else list(municipio)
+        if not self.municipios:
+            raise ValueError("Se necesita al menos un municipio.")
+        self.municipio = self.municipios[0]
         self.factor_escala = factor_escala
     
     def _save_plot(self, fig, date_obj: str, quadrant: str, plot_type: str = "analysis"):
@@ -47,6 +67,40 @@ class SatelliteProcessor:
         finally:
             plt.close(fig)
     
+    def _descargar_granulo(self, year: int, day: int, quadrant: str, pin: bool = False) -> Optional[str]:
+        """
+        Devuelve la ruta local del gránulo usando la caché persistente compartida con la versión
+        asíncrona y la API; solo busca y descarga desde NASA si no está en la caché.
+        Con `pin=True` el gránulo queda fijado en la caché hasta que se llame a `cache.unpin`.
+        """
+        cache = get_granule_cache()
+        key = cache.key(year, day, quadrant)
+        cached_path = cache.get(key, pin=pin)
+        if cached_path:
+            print(f"Usando archivo de la caché: {cached_path}")
+            return cached_path
+
+        h5_url = find_file(year, day, quadrant)
+        if not h5_url:
+            print("No se encontró el archivo.")
+            return None
+
+        # Ruta fija si nadie más descarga el gránulo: el .part de una descarga interrumpida se reanuda
+        entry = get_listing_index().lookup(year, day, quadrant) or {}
+        with cache.claim_staging(key) as staging_path:
+            with timed("download"):
+                h5_save_path = download_file(
+                    h5_url, staging_path, expected_size=entry.get("size"), checksum=entry.get("checksum")
+                )
+            if not h5_save_path:
+                print("Fallo la descarga del archivo.")
+                return None
+            path = cache.put(key, h5_save_path)
+        if pin and not cache.pin(path):
+            # Desalojado entre la publicación y el pin: se vuelve a pedir
+            return self._descargar_granulo(year, day, quadrant, pin)
+        return path
+
     def get_measures(self, date_str: str, quadrant: str, show_plots: bool = True, factor_escala: int = None) -> Optional[dict]:
         """
         Consulta, descarga y extrae las coordenadas de una imagen satelital para un día y cuadrante.
@@ -65,19 +119,19 @@ class SatelliteProcessor:
         # Usar el factor de escala pasado como parámetro o el del constructor
         escala_a_usar = factor_escala if factor_escala is not None else self.factor_escala
 
-        # Buscar y descargar archivo
-        h5_url = find_file(year, day, quadrant)
-        if not h5_url:
-            print("No se encontró el archivo.")
-            return None
-
-        save_path = f"../temp/{date_obj}_{self.municipio}_{quadrant}.h5"
-        h5_save_path = download_file(h5_url, save_path)
+        # Obtener el archivo (caché o descarga)
+        h5_save_path = self._descargar_granulo(year, day, quadrant)
         if not h5_save_path:
-            print("Fallo la descarga del archivo.")
             return None
-        
-        with h5py.File(h5_save_path, "r") as hdf_file:
+        return self._medir_archivo(h5_save_path, date_obj, quadrant, show_plots, escala_a_usar)
+
+    def _medir_archivo(self, h5_save_path: str, date_obj, quadrant: str, show_plots: bool, escala_a_usar: int) -> Optional[dict]:
+        """
+        Recorta el municipio del gránulo ya descargado y calcula sus mediciones.
+        """
+        with timed("hdf5_open"):
+            hdf_file = h5py.File(h5_save_path, "r")
+        with hdf_file:
             left_coord, right_coord = left_right_coords(hdf_file)
             if left_coord is None or right_coord is None:
                 print("No se pudieron extraer las coordenadas del archivo HDF.")
@@ -93,144 +147,154 @@ class SatelliteProcessor:
                 hdf_file.visititems(print_structure)
                 return None
             
-            image_matrix = hdf_file[image_path][()]
+            # Dataset sin leer: el recorte solo lee la ventana del municipio
+            image_dataset = hdf_file[image_path]
             coordenadas_municipio = extraer_coordenadas(self.municipio)
             if coordenadas_municipio is None:
                 print("No se pudieron extraer las coordenadas del municipio.")
                 return None
 
-            # Crear copia para visualización
+            return self._medir_recorte(
+                self.municipio, image_dataset, coordenadas_municipio, left_coord, date_obj, quadrant, show_plots, escala_a_usar
+            )
+
+    def _medir_recorte(
+        self,
+        municipio: str,
+        image_dataset,
+        coordenadas_municipio: np.ndarray,
+        left_coord: Tuple[float, float],
+        date_obj,
+        quadrant: str,
+        show_plots: bool,
+        escala_a_usar: int,
+    ) -> Optional[dict]:
+        """
+        Recorta un municipio de la imagen (dataset HDF5 abierto o `VentanaImagen` ya leída),
+        selecciona sus píxeles y calcula las estadísticas.
+        """
+        if show_plots:
+            # La imagen completa solo se lee para visualizarla
+            image_matrix = image_dataset[()]
             copia_imagen = np.clip(image_matrix, 0, np.percentile(image_matrix, 99))
+            fig, ax = plt.subplots(ncols=2, nrows=3, figsize=(15, 15))
+            ax[0][0].imshow(copia_imagen)
+            ax[0][0].set_title(f"Imagen completa {municipio} - {date_obj}")
 
-            if show_plots:
-                fig, ax = plt.subplots(ncols=2, nrows=3, figsize=(15, 15))
-                ax[0][0].imshow(copia_imagen)
-                ax[0][0].set_title(f"Imagen completa {self.municipio} - {date_obj}")
-                
-            # Recortar imagen
-            try:
+        # Recortar imagen
+        try:
+            with timed("dataset_read"):
                 imagen_recortada, nuevos_x, nuevos_y = recortar_imagen(
-                    image_matrix, coordenadas_municipio, left_coord, escala_a_usar
+                    image_dataset, coordenadas_municipio, left_coord, escala_a_usar
                 )
-                
-                # Validar que la imagen recortada no esté vacía
-                if imagen_recortada.size == 0:
-                    print("La imagen recortada está vacía. Verifica las coordenadas del municipio.")
-                    return None
-                    
-                copia_imagen = np.clip(imagen_recortada, 0, np.percentile(imagen_recortada, 99))
 
-                if show_plots:
-                    ax[0][1].imshow(imagen_recortada)
-                    ax[0][1].set_title("Imagen recortada")
-
-                # Preparar coordenadas de bordes incompletos para visualización (sin modificar la imagen)
-                bordes_incompletos_x = []
-                bordes_incompletos_y = []
-                for i in range(len(nuevos_y)):
-                    if (0 <= int(nuevos_y[i]) < imagen_recortada.shape[0] and 
-                        0 <= int(nuevos_x[i]) < imagen_recortada.shape[1]):
-                        bordes_incompletos_x.append(int(nuevos_x[i]))
-                        bordes_incompletos_y.append(int(nuevos_y[i]))
-
-                if show_plots:
-                    ax[1][0].imshow(copia_imagen)
-                    if bordes_incompletos_x:
-                        ax[1][0].plot(bordes_incompletos_x, bordes_incompletos_y, 'k-', linewidth=1.5, alpha=0.8, label='Bordes')
-                        ax[1][0].scatter(bordes_incompletos_x, bordes_incompletos_y, c='red', s=1, alpha=0.6)
-                    ax[1][0].set_title("Imagen con bordes incompletos")
-
-                # Completar bordes
-                coordenadas_bordes = completar_bordes(nuevos_x, nuevos_y)
-
-                # Preparar coordenadas de bordes completos para visualización (sin modificar la imagen)
-                bordes_completos_x = []
-                bordes_completos_y = []
-                for coordenada in coordenadas_bordes:
-                    if (0 <= coordenada[1] < imagen_recortada.shape[0] and 
-                        0 <= coordenada[0] < imagen_recortada.shape[1]):
-                        bordes_completos_x.append(coordenada[0])
-                        bordes_completos_y.append(coordenada[1])
-
-                if show_plots:
-                    ax[1][1].imshow(copia_imagen)
-                    if bordes_completos_x:
-                        # Dibujar bordes como línea cerrada
-                        if len(bordes_completos_x) > 1:
-                            ax[1][1].plot(bordes_completos_x + [bordes_completos_x[0]], 
-                                         bordes_completos_y + [bordes_completos_y[0]], 
-                                         'k-', linewidth=2, alpha=0.9, label='Bordes completos')
-                        ax[1][1].scatter(bordes_completos_x, bordes_completos_y, c='red', s=2, alpha=0.7)
-                    ax[1][1].set_title("Imagen con bordes completos")
+            # Validar que la imagen recortada no esté vacía
+            if imagen_recortada.size == 0:
+                print("La imagen recortada está vacía. Verifica las coordenadas del municipio.")
+                return None
 
-                
-                # Calcular centroide y obtener píxeles principales
+            copia_imagen = np.clip(imagen_recortada, 0, np.percentile(imagen_recortada, 99))
+
+            if show_plots:
+                ax[0][1].imshow(imagen_recortada)
+                ax[0][1].set_title("Imagen recortada")
+
+            # Preparar coordenadas de bordes incompletos para visualización (sin modificar la imagen)
+            bordes_incompletos_x = []
+            bordes_incompletos_y = []
+            for i in range(len(nuevos_y)):
+                if (0 <= int(nuevos_y[i]) < imagen_recortada.shape[0] and 
+                    0 <= int(nuevos_x[i]) < imagen_recortada.shape[1]):
+                    bordes_incompletos_x.append(int(nuevos_x[i]))
+                    bordes_incompletos_y.append(int(nuevos_y[i]))
+
+            if show_plots:
+                ax[1][0].imshow(copia_imagen)
+                if bordes_incompletos_x:
+                    ax[1][0].plot(bordes_incompletos_x, bordes_incompletos_y, 'k-', linewidth=1.5, alpha=0.8, label='Bordes')
+                    ax[1][0].scatter(bordes_incompletos_x, bordes_incompletos_y, c='red', s=1, alpha=0.6)
+                ax[1][0].set_title("Imagen con bordes incompletos")
+
+            # Completar bordes
+            coordenadas_bordes = completar_bordes(nuevos_x, nuevos_y)
+
+            # Preparar coordenadas de bordes completos para visualización (sin modificar la imagen)
+            bordes_completos_x = []
+            bordes_completos_y = []
+            for coordenada in coordenadas_bordes:
+                if (0 <= coordenada[1] < imagen_recortada.shape[0] and 
+                    0 <= coordenada[0] < imagen_recortada.shape[1]):
+                    bordes_completos_x.append(coordenada[0])
+                    bordes_completos_y.append(coordenada[1])
+
+            if show_plots:
+                ax[1][1].imshow(copia_imagen)
+                if bordes_completos_x:
+                    # Dibujar bordes como línea cerrada
+                    if len(bordes_completos_x) > 1:
+                        ax[1][1].plot(bordes_completos_x + [bordes_completos_x[0]], 
+                                     bordes_completos_y + [bordes_completos_y[0]], 
+                                     'k-', linewidth=2, alpha=0.9, label='Bordes completos')
+                    ax[1][1].scatter(bordes_completos_x, bordes_completos_y, c='red', s=2, alpha=0.7)
+                ax[1][1].set_title("Imagen con bordes completos")
+
+
+            # Calcular centroide y seleccionar píxeles principales y huérfanos
+            # (zonas no seleccionadas completamente rodeadas por bordes) como máscaras
+            with timed("mask"):
                 cx, cy = polygon_centroid(coordenadas_bordes)
-                coordenadas_pixeles_principales = get_pixeles(imagen_recortada, (cx, cy), coordenadas_bordes)
-                
-                # Detectar píxeles huérfanos (zonas no seleccionadas completamente rodeadas por bordes)
-                coordenadas_pixeles_huerfanos = detect_orphan_pixels(imagen_recortada, coordenadas_bordes, coordenadas_pixeles_principales)
-
-                # Extraer valores de píxeles principales (sin modificar la imagen)
-                pixeles_principales = []
-                pixeles_principales_coords = []
-                for x, y in coordenadas_pixeles_principales:
-                    if (0 <= y < imagen_recortada.shape[0] and 
-                        0 <= x < imagen_recortada.shape[1]):
-                        pixeles_principales.append(imagen_recortada[y, x])
-                        pixeles_principales_coords.append((x, y))
-
-                # Extraer valores de píxeles huérfanos (sin modificar la imagen)
-                pixeles_huerfanos = []
-                pixeles_huerfanos_coords = []
-                for x, y in coordenadas_pixeles_huerfanos:
-                    if (0 <= y < imagen_recortada.shape[0] and 
-                        0 <= x < imagen_recortada.shape[1]):
-                        pixeles_huerfanos.append(imagen_recortada[y, x])
-                        pixeles_huerfanos_coords.append((x, y))
-
-                # Combinar todos los píxeles para estadísticas generales
-                pixeles_imagen = pixeles_principales + pixeles_huerfanos
-
-                if show_plots:
-                    ax[2][0].imshow(copia_imagen)
-                    # Dibujar bordes
-                    if bordes_completos_x:
-                        if len(bordes_completos_x) > 1:
-                            ax[2][0].plot(bordes_completos_x + [bordes_completos_x[0]], 
-                                         bordes_completos_y + [bordes_completos_y[0]], 
-                                         'k-', linewidth=2, alpha=0.9, label='Bordes')
-                    # Dibujar píxeles principales como puntos
-                    if pixeles_principales_coords:
-                        px_coords = list(zip(*pixeles_principales_coords))
-                        ax[2][0].scatter(px_coords[0], px_coords[1], c='blue', s=0.5, alpha=0.3, label='Píxeles principales')
-                    # Dibujar píxeles huérfanos como puntos
-                    if pixeles_huerfanos_coords:
-                        hx_coords = list(zip(*pixeles_huerfanos_coords))
-                        ax[2][0].scatter(hx_coords[0], hx_coords[1], c='red', s=0.5, alpha=0.3, label='Píxeles huérfanos')
-                    ax[2][0].set_title("Imagen con pixeles seleccionados")
-                    ax[2][0].legend(loc='upper right', fontsize=8)
-
-                    if pixeles_imagen:  # Solo mostrar histograma si hay píxeles
-                        ax[2][1].hist(pixeles_principales, bins=50, alpha=0.7, label='Main pixels', color='blue')
-                        if pixeles_huerfanos:
-                            ax[2][1].hist(pixeles_huerfanos, bins=50, alpha=0.7, label='Orphan pixels', color='red')
-                        ax[2][1].grid(True)
-                        ax[2][1].set_title("Histograma de radiación")
-                        ax[2][1].legend()
-                    else:
-                        ax[2][1].text(0.5, 0.5, "No hay píxeles seleccionados", 
-                                    ha='center', va='center', transform=ax[2][1].transAxes)
-                        ax[2][1].set_title("Sin datos")
-
-                # Validar que hay píxeles para procesar
-                if not pixeles_imagen:
-                    print("No se encontraron píxeles dentro del área del municipio.")
-                    return None
+                mascara_principales, mascara_huerfanos = seleccionar_pixeles(
+                    imagen_recortada.shape, (cx, cy), coordenadas_bordes
+                )
+
+            # Extraer valores de píxeles (sin modificar la imagen)
+            pixeles_principales = imagen_recortada[mascara_principales]
+            pixeles_huerfanos = imagen_recortada[mascara_huerfanos]
+
+            # Combinar todos los píxeles para estadísticas generales
+            pixeles_imagen = np.concatenate((pixeles_principales, pixeles_huerfanos))
+
+            if show_plots:
+                ax[2][0].imshow(copia_imagen)
+                # Dibujar bordes
+                if bordes_completos_x:
+                    if len(bordes_completos_x) > 1:
+                        ax[2][0].plot(bordes_completos_x + [bordes_completos_x[0]], 
+                                     bordes_completos_y + [bordes_completos_y[0]], 
+                                     'k-', linewidth=2, alpha=0.9, label='Bordes')
+                # Dibujar píxeles principales como puntos
+                if pixeles_principales.size:
+                    py, px = np.nonzero(mascara_principales)
+                    ax[2][0].scatter(px, py, c='blue', s=0.5, alpha=0.3, label='Píxeles principales')
+                # Dibujar píxeles huérfanos como puntos
+                if pixeles_huerfanos.size:
+                    hy, hx = np.nonzero(mascara_huerfanos)
+                    ax[2][0].scatter(hx, hy, c='red', s=0.5, alpha=0.3, label='Píxeles huérfanos')
+                ax[2][0].set_title("Imagen con pixeles seleccionados")
+                ax[2][0].legend(loc='upper right', fontsize=8)
+
+                if pixeles_imagen.size:  # Solo mostrar histograma si hay píxeles
+                    ax[2][1].hist(pixeles_principales, bins=50, alpha=0.7, label='Main pixels', color='blue')
+                    if pixeles_huerfanos.size:
+                        ax[2][1].hist(pixeles_huerfanos, bins=50, alpha=0.7, label='Orphan pixels', color='red')
+                    ax[2][1].grid(True)
+                    ax[2][1].set_title("Histograma de radiación")
+                    ax[2][1].legend()
+                else:
+                    ax[2][1].text(0.5, 0.5, "No hay píxeles seleccionados", 
+                                ha='center', va='center', transform=ax[2][1].transAxes)
+                    ax[2][1].set_title("Sin datos")
+
+            # Validar que hay píxeles para procesar
+            if pixeles_imagen.size == 0:
+                print("No se encontraron píxeles dentro del área del municipio.")
+                return None
 
-                # Crear medición usando solo MedicionResultado
+            # Crear medición usando solo MedicionResultado
+            with timed("statistics"):
                 medicion = MedicionResultado(
                     Fecha=date_obj,
+                    Municipio=municipio,
                     Cantidad_de_pixeles=len(pixeles_imagen),
                     Cantidad_de_pixeles_principales=len(pixeles_principales),
                     Suma_de_radianza=float(np.sum(pixeles_imagen)),
@@ -242,41 +306,208 @@ class SatelliteProcessor:
                     Percentil_50_de_radianza=float(np.percentile(pixeles_imagen, 50)),
                     Percentil_75_de_radianza=float(np.percentile(pixeles_imagen, 75)),
                 )
-                if show_plots:
-                    # Guardar la figura usando la función 
-                    plt.show()
-                    self._save_plot(plt.gcf(), date_obj, quadrant, "analysis")
-                os.remove(h5_save_path)
-                return medicion.model_dump()
-                
-            except Exception as e:
-                print(f"Error durante el procesamiento de la imagen: {e}")
+            if show_plots:
+                # Guardar la figura usando la función 
+                plt.show()
+                self._save_plot(plt.gcf(), date_obj, quadrant, "analysis")
+            return medicion.model_dump()
+
+        except Exception as e:
+            print(f"Error durante el procesamiento de la imagen: {e}")
+            return None
+
+    def _medir_archivo_municipios(
+        self, h5_save_path: str, date_obj, quadrant: str, coordenadas: Dict[str, np.ndarray], escala_a_usar: int
+    ) -> Dict[str, Optional[dict]]:
+        """
+        Mide varios municipios del mismo gránulo: lo abre una vez, lee una sola ventana que
+        cubre todos sus recortes y calcula la selección y las estadísticas de cada polígono
+        sobre esa ventana en memoria.
+
+        Returns:
+            Diccionario {municipio: medición o None}
+        """
+        with timed("hdf5_open"):
+            hdf_file = h5py.File(h5_save_path, "r")
+        with hdf_file:
+            left_coord, right_coord = left_right_coords(hdf_file)
+            if left_coord is None or right_coord is None:
+                print("No se pudieron extraer las coordenadas del archivo HDF.")
+                return {}
+
+            image_path = find_image_path(hdf_file)
+            if image_path not in hdf_file:
+                print(f"Error: No se encontró la ruta '{image_path}' en el archivo HDF5.")
+                return {}
+
+            with timed("dataset_read"):
+                ventana = leer_ventana(hdf_file[image_path], list(coordenadas.values()), left_coord)
+        return {
+            municipio: self._medir_recorte(
+                municipio, ventana, coordenadas_municipio, left_coord, date_obj, quadrant, False, escala_a_usar
+            )
+            for municipio, coordenadas_municipio in coordenadas.items()
+        }
+
+    def _medir_en_paralelo(
+        self,
+        tareas: dict,
+        escala_a_usar: int,
+        io_workers: int,
+        cpu_workers: int,
+        max_in_flight: int,
+    ) -> dict:
+        """
+        Mide varios gránulos solapando red y CPU: las búsquedas y descargas corren en un pool de
+        hilos y el recorte, la BFS y las estadísticas en un pool de procesos. Como máximo
+        `max_in_flight` gránulos están a la vez entre el inicio de su descarga y el fin de su
+        medición; mientras tanto quedan fijados en la caché para que no se desalojen.
+
+        Args:
+            tareas: {clave: (fecha dd-mm-yy, cuadrante, coordenadas)}, con una clave por gránulo.
+                Si `coordenadas` es None se mide `self.municipio` (como `get_measures`); si es
+                {municipio: coordenadas} se miden todos con una sola lectura del gránulo
+
+        Returns:
+            Diccionario {clave: resultado de la medición o None}
+        """
+        if not tareas:
+            return {}
+
+        cache = get_granule_cache()
+        en_vuelo = threading.BoundedSemaphore(max_in_flight)
+
+        def liberar(path: str) -> None:
+            cache.unpin(path)
+            en_vuelo.release()
+
+        def descargar_y_encolar(fecha: str, quadrant: str, coordenadas):
+            year, day, _ = parse_date(fecha)
+            try:
+                path = self._descargar_granulo(year, day, quadrant, pin=True)
+            except BaseException:
+                en_vuelo.release()
+                raise
+            if not path:
+                en_vuelo.release()
                 return None
+            try:
+                medicion = procesos.submit(
+                    _medir_granulo, self.municipios, path, fecha, quadrant, escala_a_usar, coordenadas
+                )
+            except BaseException:
+                liberar(path)
+                raise
+            medicion.add_done_callback(lambda _: liberar(path))
+            return medicion
 
-    def run(self, fechas: List[str], quadrant: str = "h08v07", show_plots: bool = False, factor_escala: int = None) -> pd.DataFrame:
+        mediciones = {}
+        with ProcessPoolExecutor(max_workers=cpu_workers) as procesos:
+            # Con fork los procesos se crean todos en el primer envío: se hace antes de abrir
+            # los hilos de descarga para no bifurcar un proceso con hilos en marcha
+            procesos.submit(int).result()
+            with ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="vnp46a1-sync-io") as hilos:
+                descargas = {}
+                for clave, (fecha, quadrant, coordenadas) in tareas.items():
+                    en_vuelo.acquire()
+                    print(f"Procesando fecha: {fecha}")
+                    descargas[clave] = (fecha, hilos.submit(descargar_y_encolar, fecha, quadrant, coordenadas))
+                for clave, (fecha, descarga) in descargas.items():
+                    try:
+                        medicion = descarga.result()
+                        mediciones[clave] = medicion.result() if medicion else None
+                    except Exception as e:
+                        print(f"Error procesando {fecha}: {e}")
+                        mediciones[clave] = None
+        return mediciones
+
+    def run(
+        self,
+        fechas: List[str],
+        quadrant: Optional[str] = None,
+        show_plots: bool = False,
+        factor_escala: int = None,
+        incremental: bool = False,
+        parallel: bool = False,
+        io_workers: int = None,
+        cpu_workers: int = None,
+        max_in_flight: int = None,
+    ) -> pd.DataFrame:
         """
         Procesa múltiples fechas y retorna un dataframe con los resultados.
         
         Args:
             fechas: Lista de fechas en formato dd-mm-yy
-            quadrant: Cuadrante de la imagen (por defecto h08v07)
-            show_plots: Si mostrar las visualizaciones de matplotlib
+            quadrant: Cuadrante de la imagen. Con un municipio, por defecto h08v07; con varios,
+                por defecto cada municipio se agrupa en el cuadrante que contiene su polígono y
+                un cuadrante explícito que no contenga alguno lanza ValueError
+            show_plots: Si mostrar las visualizaciones de matplotlib (solo con un municipio)
             factor_escala: Factor de escala para aumentar la resolución de la imagen (por defecto usa el del constructor)
+            incremental: Si reutilizar las fechas ya calculadas en el almacén de resultados
+                (mismo municipio, cuadrante, versión del algoritmo y factor de escala) y solo
+                descargar las que faltan
+            parallel: Si descargar en un pool de hilos y medir en un pool de procesos en lugar de
+                procesar las fechas una tras otra (no compatible con show_plots). El DataFrame
+                conserva el orden de `fechas`
+            io_workers: Hilos de descarga (por defecto VNP46A1_SYNC_IO_WORKERS)
+            cpu_workers: Procesos de medición (por defecto VNP46A1_SYNC_CPU_WORKERS)
+            max_in_flight: Gránulos descargándose o esperando su medición a la vez
+                (por defecto VNP46A1_SYNC_MAX_IN_FLIGHT)
             
         Returns:
-            DataFrame con las mediciones de todas las fechas
+            DataFrame con las mediciones de todas las fechas (con varios municipios, una fila por
+            fecha y municipio en el orden de `fechas` y de los municipios)
         """
-        results = []
-        
         # Usar el factor de escala pasado como parámetro o el del constructor
         escala_a_usar = factor_escala if factor_escala is not None else self.factor_escala
+        workers = (io_workers or SYNC_IO_WORKERS, cpu_workers or SYNC_CPU_WORKERS, max_in_flight or SYNC_MAX_IN_FLIGHT)
+
+        if len(self.municipios) > 1:
+            if show_plots:
+                print("show_plots solo está disponible con un municipio; se omiten las gráficas.")
+            return self._run_municipios(fechas, quadrant, escala_a_usar, incremental, workers if parallel else None)
+
+        if parallel and show_plots:
+            print("show_plots no es compatible con parallel=True; las fechas se procesan en serie.")
+            parallel = False
+        quadrant = quadrant or "h08v07"
+
+        results = []
+
+        store = get_results_store() if incremental else None
+        # El factor de escala cambia los píxeles seleccionados, así que forma parte de la versión
+        version = f"{ALGORITHM_VERSION}-escala{escala_a_usar}"
+        guardados = {}
+        if store is not None:
+            fechas_obj = [parse_date(fecha)[2] for fecha in fechas]
+            guardados = store.lookup({self.municipio: quadrant}, fechas_obj, version)
+
+        calculados = {}
+        if parallel:
+            tareas = {}
+            for fecha in fechas:
+                date_obj = parse_date(fecha)[2]
+                # Una sola descarga por gránulo aunque la fecha venga repetida
+                if (self.municipio, date_obj) not in guardados:
+                    tareas.setdefault(date_obj, (fecha, quadrant, None))
+            calculados = self._medir_en_paralelo(tareas, escala_a_usar, *workers)
         
         for fecha in fechas:
-            print(f"Procesando fecha: {fecha}")
+            date_obj = parse_date(fecha)[2]
+            if (self.municipio, date_obj) in guardados:
+                if guardados[(self.municipio, date_obj)] is not None:
+                    results.append(MedicionResultado.model_validate(guardados[(self.municipio, date_obj)]).model_dump())
+                continue
             try:
-                datos = self.get_measures(fecha, quadrant, show_plots=show_plots, factor_escala=escala_a_usar)
+                if parallel:
+                    datos = calculados.get(date_obj)
+                else:
+                    print(f"Procesando fecha: {fecha}")
+                    datos = self.get_measures(fecha, quadrant, show_plots=show_plots, factor_escala=escala_a_usar)
                 if datos:
                     results.append(datos)
+                    if store is not None:
+                        store.save([(self.municipio, date_obj, quadrant, MedicionResultado.model_validate(datos).model_dump(mode="json"))], version)
                 else:
                     print(f"No se pudieron obtener datos para {fecha}")
             except Exception as e:
@@ -288,6 +519,89 @@ class SatelliteProcessor:
             
         return pd.DataFrame(results)
 
+    def _run_municipios(
+        self,
+        fechas: List[str],
+        quadrant: Optional[str],
+        escala_a_usar: int,
+        incremental: bool,
+        workers: Optional[Tuple[int, int, int]],
+    ) -> pd.DataFrame:
+        """
+        `run` con varios municipios: los agrupa por cuadrante y por cada (fecha, cuadrante)
+        descarga y lee el gránulo una sola vez para medir todos los municipios del grupo.
+        Con `workers` = (io_workers, cpu_workers, max_in_flight) los gránulos se procesan con
+        `_medir_en_paralelo`; si es None, uno tras otro.
+        """
+        grupos: Dict[str, Dict[str, np.ndarray]] = {}
+        cuadrantes = {}
+        for municipio in self.municipios:
+            coordenadas_municipio = extraer_coordenadas(municipio)
+            if coordenadas_municipio is None:
+                print(f"Se omite {municipio}: no se pudieron extraer sus coordenadas.")
+                continue
+            cuadrante = cuadrante_de_coordenadas(coordenadas_municipio)
+            if quadrant is not None and quadrant != cuadrante:
+                raise ValueError(f"El polígono de {municipio} está en el cuadrante {cuadrante}, no en {quadrant}")
+            cuadrantes[municipio] = cuadrante
+            grupos.setdefault(cuadrantes[municipio], {})[municipio] = coordenadas_municipio
+
+        store = get_results_store() if incremental else None
+        # El factor de escala cambia los píxeles seleccionados, así que forma parte de la versión
+        version = f"{ALGORITHM_VERSION}-escala{escala_a_usar}"
+        fechas_obj = {fecha: parse_date(fecha)[2] for fecha in fechas}
+        guardados = {}
+        if store is not None and cuadrantes:
+            guardados = store.lookup(cuadrantes, fechas_obj.values(), version)
+
+        # Un gránulo por (fecha, cuadrante) con los municipios del grupo que faltan por calcular
+        tareas = {}
+        for fecha, date_obj in fechas_obj.items():
+            for cuadrante, coordenadas in grupos.items():
+                faltantes = {m: c for m, c in coordenadas.items() if (m, date_obj) not in guardados}
+                if faltantes and (date_obj, cuadrante) not in tareas:
+                    tareas[(date_obj, cuadrante)] = (fecha, cuadrante, faltantes)
+
+        if workers is not None:
+            calculados = self._medir_en_paralelo(tareas, escala_a_usar, *workers)
+        else:
+            calculados = {}
+            for clave, (fecha, cuadrante, coordenadas) in tareas.items():
+                print(f"Procesando fecha: {fecha} ({cuadrante}, {len(coordenadas)} municipios)")
+                year, day, date_obj = parse_date(fecha)
+                try:
+                    h5_save_path = self._descargar_granulo(year, day, cuadrante)
+                    if h5_save_path:
+                        calculados[clave] = self._medir_archivo_municipios(
+                            h5_save_path, date_obj, cuadrante, coordenadas, escala_a_usar
+                        )
+                except Exception as e:
+                    print(f"Error procesando {fecha}: {e}")
+
+        results = []
+        nuevos = []
+        for fecha in fechas:
+            date_obj = fechas_obj[fecha]
+            for municipio, cuadrante in cuadrantes.items():
+                if (municipio, date_obj) in guardados:
+                    if guardados[(municipio, date_obj)] is not None:
+                        guardado = {**guardados[(municipio, date_obj)], "Municipio": municipio}
+                        results.append(MedicionResultado.model_validate(guardado).model_dump())
+                    continue
+                datos = (calculados.get((date_obj, cuadrante)) or {}).get(municipio)
+                if datos:
+                    results.append(datos)
+                    nuevos.append((municipio, date_obj, cuadrante, MedicionResultado.model_validate(datos).model_dump(mode="json")))
+                else:
+                    print(f"No se pudieron obtener datos de {municipio} para {fecha}")
+        if store is not None and nuevos:
+            store.save(nuevos, version)
+
+        if not results:
+            print("No se obtuvieron datos para ninguna fecha.")
+            return pd.DataFrame()
+        return pd.DataFrame(results)
+
     def recortar_imagen_solo(self, date_str: str, quadrant: str, factor_escala: int = None) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
         """
         Solo recorta la imagen sin hacer mediciones completas.
@@ -305,15 +619,8 @@ class SatelliteProcessor:
         # Usar el factor de escala pasado como parámetro o el del constructor
         escala_a_usar = factor_escala if factor_escala is not None else self.factor_escala
 
-        h5_url = find_file(year, day, quadrant)
-        if not h5_url:
-            print("No se encontró el archivo.")
-            return None
-
-        save_path = f"../temp/{date_obj}_{self.municipio}_{quadrant}.h5"
-        h5_save_path = download_file(h5_url, save_path)
+        h5_save_path = self._descargar_granulo(year, day, quadrant)
         if not h5_save_path:
-            print("Fallo la descarga del archivo.")
             return None
 
         with h5py.File(h5_save_path, "r") as hdf_file:
@@ -332,18 +639,16 @@ class SatelliteProcessor:
                 hdf_file.visititems(print_structure)
                 return None
                 
-            image_matrix = hdf_file[image_path][()]
+            image_dataset = hdf_file[image_path]
             coordenadas_municipio = extraer_coordenadas(self.municipio)
             
             if coordenadas_municipio is None:
                 print("No se pudieron extraer las coordenadas del municipio.")
                 return None
-
-            copia_imagen = np.clip(image_matrix, 0, np.percentile(image_matrix, 99))
             
             try:
                 imagen_recortada, nuevos_x, nuevos_y = recortar_imagen(
-                    image_matrix, coordenadas_municipio, left_coord, escala_a_usar
+                    image_dataset, coordenadas_municipio, left_coord, escala_a_usar
                 )
                 
                 if imagen_recortada.size == 0:
@@ -356,4 +661,23 @@ class SatelliteProcessor:
                 
             except Exception as e:
                 print(f"Error durante el recorte de la imagen: {e}")
-                return None
\ No newline at end of file
+                return None
+
+
+def _medir_granulo(
+    municipios: List[str],
+    h5_path: str,
+    fecha: str,
+    quadrant: str,
+    factor_escala: int,
+    coordenadas: Optional[Dict[str, np.ndarray]] = None,
+):
+    """
+    Mide un gránulo ya descargado; es lo que ejecuta el pool de procesos de `run(parallel=True)`.
+    Sin `coordenadas` mide el primer municipio; con ellas, todos los de {municipio: coordenadas}.
+    """
+    date_obj = parse_date(fecha)[2]
+    procesador = SatelliteProcessor(municipios, factor_escala)
+    if coordenadas is not None:
+        return procesador._medir_archivo_municipios(h5_path, date_obj, quadrant, coordenadas, factor_escala)
+    return procesador._medir_archivo(h5_path, date_obj, quadrant, False, factor_escala)
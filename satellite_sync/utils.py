@@ -1,5 +1,7 @@
 import json
+import os
 import re
+import threading
 import numpy as np
 from datetime import datetime
 from typing import Tuple, List, Optional
@@ -22,15 +24,76 @@ def load_coord_data(municipio: str, path: str) -> CoordenadasPixeles:
         data = json.load(f)
     return CoordenadasPixeles(**data[municipio])
 
+class LimiteMunicipio:
+    """
+    Límite de un municipio ya parseado. Las coordenadas (anillo exterior, lon/lat) se guardan
+    como arreglo float64 contiguo de solo lectura junto con bbox, centroide y área precalculados.
+    """
+
+    def __init__(self, nombre: str, coordenadas):
+        self.nombre = nombre
+        self.coordenadas = np.ascontiguousarray(coordenadas, dtype=np.float64)
+        self.coordenadas.flags.writeable = False
+
+        x, y = self.coordenadas[:, 0], self.coordenadas[:, 1]
+        self.bbox = (float(x.min()), float(y.min()), float(x.max()), float(y.max()))
+
+        # Fórmula del polígono (shoelace) vectorizada
+        x1, y1 = np.roll(x, -1), np.roll(y, -1)
+        cross = x * y1 - x1 * y
+        area_signed = cross.sum() / 2
+        self.area = float(abs(area_signed))
+        if area_signed != 0:
+            self.centroide = (
+                float(((x + x1) * cross).sum() / (6 * area_signed)),
+                float(((y + y1) * cross).sum() / (6 * area_signed)),
+            )
+        else:
+            self.centroide = (float(x.mean()), float(y.mean()))
+
+
+class RegistroLimites:
+    """
+    Parsea el GeoJSON de límites una sola vez por proceso y lo indexa por nombre normalizado.
+    El índice se reconstruye si cambia el mtime del archivo.
+    """
+
+    def __init__(self):
+        self._indices: dict = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _clave(nombre: str) -> str:
+        return normalize_municipio(nombre).strip()
+
+    def indice(self, path: str) -> dict:
+        """Devuelve {nombre_normalizado: LimiteMunicipio} del archivo, parseándolo solo si cambió."""
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cache = self._indices.get(path)
+            if cache is not None and cache[0] == mtime:
+                return cache[1]
+            with open(path, "r") as file:
+                datos = json.load(file)
+            indice = {}
+            for data in datos["features"]:
+                nombre = data["properties"]["NOMGEO"]
+                indice[self._clave(nombre)] = LimiteMunicipio(nombre, data["geometry"]["coordinates"][0])
+            self._indices[path] = (mtime, indice)
+            return indice
+
+    def obtener(self, nombre: str, path: str) -> Optional[LimiteMunicipio]:
+        return self.indice(path).get(self._clave(nombre))
+
+
+registro_limites = RegistroLimites()
+
 def extraer_coordenadas(nombre_delegacion: str) -> Optional[np.ndarray]:
-    """Extrae las coordenadas de un municipio desde el archivo de límites"""
+    """Extrae las coordenadas de un municipio desde el archivo de límites (parseado una sola vez)"""
     try:
-        with open(RUTA_MUNICIPIOS, "r") as file:
-            datos = json.load(file)
-        
-        for data in datos["features"]:
-            if data["properties"]["NOMGEO"] == nombre_delegacion:
-                return np.array(data["geometry"]["coordinates"][0])
+        limite = registro_limites.obtener(nombre_delegacion, RUTA_MUNICIPIOS)
+        if limite is not None:
+            return limite.coordenadas
         
         print(f"No se encontraron coordenadas para la delegación: {nombre_delegacion}")
         return None
@@ -38,6 +101,12 @@ def extraer_coordenadas(nombre_delegacion: str) -> Optional[np.ndarray]:
         print(f"Error al extraer coordenadas: {e}")
         return None
 
+def cuadrante_de_coordenadas(coordenadas: np.ndarray) -> str:
+    """Cuadrante VNP46A1 (hXXvYY, rejilla de 10 grados) que contiene el centro del bbox de un polígono lon/lat"""
+    lon = (coordenadas[:, 0].min() + coordenadas[:, 0].max()) / 2
+    lat = (coordenadas[:, 1].min() + coordenadas[:, 1].max()) / 2
+    return f"h{int((lon + 180) // 10):02d}v{int((90 - lat) // 10):02d}"
+
 def left_right_coords(hdf_file) -> Tuple[Optional[Tuple[float, float]], Optional[Tuple[float, float]]]:
     """Extrae las coordenadas de la esquina superior izquierda e inferior derecha del archivo HDF"""
     try:
@@ -1,6 +1,8 @@
 """Tests for FastAPI satellite API endpoints. Use mocks to avoid NASA/processing."""
-from unittest.mock import AsyncMock, patch
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 
@@ -56,6 +58,24 @@ class TestPostJobs:
         assert data["status"] == "pending"
         assert data["job_id"]
 
+    def test_returns_429_when_queue_is_full(self, client):
+        from api.job_queue import QueueFullError
+
+        def reject(job_id, coro, priority):
+            coro.close()
+            raise QueueFullError("Job queue is full (100 jobs waiting)")
+
+        with patch("api.routes._get_available_municipios", return_value=["iztapalapa"]):
+            with patch("api.routes.run_job", new_callable=AsyncMock):
+                with patch("api.routes.submit_job", side_effect=reject):
+                    resp = client.post(
+                        "/jobs",
+                        json={"municipios": ["iztapalapa"], "fecha_inicio": "2024-01-01", "fecha_fin": "2024-01-01"},
+                    )
+        assert resp.status_code == 429
+        assert resp.headers["Retry-After"] == "30"
+        assert job_store._jobs == {}
+
     def test_returns_400_when_municipios_invalid(self, client):
         with patch("api.routes._get_available_municipios", return_value=["iztapalapa"]):
             resp = client.post(
@@ -159,10 +179,44 @@ class TestDeleteJob:
         assert resp.status_code == 204
         assert job_store.get("to-delete") is None
 
+    def test_discards_checkpoint_journal(self, client):
+        from satellite_async.checkpoint import CheckpointJournal
+
+        CheckpointJournal("to-delete").begin({"fechas": ["01-01-24"]})
+        job_store.create("to-delete")
+        assert client.delete("/jobs/to-delete").status_code == 204
+        assert not CheckpointJournal("to-delete").exists()
+
 
 # --- POST /matriz ---
 
 
+class TestResumeJob:
+    def test_returns_404_without_checkpoint(self, client):
+        resp = client.post("/jobs/unknown-id/resume")
+        assert resp.status_code == 404
+
+    def test_returns_409_when_job_still_running(self, client):
+        state = job_store.create("running-id")
+        state.task = MagicMock()
+        state.task.done.return_value = False
+        resp = client.post("/jobs/running-id/resume")
+        assert resp.status_code == 409
+
+    def test_restarts_job_from_checkpoint(self, client):
+        from satellite_async.checkpoint import CheckpointJournal
+
+        CheckpointJournal("old-id").begin(
+            {"municipios": ["iztapalapa"], "fechas": ["01-01-24", "02-01-24"], "chunks": 1, "incremental": True}
+        )
+        with patch("api.job_manager.run_job", new_callable=AsyncMock) as run_job:
+            resp = client.post("/jobs/old-id/resume")
+        assert resp.status_code == 202
+        assert resp.json()["job_id"] == "old-id"
+        assert job_store.get("old-id") is not None
+        run_job.assert_called_once_with("old-id", ["iztapalapa"], ["01-01-24", "02-01-24"], 1, True)
+
+
 class TestPostMatriz:
     def test_returns_202_and_job_id_when_valid(self, client):
         with patch("api.routes._get_available_municipios", return_value=["iztapalapa"]):
@@ -244,3 +298,215 @@ class TestGetMatrizResult:
         assert data["cols"] == 11
         assert len(data["radiance_matrix"]) == 11
         assert len(data["municipality_mask"]) == 11
+
+    def test_json_fallback_converts_numpy_arrays(self, client):
+        state = job_store.create("matriz-numpy")
+        state.status = "completed"
+        radiance = np.array([[1.5, np.nan], [np.inf, 2.0]], dtype=np.float32)
+        state.results = [
+            {
+                "job_id": "matriz-numpy",
+                "municipio": "iztapalapa",
+                "fecha": date(2024, 1, 15),
+                "bbox": {"min_x": 0, "max_x": 1, "min_y": 0, "max_y": 1},
+                "rows": 2,
+                "cols": 2,
+                "radiance_matrix": radiance,
+                "municipality_mask": np.array([[1, 0], [0, 1]], dtype=np.uint8),
+            }
+        ]
+        resp = client.get("/matriz/matriz-numpy/resultado")
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["radiance_matrix"] == [[1.5, None], [None, 2.0]]
+        assert data["municipality_mask"] == [[1, 0], [0, 1]]
+
+    def test_returns_binary_when_requested(self, client):
+        state = job_store.create("matriz-bin")
+        state.status = "completed"
+        radiance = np.arange(12, dtype=np.float32).reshape(3, 4)
+        radiance[0, 1] = np.nan
+        mask = np.zeros((3, 4), dtype=np.uint8)
+        mask[1, 1:3] = 1
+        state.results = [
+            {
+                "job_id": "matriz-bin",
+                "municipio": "iztapalapa",
+                "fecha": date(2024, 1, 15),
+                "bbox": {"min_x": 5, "max_x": 8, "min_y": 2, "max_y": 4},
+                "rows": 3,
+                "cols": 4,
+                "radiance_matrix": radiance,
+                "municipality_mask": mask,
+            }
+        ]
+        resp = client.get(
+            "/matriz/matriz-bin/resultado",
+            headers={"Accept": "application/octet-stream"},
+        )
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "application/octet-stream"
+        rows, cols = int(resp.headers["x-rows"]), int(resp.headers["x-cols"])
+        assert (rows, cols) == (3, 4)
+        assert resp.headers["x-fecha"] == "2024-01-15"
+        n_radiance = int(resp.headers["x-radiance-bytes"])
+        assert n_radiance == rows * cols * 4
+        decoded = np.frombuffer(resp.content[:n_radiance], dtype="<f4").reshape(rows, cols)
+        np.testing.assert_array_equal(decoded, radiance)
+        decoded_mask = np.unpackbits(
+            np.frombuffer(resp.content[n_radiance:], dtype=np.uint8), count=rows * cols
+        ).reshape(rows, cols)
+        np.testing.assert_array_equal(decoded_mask, mask)
+
+    def test_binary_accepts_json_style_lists(self, client):
+        state = job_store.create("matriz-bin-list")
+        state.status = "completed"
+        state.results = [
+            {
+                "job_id": "matriz-bin-list",
+                "municipio": "iztapalapa",
+                "fecha": "2024-01-15",
+                "bbox": {"min_x": 0, "max_x": 1, "min_y": 0, "max_y": 0},
+                "rows": 1,
+                "cols": 2,
+                "radiance_matrix": [[0.5, None]],
+                "municipality_mask": [[1, 1]],
+            }
+        ]
+        resp = client.get(
+            "/matriz/matriz-bin-list/resultado",
+            headers={"Accept": "application/octet-stream, application/json;q=0.5"},
+        )
+        assert resp.status_code == 200
+        decoded = np.frombuffer(resp.content[:8], dtype="<f4")
+        assert decoded[0] == np.float32(0.5)
+        assert np.isnan(decoded[1])
+        assert resp.content[8:] == bytes([0b11000000])
+
+
+# --- POST /matriz/rango ---
+
+
+class TestPostMatrizRango:
+    def test_returns_202_and_queues_one_date_per_day(self, client):
+        with patch("api.routes._get_available_municipios", return_value=["iztapalapa"]):
+            with patch("api.routes.run_matriz_rango_job", new_callable=AsyncMock) as run:
+                resp = client.post(
+                    "/matriz/rango",
+                    json={"municipio": "Iztapalapa", "fecha_inicio": "2024-01-30", "fecha_fin": "2024-02-02"},
+                )
+        assert resp.status_code == 202
+        assert resp.json()["status"] == "pending"
+        fechas = run.call_args.args[2]
+        assert fechas == [date(2024, 1, 30), date(2024, 1, 31), date(2024, 2, 1), date(2024, 2, 2)]
+
+    def test_returns_400_when_fecha_fin_before_fecha_inicio(self, client):
+        resp = client.post(
+            "/matriz/rango",
+            json={"municipio": "Iztapalapa", "fecha_inicio": "2024-01-10", "fecha_fin": "2024-01-01"},
+        )
+        assert resp.status_code == 400
+
+    def test_returns_400_when_range_too_long(self, client):
+        with patch("api.routes.MATRIZ_RANGO_MAX_DIAS", 7):
+            resp = client.post(
+                "/matriz/rango",
+                json={"municipio": "Iztapalapa", "fecha_inicio": "2024-01-01", "fecha_fin": "2024-01-31"},
+            )
+        assert resp.status_code == 400
+        assert "maximum is 7" in resp.json()["detail"]
+
+
+# --- GET /matriz/rango/{job_id}/resultado ---
+
+
+class TestGetMatrizRangoResult:
+    @staticmethod
+    def _completed_cube(job_id):
+        cube = np.arange(24, dtype=np.float32).reshape(2, 3, 4)
+        cube[1] = np.nan
+        mask = np.zeros((3, 4), dtype=np.uint8)
+        mask[1, 1:3] = 1
+        state = job_store.create(job_id)
+        state.status = "completed"
+        state.results = [
+            {
+                "job_id": job_id,
+                "municipio": "iztapalapa",
+                "fechas": [date(2024, 1, 1), date(2024, 1, 2)],
+                "available": [True, False],
+                "bbox": {"min_x": 5, "max_x": 8, "min_y": 2, "max_y": 4},
+                "rows": 3,
+                "cols": 4,
+                "radiance_cube": cube,
+                "municipality_mask": mask,
+            }
+        ]
+        return cube, mask
+
+    def test_returns_chunked_binary_when_requested(self, client):
+        cube, mask = self._completed_cube("cubo-bin")
+        resp = client.get(
+            "/matriz/rango/cubo-bin/resultado",
+            headers={"Accept": "application/octet-stream"},
+        )
+        assert resp.status_code == 200
+        assert resp.headers["x-fecha-inicio"] == "2024-01-01"
+        assert resp.headers["x-available"] == "10"
+        times, rows, cols = (int(resp.headers[h]) for h in ("x-times", "x-rows", "x-cols"))
+        assert (times, rows, cols) == (2, 3, 4)
+        n_radiance = int(resp.headers["x-radiance-bytes"])
+        assert n_radiance == times * int(resp.headers["x-frame-bytes"])
+        decoded = np.frombuffer(resp.content[:n_radiance], dtype="<f4").reshape(times, rows, cols)
+        np.testing.assert_array_equal(decoded, cube)
+        decoded_mask = np.unpackbits(
+            np.frombuffer(resp.content[n_radiance:], dtype=np.uint8), count=rows * cols
+        ).reshape(rows, cols)
+        np.testing.assert_array_equal(decoded_mask, mask)
+
+    def test_json_fallback_uses_null_for_missing_dates(self, client):
+        self._completed_cube("cubo-json")
+        resp = client.get("/matriz/rango/cubo-json/resultado")
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["fechas"] == ["2024-01-01", "2024-01-02"]
+        assert data["radiance_cube"][0][0] == [0.0, 1.0, 2.0, 3.0]
+        assert data["radiance_cube"][1][0] == [None] * 4
+
+    def test_single_date_jobs_are_not_cubes(self, client):
+        state = job_store.create("matriz-single")
+        state.status = "completed"
+        state.results = [{"job_id": "matriz-single", "radiance_matrix": [[1.0]]}]
+        assert client.get("/matriz/rango/matriz-single/resultado").status_code == 404
+        self._completed_cube("cubo-single")
+        assert client.get("/matriz/cubo-single/resultado").status_code == 404
+
+
+# --- GET /metrics ---
+
+
+class TestGetMetrics:
+    def test_returns_404_when_disabled(self, client):
+        from satellite_async.metrics import MetricsRegistry
+
+        with patch("api.routes.get_metrics", return_value=MetricsRegistry(enabled=False)):
+            resp = client.get("/metrics")
+        assert resp.status_code == 404
+
+    def test_returns_prometheus_text_for_process_and_job(self, client):
+        from satellite_async.metrics import MetricsRegistry, job_scope
+
+        registry = MetricsRegistry(enabled=True)
+        with job_scope("job-m"):
+            registry.observe("download", 1.5)
+            registry.inc("download_bytes_total", 2048)
+        with patch("api.routes.get_metrics", return_value=registry):
+            resp = client.get("/metrics")
+            job_resp = client.get("/metrics", params={"job_id": "job-m"})
+            unknown = client.get("/metrics", params={"job_id": "other"})
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain")
+        assert 'vnp46a1_stage_seconds_count{stage="download"} 1' in resp.text
+        assert "vnp46a1_download_bytes_total 2048" in resp.text
+        assert 'vnp46a1_download_bytes_total{job_id="job-m"} 2048' in job_resp.text
+        assert unknown.status_code == 404
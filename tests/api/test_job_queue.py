@@ -0,0 +1,100 @@
+"""Tests for the API job queue (slots, priorities, positions and admission control)."""
+import asyncio
+
+import pytest
+
+from api.job_queue import BULK, INTERACTIVE, JobQueue, QueueFullError
+
+
+async def _job(started, name, gate):
+    started.append(name)
+    await gate.wait()
+    return name
+
+
+async def test_only_workers_jobs_run_at_once():
+    queue = JobQueue(workers=2, max_queued=10)
+    started, gate = [], asyncio.Event()
+    tasks = [queue.submit(f"job-{i}", _job(started, f"job-{i}", gate)) for i in range(4)]
+    await asyncio.sleep(0)
+    assert started == ["job-0", "job-1"]
+    assert queue.position("job-2") == 1
+    assert queue.position("job-3") == 2
+    gate.set()
+    assert await asyncio.gather(*tasks) == ["job-0", "job-1", "job-2", "job-3"]
+    assert queue.position("job-3") is None
+
+
+async def test_interactive_jobs_jump_ahead_of_bulk_jobs():
+    queue = JobQueue(workers=1, max_queued=10)
+    started, gate = [], asyncio.Event()
+    tasks = [
+        queue.submit("running", _job(started, "running", gate)),
+        queue.submit("bulk", _job(started, "bulk", gate), BULK),
+        queue.submit("matriz", _job(started, "matriz", gate), INTERACTIVE),
+    ]
+    await asyncio.sleep(0)
+    assert queue.position("matriz") == 1
+    assert queue.position("bulk") == 2
+    gate.set()
+    await asyncio.gather(*tasks)
+    assert started == ["running", "matriz", "bulk"]
+
+
+async def test_full_queue_rejects_new_jobs():
+    queue = JobQueue(workers=1, max_queued=1)
+    started, gate = [], asyncio.Event()
+    tasks = [queue.submit("a", _job(started, "a", gate)), queue.submit("b", _job(started, "b", gate))]
+    rejected = _job(started, "c", gate)
+    with pytest.raises(QueueFullError):
+        queue.submit("c", rejected)
+    gate.set()
+    await asyncio.gather(*tasks)
+    assert "c" not in started
+
+
+async def test_cancelled_waiting_job_frees_its_place():
+    positions = {}
+    queue = JobQueue(workers=1, max_queued=10, on_position=lambda job_id, pos: positions.__setitem__(job_id, pos))
+    started, gate = [], asyncio.Event()
+    running = queue.submit("running", _job(started, "running", gate))
+    waiting = queue.submit("waiting", _job(started, "waiting", gate))
+    last = queue.submit("last", _job(started, "last", gate))
+    assert positions == {"waiting": 1, "last": 2}
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert positions["last"] == 1
+    gate.set()
+    await asyncio.gather(running, last)
+    assert started == ["running", "last"]
+
+
+async def test_jobs_cancelled_before_starting_release_their_slots():
+    queue = JobQueue(workers=1, max_queued=10)
+    started, gate = [], asyncio.Event()
+    running = queue.submit("a", _job(started, "a", gate))
+    waiting = queue.submit("b", _job(started, "b", gate))
+    # Neither task has taken a step yet
+    running.cancel()
+    waiting.cancel()
+    await asyncio.gather(running, waiting, return_exceptions=True)
+    assert queue._running == set()
+    gate.set()
+    assert await queue.submit("c", _job(started, "c", gate)) == "c"
+    assert started == ["c"]
+
+
+async def test_jobs_run_with_their_metrics_scope(monkeypatch):
+    from satellite_async import metrics
+
+    registry = metrics.MetricsRegistry(enabled=True)
+    monkeypatch.setattr(metrics, "_registry", registry)
+
+    async def instrumented():
+        metrics.inc("cache_hits_total")
+
+    queue = JobQueue(workers=1, max_queued=10)
+    await queue.submit("job-metrics", instrumented())
+    assert registry.counter("cache_hits_total", "job-metrics") == 1
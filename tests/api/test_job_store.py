@@ -0,0 +1,115 @@
+"""Tests for the API job stores (in-memory and SQLite)."""
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from api.job_store import JobStore, SQLiteJobStore, create_job_store
+from satellite_async.checkpoint import CheckpointJournal
+
+
+def _finish(store, job_id, results, finished_at=None):
+    state = store.get(job_id) or store.create(job_id)
+    state.results = results
+    state.total_results = len(results)
+    state.status = "completed"
+    state.finished_at = finished_at or datetime.utcnow()
+    store.save(state)
+    return state
+
+
+class TestMemoryJobStore:
+    def test_expired_jobs_are_evicted(self):
+        store = JobStore(ttl_seconds=60)
+        _finish(store, "old", [{"a": 1}], finished_at=datetime.utcnow() - timedelta(minutes=5))
+        _finish(store, "new", [{"a": 1}])
+        assert store.get("old") is None
+        assert store.get("new") is not None
+
+    def test_eviction_discards_checkpoint_journal(self):
+        store = JobStore(ttl_seconds=60)
+        for job_id in ("old", "new"):
+            CheckpointJournal(job_id).begin({"fechas": ["01-01-24"]})
+        _finish(store, "old", [], finished_at=datetime.utcnow() - timedelta(minutes=5))
+        _finish(store, "new", [])
+        assert not CheckpointJournal("old").exists()
+        assert CheckpointJournal("new").exists()
+
+    def test_oldest_finished_jobs_evicted_over_budget(self):
+        store = JobStore(max_bytes=3000)
+        running = store.create("running")
+        running.status = "running"
+        matrix = np.zeros((25, 25), dtype=np.float32)  # 2500 bytes
+        _finish(store, "first", [{"radiance_matrix": matrix}])
+        _finish(store, "second", [{"radiance_matrix": matrix}])
+        assert store.get("first") is None
+        assert store.get("second").results[0]["radiance_matrix"] is matrix
+        assert store.get("running") is running
+
+    def test_newest_job_is_kept_even_if_over_budget(self):
+        store = JobStore(max_bytes=10)
+        _finish(store, "big", [{"radiance_matrix": np.zeros(100)}])
+        assert store.get("big") is not None
+
+
+class TestSQLiteJobStore:
+    def test_results_are_spilled_and_loaded_lazily(self, tmp_path):
+        store = SQLiteJobStore(str(tmp_path / "jobs.sqlite"), str(tmp_path / "results"))
+        state = store.create("job-1")
+        rows = [{"Fecha": date(2024, 1, 1), "Municipio": "norte"}]
+        _finish(store, "job-1", rows)
+        assert state._results is None
+        assert state.results_path.endswith("job-1.pkl")
+        assert store._jobs == {}
+
+        loaded = store.get("job-1")
+        assert loaded.status == "completed"
+        assert loaded.total_results == 1
+        assert loaded.results == rows
+
+    def test_jobs_survive_restart_and_running_jobs_are_marked_failed(self, tmp_path):
+        db, results_dir = str(tmp_path / "jobs.sqlite"), str(tmp_path / "results")
+        store = SQLiteJobStore(db, results_dir)
+        _finish(store, "done", [{"x": 1}])
+        running = store.create("running")
+        running.status = "running"
+        store.save(running)
+        store.close()
+
+        reopened = SQLiteJobStore(db, results_dir)
+        assert reopened.get("done").results == [{"x": 1}]
+        interrupted = reopened.get("running")
+        assert interrupted.status == "failed"
+        assert "restart" in interrupted.error
+        assert interrupted.finished_at is not None
+        reopened.close()
+
+    def test_remove_deletes_row_and_spill_file(self, tmp_path):
+        store = SQLiteJobStore(str(tmp_path / "jobs.sqlite"), str(tmp_path / "results"))
+        path = _finish(store, "job-1", [{"x": 1}]).results_path
+        store.remove("job-1")
+        assert store.get("job-1") is None
+        assert not os.path.exists(path)
+        store.close()
+
+    def test_ttl_eviction_removes_spilled_jobs(self, tmp_path):
+        store = SQLiteJobStore(str(tmp_path / "jobs.sqlite"), str(tmp_path / "results"), ttl_seconds=60)
+        _finish(store, "old", [{"x": 1}], finished_at=datetime.utcnow() - timedelta(hours=1))
+        assert store.get("old") is None
+        assert list((tmp_path / "results").iterdir()) == []
+        store.close()
+
+    def test_recreating_a_job_keeps_its_journal(self, tmp_path):
+        store = SQLiteJobStore(str(tmp_path / "jobs.sqlite"), str(tmp_path / "results"))
+        CheckpointJournal("job-1").begin({"fechas": ["01-01-24"]})
+        _finish(store, "job-1", [])
+        store.create("job-1")  # resume_job replaces the previous row
+        assert CheckpointJournal("job-1").exists()
+        store.close()
+
+
+def test_create_job_store_rejects_unknown_backend():
+    assert type(create_job_store("memory")) is JobStore
+    with pytest.raises(ValueError):
+        create_job_store("redis")
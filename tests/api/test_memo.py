@@ -0,0 +1,178 @@
+"""Tests for request-level result memoization."""
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from api import job_manager
+from api.job_manager import job_store, memo, resume_job, run_job
+from api.main import app
+from api.memo import ResultMemo
+from satellite_async.checkpoint import CheckpointJournal
+from satellite_async.models import CoordenadasPixeles
+from satellite_async.satellite_async import LoteMediciones
+
+
+def _row(municipio, fecha):
+    return {
+        "Fecha": fecha,
+        "Municipio": municipio,
+        "Cantidad_de_pixeles": 1,
+        "Suma_de_radianza": 1.0,
+        "Media_de_radianza": 1.0,
+        "Desviacion_estandar_de_radianza": 0.0,
+        "Maximo_de_radianza": 1.0,
+        "Minimo_de_radianza": 1.0,
+        "Percentil_25_de_radianza": 1.0,
+        "Percentil_50_de_radianza": 1.0,
+        "Percentil_75_de_radianza": 1.0,
+    }
+
+
+@pytest.fixture(autouse=True)
+def clean_memo():
+    memo.clear()
+    memo.hits = memo.misses = memo.evictions = memo.served_requests = 0
+    yield
+    memo.clear()
+    for job_id in list(job_store._jobs):
+        job_store.remove(job_id)
+
+
+class TestResultMemo:
+    def test_lookup_reports_missing_pairs_and_counts_hits(self):
+        m = ResultMemo(max_bytes=1024**2)
+        m.store_mediciones([_row("norte", date(2024, 1, 1))])
+        rows, missing = m.lookup_mediciones(["norte", "sur"], [date(2024, 1, 1), date(2024, 1, 2)])
+        assert rows == [_row("norte", date(2024, 1, 1))]
+        assert missing == {date(2024, 1, 1): ["sur"], date(2024, 1, 2): ["norte", "sur"]}
+        stats = m.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 3)
+        assert stats["hit_rate"] == 0.25
+
+    def test_lru_eviction_keeps_within_budget(self):
+        matrix = np.zeros(1000, dtype=np.float32)  # 4000 bytes
+        m = ResultMemo(max_bytes=9000)
+        for day in (1, 2, 3):
+            m.put(m.matriz_key("norte", date(2024, 1, day)), {"radiance_matrix": matrix})
+        assert m.matriz_key("norte", date(2024, 1, 1)) not in m
+        assert m.matriz_key("norte", date(2024, 1, 3)) in m
+        assert m.stats()["evictions"] == 1
+        assert m.stats()["bytes"] <= 9000
+
+    def test_zero_budget_disables_memo(self):
+        m = ResultMemo(max_bytes=0)
+        m.store_mediciones([_row("norte", date(2024, 1, 1))])
+        assert m.stats()["entries"] == 0
+
+
+async def test_run_job_computes_only_the_gap():
+    memo.store_mediciones([_row("norte", date(2024, 1, 1))])
+    job_store.create("job-1")
+
+    class FakeSatellite:
+        created_with = None
+        run_with = None
+
+        def __init__(self, municipios):
+            FakeSatellite.created_with = municipios
+
+        async def iter_measures(self, fechas, **kwargs):
+            FakeSatellite.run_with = fechas
+            yield LoteMediciones("02-01-24", [_row("norte", date(2024, 1, 2))], "calculado")
+
+    with patch.object(job_manager, "SatelliteImagesAsync", FakeSatellite):
+        await run_job("job-1", ["Norte"], ["01-01-24", "02-01-24"], None)
+
+    state = job_store.get("job-1")
+    assert state.status == "completed"
+    assert FakeSatellite.created_with == ["norte"]
+    assert FakeSatellite.run_with == ["02-01-24"]
+    assert [r["Fecha"] for r in state.results] == [date(2024, 1, 1), date(2024, 1, 2)]
+    assert memo.medicion_key("norte", date(2024, 1, 2)) in memo
+
+
+async def test_resume_after_restart_includes_memo_served_rows(sample_hdf5_path):
+    """The journal keeps the full request, so a resume with an empty memo computes what the memo served."""
+    pixeles = {"norte": [(1, 1), (2, 2)], "sur": [(3, 3), (4, 4)]}
+    memo.store_mediciones([_row("norte", date(2024, 1, d)) for d in (1, 2)])
+    calls = []
+    fallar = {2: True}
+
+    async def flaky_fetch(session, year, day, cuadrante, **kwargs):
+        calls.append(int(day))
+        if fallar.pop(int(day), False):
+            raise ConnectionError("LAADS no responde")
+        return sample_hdf5_path
+
+    def fake_load(municipio, path):
+        return CoordenadasPixeles(cuadrante="h08v07", coordenadas_pixeles=pixeles[municipio])
+
+    with patch("satellite_async.satellite_async.load_coord_data", side_effect=fake_load), \
+            patch("satellite_async.satellite_async.find_files", new=AsyncMock(return_value={})), \
+            patch("satellite_async.satellite_async.fetch_granule", side_effect=flaky_fetch):
+        job_store.create("job-1")
+        await run_job("job-1", ["Norte", "Sur"], ["01-01-24", "02-01-24"], 1)
+        assert job_store.get("job-1").status == "failed"
+        assert CheckpointJournal("job-1").load().params["municipios"] == ["norte", "sur"]
+
+        # API restart: memo and job store are gone, only the journal survives
+        memo.clear()
+        job_store.remove("job-1")
+        calls.clear()
+        queued = []
+        with patch.object(job_manager, "submit_job", side_effect=lambda job_id, coro, priority: queued.append(coro)):
+            resume_job("job-1")
+        job_store.create("job-1")
+        await queued[0]
+
+    state = job_store.get("job-1")
+    assert state.status == "completed"
+    assert not CheckpointJournal("job-1").exists()
+    # 01-01 is fetched again only for norte (sur is restored from the journal); 02-01 for both
+    assert calls == [1, 2]
+    assert sorted((r["Fecha"].day, r["Municipio"]) for r in state.results) == [
+        (1, "norte"), (1, "sur"), (2, "norte"), (2, "sur"),
+    ]
+
+
+def test_fully_memoized_job_is_returned_completed():
+    memo.store_mediciones([_row("iztapalapa", date(2024, 1, d)) for d in (1, 2)])
+    client = TestClient(app)
+    with patch("api.routes._get_available_municipios", return_value=["iztapalapa"]):
+        with patch("api.routes.run_job", new_callable=AsyncMock) as mocked:
+            resp = client.post(
+                "/jobs",
+                json={"municipios": ["iztapalapa"], "fecha_inicio": "2024-01-01", "fecha_fin": "2024-01-02"},
+            )
+    assert resp.status_code == 202
+    assert resp.json()["status"] == "completed"
+    assert resp.json()["total_results"] == 2
+    mocked.assert_not_called()
+
+    stats = client.get("/memo/stats").json()
+    assert stats["hits"] == 2
+    assert stats["served_requests"] == 1
+
+
+def test_memoized_matriz_is_returned_completed():
+    result = {
+        "municipio": "iztapalapa",
+        "fecha": date(2024, 1, 1),
+        "bbox": {"min_x": 0, "max_x": 1, "min_y": 0, "max_y": 1},
+        "rows": 2,
+        "cols": 2,
+        "radiance_matrix": np.ones((2, 2), dtype=np.float32),
+        "municipality_mask": np.ones((2, 2), dtype=np.uint8),
+    }
+    memo.put(memo.matriz_key("iztapalapa", date(2024, 1, 1)), result)
+    client = TestClient(app)
+    with patch("api.routes._get_available_municipios", return_value=["iztapalapa"]):
+        resp = client.post("/matriz", json={"municipio": "Iztapalapa", "fecha": "2024-01-01"})
+    assert resp.json()["status"] == "completed"
+    job_id = resp.json()["job_id"]
+    data = client.get(f"/matriz/{job_id}/resultado").json()
+    assert data["job_id"] == job_id
+    assert data["radiance_matrix"] == [[1.0, 1.0], [1.0, 1.0]]
@@ -0,0 +1,88 @@
+"""Tests for streaming job events (GET /jobs/{job_id}/stream)."""
+import asyncio
+import json
+from datetime import date, datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.job_manager import job_store
+from api.main import app
+from api.streaming import JobEvents, medicion_event, status_event, stream_job
+
+
+def _medicion(day):
+    return {
+        "Fecha": date(2024, 1, day),
+        "Municipio": "iztapalapa",
+        "Cantidad_de_pixeles": 1,
+        "Suma_de_radianza": 1.0,
+        "Media_de_radianza": 1.0,
+        "Desviacion_estandar_de_radianza": 0.0,
+        "Maximo_de_radianza": 1.0,
+        "Minimo_de_radianza": 1.0,
+        "Percentil_25_de_radianza": 1.0,
+        "Percentil_50_de_radianza": 1.0,
+        "Percentil_75_de_radianza": 1.0,
+    }
+
+
+@pytest.fixture(autouse=True)
+def clear_job_store():
+    yield
+    for job_id in list(job_store._jobs):
+        job_store.remove(job_id)
+
+
+def test_stream_unknown_job_returns_404():
+    assert TestClient(app).get("/jobs/unknown/stream").status_code == 404
+
+
+def test_completed_job_is_replayed_as_ndjson():
+    state = job_store.create("done")
+    state.results = [_medicion(1), _medicion(2)]
+    state.total_results = 2
+    state.status = "completed"
+    state.finished_at = datetime.utcnow()
+    resp = TestClient(app).get("/jobs/done/stream")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in resp.text.splitlines()]
+    assert [e["event"] for e in events] == ["progress", "medicion", "medicion", "end"]
+    assert events[1]["data"]["Fecha"] == "2024-01-01"
+    assert events[-1]["data"]["status"] == "completed"
+
+
+def test_completed_job_as_server_sent_events():
+    state = job_store.create("done")
+    state.status = "completed"
+    resp = TestClient(app).get("/jobs/done/stream", headers={"Accept": "text/event-stream"})
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    messages = [m for m in resp.text.split("\n\n") if m]
+    assert messages[0].startswith("event: progress\ndata: ")
+    assert messages[-1].startswith("event: end\ndata: ")
+
+
+async def test_running_job_streams_events_as_they_are_published():
+    events = JobEvents()
+    state = job_store.create("live")
+    state.status = "running"
+    state.results = [_medicion(1)]
+    lines = []
+
+    async def consume():
+        async for line in stream_job("live", job_store, events, sse=False):
+            lines.append(json.loads(line))
+
+    consumer = asyncio.create_task(consume())
+    await asyncio.sleep(0)
+    # Record produced after the client connected
+    state.results.append(_medicion(2))
+    events.publish("live", *medicion_event(_medicion(2)))
+    state.status = "completed"
+    events.publish("live", *status_event(state, "end"))
+    await asyncio.wait_for(consumer, 1)
+
+    assert [l["event"] for l in lines] == ["progress", "medicion", "medicion", "end"]
+    assert [l["data"]["Fecha"] for l in lines[1:3]] == ["2024-01-01", "2024-01-02"]
+    assert not events.has_subscribers("live")
@@ -0,0 +1,93 @@
+"""Tests for the benchmark granule generator and the local LAADS stand-in."""
+import aiohttp
+import h5py
+import numpy as np
+import pytest
+import requests
+
+from benchmarks.granules import generar_granulo
+from benchmarks.laads_server import LaadsStandIn
+from satellite_async import downloader as async_downloader
+from satellite_async.config import IMAGE_PATH
+from satellite_sync import downloader as sync_downloader
+from satellite_sync.utils import left_right_coords
+
+
+@pytest.fixture
+def granulo(tmp_path):
+    return generar_granulo(str(tmp_path / "granulos"), 2024, 1, "h08v07", size=64, chunks=32, capas_auxiliares=1)
+
+
+class TestGenerarGranulo:
+    def test_has_radiance_and_tile_corners(self, granulo):
+        with h5py.File(granulo.path, "r") as f:
+            radianza = f[IMAGE_PATH][:]
+            assert radianza.shape == (64, 64)
+            assert radianza.dtype == np.float32
+            assert np.isnan(radianza).any()
+            assert left_right_coords(f) == ((-100.0, 20.0), (-90.0, 10.0))
+
+    def test_is_deterministic_and_reused(self, tmp_path, granulo):
+        otro = generar_granulo(str(tmp_path / "otro"), 2024, 1, "h08v07", size=64, chunks=32, capas_auxiliares=1)
+        assert otro.md5 == granulo.md5
+        assert generar_granulo(str(tmp_path / "granulos"), 2024, 1, "h08v07", size=64) == granulo
+
+
+class TestLaadsStandIn:
+    def test_listing_redirect_and_range(self, granulo):
+        with LaadsStandIn([granulo]) as servidor:
+            base = f"{servidor.base_url}/archive/allData/5200/VNP46A1/2024/001/"
+            assert f'href="{granulo.filename}"' in requests.get(base, timeout=5).text
+            listado = requests.get(base.rstrip("/") + ".json", timeout=5).json()["content"]
+            assert listado == [{"name": granulo.filename, "size": granulo.size, "md5sum": granulo.md5}]
+
+            resp = requests.get(base + granulo.filename, timeout=5)
+            assert resp.history[0].status_code == 302
+            assert len(resp.content) == granulo.size
+
+            parcial = requests.get(base + granulo.filename, headers={"Range": "bytes=10-19"}, timeout=5)
+            assert parcial.status_code == 206
+            with open(granulo.path, "rb") as f:
+                f.seek(10)
+                assert parcial.content == f.read(10)
+
+            assert requests.get(f"{servidor.base_url}/archive/allData/5200/VNP46A1/2024/002/", timeout=5).status_code == 404
+
+    def test_html_format_has_no_json_listing(self, granulo):
+        with LaadsStandIn([granulo], formato_listado="html") as servidor:
+            base = f"{servidor.base_url}/archive/allData/5200/VNP46A1/2024/001"
+            assert f'href="{granulo.filename}"' in requests.get(base + "/", timeout=5).text
+            assert requests.get(base + ".json", timeout=5).status_code == 404
+
+    def test_rejects_unknown_listing_format(self, granulo):
+        with pytest.raises(ValueError):
+            LaadsStandIn([granulo], formato_listado="xml")
+
+
+class TestFetchListingAgainstStandIn:
+    """Size and md5 come only from the `.json` listing; without it the HTML listing still works."""
+
+    @pytest.fixture(params=["json", "html"])
+    def servidor(self, request, granulo, monkeypatch):
+        with LaadsStandIn([granulo], formato_listado=request.param) as servidor:
+            base_url = servidor.base_url + "/archive/allData/5200/VNP46A1/{year}/{day}/"
+            monkeypatch.setattr(async_downloader, "BASE_URL", base_url)
+            monkeypatch.setattr(sync_downloader, "BASE_URL", base_url)
+            yield servidor
+
+    def _check(self, entries, servidor, granulo):
+        assert [e["filename"] for e in entries] == [granulo.filename]
+        if servidor.formato_listado == "json":
+            assert (entries[0]["size"], entries[0]["checksum"]) == (granulo.size, granulo.md5)
+        else:
+            assert (entries[0]["size"], entries[0]["checksum"]) == (None, None)
+        with open(granulo.path, "rb") as f:
+            assert requests.get(entries[0]["url"], timeout=5).content == f.read()
+
+    async def test_async(self, servidor, granulo):
+        async with aiohttp.ClientSession() as session:
+            entries = await async_downloader.fetch_listing(session, 2024, "001")
+        self._check(entries, servidor, granulo)
+
+    def test_sync(self, servidor, granulo):
+        self._check(sync_downloader.fetch_listing(2024, "001"), servidor, granulo)
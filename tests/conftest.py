@@ -15,6 +15,57 @@ if str(PROJECT_ROOT) not in sys.path:
 FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
 
 
+@pytest.fixture(autouse=True)
+def isolated_granule_cache(tmp_path, monkeypatch):
+    """Point the process-wide granule cache at a per-test directory."""
+    from satellite_async import cache
+
+    granule_cache = cache.GranuleCache(str(tmp_path / "granule_cache"), max_bytes=10 * 1024**2)
+    monkeypatch.setattr(cache, "_default_cache", granule_cache)
+    return granule_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_listing_index(tmp_path, monkeypatch):
+    """Point the process-wide LAADS listing index at a per-test file."""
+    from satellite_async import listing
+
+    index = listing.ListingIndex(str(tmp_path / "laads_listing.jsonl"))
+    monkeypatch.setattr(listing, "_default_index", index)
+    return index
+
+
+@pytest.fixture(autouse=True)
+def isolated_results_store(tmp_path, monkeypatch):
+    """Point the process-wide results store at a per-test SQLite file."""
+    from satellite_async import results_store
+
+    store = results_store.ResultsStore(str(tmp_path / "resultados.sqlite"))
+    monkeypatch.setattr(results_store, "_default_store", store)
+    yield store
+    store.close()
+
+
+@pytest.fixture(autouse=True)
+def isolated_checkpoint_dir(tmp_path, monkeypatch):
+    """Point checkpoint journals at a per-test directory."""
+    from satellite_async import checkpoint
+
+    directory = str(tmp_path / "checkpoints")
+    monkeypatch.setattr(checkpoint, "_checkpoint_dir", directory)
+    return directory
+
+
+@pytest.fixture(autouse=True)
+def isolated_results_dataset(tmp_path, monkeypatch):
+    """Write the Parquet results dataset of `run` to a per-test directory."""
+    from satellite_async import satellite_async
+
+    directory = str(tmp_path / "mediciones")
+    monkeypatch.setattr(satellite_async, "RESULTS_DATASET_DIR", directory)
+    return directory
+
+
 @pytest.fixture
 def fixtures_dir():
     """Path to tests/fixtures directory."""
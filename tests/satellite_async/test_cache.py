@@ -0,0 +1,100 @@
+"""Tests for the persistent granule cache."""
+import os
+import time
+
+import pytest
+
+from satellite_async.cache import GranuleCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return GranuleCache(str(tmp_path / "cache"), max_bytes=250)
+
+
+def _write(path, size):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return str(path)
+
+
+class TestGranuleCache:
+    def test_key_normalizes_day(self, cache):
+        assert cache.key(2024, "001", "h08v07") == cache.key("2024", 1, "h08v07")
+
+    def test_miss_then_hit(self, cache):
+        key = cache.key(2024, 1, "h08v07")
+        assert cache.get(key) is None
+        tmp = _write(cache.temp_path(key), 10)
+        final = cache.put(key, tmp)
+        assert cache.get(key) == final
+        assert not os.path.exists(tmp)
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_put_copies_files_outside_cache(self, cache, tmp_path):
+        key = cache.key(2024, 1, "h08v07")
+        src = _write(tmp_path / "external.h5", 10)
+        final = cache.put(key, src)
+        assert os.path.exists(src)
+        assert os.path.getsize(final) == 10
+
+    def test_evicts_least_recently_used(self, cache):
+        keys = [cache.key(2024, d, "h08v07") for d in (1, 2, 3)]
+        paths = []
+        for i, key in enumerate(keys[:2]):
+            paths.append(cache.put(key, _write(cache.temp_path(key), 100)))
+            os.utime(paths[-1], (time.time() - 100 + i, time.time() - 100 + i))
+        # Touch the first one so the second becomes the LRU entry
+        cache.get(keys[0])
+        cache.put(keys[2], _write(cache.temp_path(keys[2]), 100))
+        assert cache.get(keys[0]) is not None
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[2]) is not None
+        assert cache.stats()["evictions"] == 1
+        assert cache.size_bytes() <= 250
+
+    def test_temp_files_are_not_counted(self, cache):
+        key = cache.key(2024, 1, "h08v07")
+        _write(cache.temp_path(key), 1000)
+        assert cache.size_bytes() == 0
+
+    def test_pinned_granules_are_not_evicted(self, cache):
+        keys = [cache.key(2024, d, "h08v07") for d in (1, 2, 3)]
+        first = cache.put(keys[0], _write(cache.temp_path(keys[0]), 100))
+        os.utime(first, (time.time() - 100, time.time() - 100))
+        assert cache.pin(first)
+        cache.put(keys[1], _write(cache.temp_path(keys[1]), 100))
+        cache.put(keys[2], _write(cache.temp_path(keys[2]), 100))
+        # The pinned LRU entry survives; the next oldest is evicted instead
+        assert os.path.exists(first)
+        assert cache.get(keys[1]) is None
+        cache.unpin(first)
+        cache.put(keys[1], _write(cache.temp_path(keys[1]), 100))
+        assert not os.path.exists(first)
+
+    def test_leased_releases_pin(self, cache):
+        key = cache.key(2024, 1, "h08v07")
+        cache.put(key, _write(cache.temp_path(key), 10))
+        path = cache.get(key, pin=True)
+        with cache.leased(path):
+            assert cache.stats()["pinned"] == 1
+        assert cache.stats()["pinned"] == 0
+
+    def test_claim_staging_is_exclusive(self, cache):
+        key = cache.key(2024, 1, "h08v07")
+        with cache.claim_staging(key) as first:
+            assert first == cache.staging_path(key)
+            with cache.claim_staging(key) as second:
+                assert second != first
+                for suffix in (".part", ".seg"):
+                    with open(second + suffix, "wb") as f:
+                        f.write(b"parcial")
+            # La ruta única no se reanuda: sus restos se eliminan al salir
+            assert not os.path.exists(second + ".part")
+            assert not os.path.exists(second + ".seg")
+        with cache.claim_staging(key) as again:
+            assert again == first
+
+    def test_pin_fails_for_missing_file(self, cache):
+        assert cache.pin(cache.path_for(cache.key(2024, 1, "h08v07"))) is False
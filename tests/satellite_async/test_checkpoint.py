@@ -0,0 +1,103 @@
+"""Tests for checkpoint journals and resuming interrupted runs."""
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from satellite_async.checkpoint import COMPLETADA, EN_CURSO, FALLIDA, CheckpointJournal
+from satellite_async.models import CoordenadasPixeles
+from satellite_async.satellite_async import SatelliteImagesAsync
+
+
+class TestCheckpointJournal:
+    def test_load_returns_none_without_journal(self):
+        assert CheckpointJournal("nada").load() is None
+
+    def test_last_record_of_each_unit_wins(self):
+        journal = CheckpointJournal("job-1")
+        journal.begin({"municipios": ["norte"], "fechas": ["01-01-24", "02-01-24"], "chunks": None})
+        journal.running("01-01-24", "h08v07")
+        journal.done("01-01-24", "h08v07", [{"Municipio": "norte"}])
+        journal.running("02-01-24", "h08v07")
+        journal.failed("02-01-24", "h08v07", "timeout")
+        journal.running("02-01-24", "h08v07")
+
+        state = journal.load()
+        assert state.params["fechas"] == ["01-01-24", "02-01-24"]
+        assert state.completed("01-01-24", "h08v07")
+        assert not state.completed("02-01-24", "h08v07")
+        assert state.filas[("01-01-24", "h08v07")] == [{"Municipio": "norte"}]
+        assert state.counts() == {EN_CURSO: 1, COMPLETADA: 1, FALLIDA: 0}
+
+    def test_completed_records_of_a_unit_accumulate_measured_municipios(self):
+        journal = CheckpointJournal("job-1")
+        journal.begin({"municipios": ["norte", "sur"], "fechas": ["01-01-24"], "chunks": None})
+        journal.done("01-01-24", "h08v07", [{"Municipio": "sur"}], ["sur"])
+        journal.running("01-01-24", "h08v07")
+        journal.done("01-01-24", "h08v07", [{"Municipio": "norte"}], ["norte"])
+
+        state = journal.load()
+        assert state.measured("01-01-24", "h08v07") == {"norte", "sur"}
+        assert state.filas[("01-01-24", "h08v07")] == [{"Municipio": "sur"}, {"Municipio": "norte"}]
+
+    def test_begin_does_not_overwrite_existing_journal(self):
+        journal = CheckpointJournal("job-1")
+        journal.begin({"fechas": ["01-01-24"]})
+        journal.begin({"fechas": ["09-09-24"]})
+        assert journal.load().params["fechas"] == ["01-01-24"]
+
+    def test_truncated_last_line_is_ignored(self):
+        journal = CheckpointJournal("job-1")
+        journal.begin({"fechas": ["01-01-24"]})
+        journal.done("01-01-24", "h08v07", [])
+        with open(journal.path, "a", encoding="utf-8") as f:
+            f.write('{"tipo": "unidad", "fecha": "02-01')
+        state = journal.load()
+        assert state.estados == {("01-01-24", "h08v07"): COMPLETADA}
+
+
+PIXELES = {"norte": [(1, 1), (2, 2)], "sur": [(3, 3), (4, 4)]}
+
+
+def fake_load(municipio, path):
+    return CoordenadasPixeles(cuadrante="h08v07", coordenadas_pixeles=PIXELES[municipio])
+
+
+@pytest.mark.asyncio
+async def test_resume_processes_only_missing_units(sample_hdf5_path):
+    fechas = ["01-01-24", "02-01-24", "03-01-24"]
+    calls = []
+    fallar = {"02-01-24": True}
+
+    async def flaky_fetch(session, year, day, cuadrante, **kwargs):
+        fecha = f"{int(day):02d}-01-24"
+        calls.append(fecha)
+        if fallar.pop(fecha, False):
+            raise ConnectionError("LAADS no responde")
+        return sample_hdf5_path
+
+    with patch("satellite_async.satellite_async.load_coord_data", side_effect=fake_load):
+        sat = SatelliteImagesAsync(["norte", "sur"])
+    with patch("satellite_async.satellite_async.find_files", new=AsyncMock(return_value={})):
+        with patch("satellite_async.satellite_async.fetch_granule", side_effect=flaky_fetch):
+            with pytest.raises(ConnectionError):
+                await sat.run(fechas, chunks=1, save_progress_enabled=False, job_id="job-1")
+            assert calls == ["01-01-24", "02-01-24"]
+
+            state = CheckpointJournal("job-1").load()
+            assert state.completed("01-01-24", "h08v07")
+            assert state.errores[("02-01-24", "h08v07")] == "LAADS no responde"
+
+            calls.clear()
+            with patch("satellite_async.satellite_async.load_coord_data", side_effect=fake_load):
+                df = await SatelliteImagesAsync.resume("job-1", save_progress_enabled=False)
+
+    assert calls == ["02-01-24", "03-01-24"]
+    assert len(df) == 6
+    assert [d.day for d in df["Fecha"]] == [1, 1, 2, 2, 3, 3]
+    assert CheckpointJournal("job-1").load().counts()[COMPLETADA] == 3
+
+
+@pytest.mark.asyncio
+async def test_resume_without_journal_raises():
+    with pytest.raises(FileNotFoundError):
+        await SatelliteImagesAsync.resume("desconocido")
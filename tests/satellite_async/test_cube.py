@@ -0,0 +1,85 @@
+"""Tests for the radiance time cube of satellite_async.cube."""
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+import h5py
+import numpy as np
+import pytest
+
+from satellite_async import cube
+from satellite_async.config import IMAGE_PATH
+from satellite_async.models import CoordenadasPixeles
+from satellite_async.processing import municipality_window, read_radiance_window
+
+
+COORDS = [(2, 3), (4, 3), (3, 5)]
+
+
+@pytest.fixture
+def coord_data():
+    return CoordenadasPixeles(cuadrante="h08v07", coordenadas_pixeles=COORDS)
+
+
+class TestMunicipalityWindow:
+    def test_bbox_and_mask_from_coordinates(self):
+        bbox, mask = municipality_window(COORDS)
+        assert bbox == {"min_x": 2, "max_x": 4, "min_y": 3, "max_y": 5}
+        assert mask.shape == (3, 3)
+        assert mask.sum() == 3
+        assert mask[0, 0] == mask[0, 2] == mask[2, 1] == 1
+
+    def test_returns_none_without_valid_coordinates(self):
+        assert municipality_window([(-1, -1)]) is None
+
+
+class TestReadRadianceWindow:
+    def test_reads_bbox_from_path_and_bytes(self, sample_hdf5_path):
+        bbox, _ = municipality_window(COORDS)
+        with h5py.File(sample_hdf5_path, "r") as f:
+            expected = f[IMAGE_PATH][3:6, 2:5]
+        np.testing.assert_array_equal(read_radiance_window(sample_hdf5_path, bbox), expected)
+        with open(sample_hdf5_path, "rb") as f:
+            data = f.read()
+        np.testing.assert_array_equal(read_radiance_window(data, bbox), expected)
+
+    def test_returns_none_for_missing_file(self):
+        assert read_radiance_window("/nonexistent.h5", {"min_x": 0, "max_x": 0, "min_y": 0, "max_y": 0}) is None
+
+
+class TestBuildRadianceCube:
+    async def test_fills_available_dates_and_leaves_missing_as_nan(self, coord_data, sample_hdf5_path):
+        fechas = [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)]
+
+        async def fake_fetch(session, year, day, cuadrante, pin=False):
+            return None if day == "002" else sample_hdf5_path
+
+        progress = []
+        with patch.object(cube, "load_coord_data", return_value=coord_data), patch.object(
+            cube, "find_files", new_callable=AsyncMock
+        ) as find_files, patch.object(cube, "fetch_granule", side_effect=fake_fetch):
+            result = await cube.build_radiance_cube(
+                "Iztapalapa", fechas, in_memory=False, on_progress=lambda d, t: progress.append((d, t))
+            )
+
+        find_files.assert_awaited_once()
+        assert find_files.call_args.args[1] == [(2024, "001"), (2024, "002"), (2024, "003")]
+        assert result["available"] == [True, False, True]
+        assert result["radiance_cube"].shape == (3, 3, 3)
+        assert result["radiance_cube"].dtype == np.float32
+        with h5py.File(sample_hdf5_path, "r") as f:
+            expected = f[IMAGE_PATH][3:6, 2:5]
+        np.testing.assert_array_equal(result["radiance_cube"][0], expected)
+        np.testing.assert_array_equal(result["radiance_cube"][2], expected)
+        assert np.isnan(result["radiance_cube"][1]).all()
+        assert result["municipality_mask"].sum() == 3
+        assert sorted(progress)[-1] == (3, 3)
+
+    async def test_releases_cache_pins(self, coord_data, sample_hdf5_path, isolated_granule_cache):
+        key = isolated_granule_cache.key(2024, "001", "h08v07")
+        path = isolated_granule_cache.put(key, sample_hdf5_path)
+        with patch.object(cube, "load_coord_data", return_value=coord_data), patch.object(
+            cube, "find_files", new_callable=AsyncMock
+        ):
+            result = await cube.build_radiance_cube("Iztapalapa", [date(2024, 1, 1)], in_memory=False)
+        assert result["available"] == [True]
+        assert isolated_granule_cache._pins.get(path, 0) == 0
@@ -0,0 +1,141 @@
+"""Tests for the partitioned Parquet results dataset."""
+import glob
+import os
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+import pyarrow as pa
+import pytest
+
+from satellite_async import satellite_async as sat_module
+from satellite_async.dataset import (
+    MEDICIONES_SCHEMA,
+    ResultsDatasetWriter,
+    compact,
+    read_results,
+)
+from satellite_async.models import CoordenadasPixeles
+from satellite_async.satellite_async import SatelliteImagesAsync
+
+
+def _row(municipio, fecha, media=1.0):
+    return {
+        "Fecha": fecha,
+        "Municipio": municipio,
+        "Cantidad_de_pixeles": 4,
+        "Suma_de_radianza": media * 4,
+        "Media_de_radianza": media,
+        "Desviacion_estandar_de_radianza": 0.0,
+        "Maximo_de_radianza": media,
+        "Minimo_de_radianza": media,
+        "Percentil_25_de_radianza": media,
+        "Percentil_50_de_radianza": media,
+        "Percentil_75_de_radianza": media,
+    }
+
+
+def _files(root):
+    return sorted(glob.glob(os.path.join(root, "**", "*.parquet"), recursive=True))
+
+
+class TestResultsDataset:
+    def test_schema_matches_model(self):
+        assert MEDICIONES_SCHEMA.field("Fecha").type == pa.date32()
+        assert MEDICIONES_SCHEMA.field("Cantidad_de_pixeles").type == pa.int64()
+        assert MEDICIONES_SCHEMA.field("Media_de_radianza").type == pa.float64()
+
+    def test_append_writes_new_files_per_partition(self, tmp_path):
+        root = str(tmp_path / "ds")
+        writer = ResultsDatasetWriter(root)
+        writer.append([_row("norte", date(2023, 12, 31)), _row("norte", date(2024, 1, 1))])
+        writer.append([_row("norte", date(2024, 1, 2)), _row("sur", date(2024, 1, 2))])
+        partitions = {os.path.relpath(os.path.dirname(f), root) for f in _files(root)}
+        assert partitions == {
+            os.path.join("municipio=norte", "year=2023"),
+            os.path.join("municipio=norte", "year=2024"),
+            os.path.join("municipio=sur", "year=2024"),
+        }
+        assert len(_files(os.path.join(root, "municipio=norte", "year=2024"))) == 2
+        assert not glob.glob(os.path.join(root, ".staging-*"))
+
+    def test_read_results_prunes_by_municipio_and_dates(self, tmp_path):
+        root = str(tmp_path / "ds")
+        writer = ResultsDatasetWriter(root)
+        writer.append([_row("norte", date(2023, 12, 31)), _row("norte", date(2024, 1, 5)), _row("sur", date(2024, 1, 5))])
+        df = read_results(root, municipios=["norte"], fecha_inicio=date(2024, 1, 1))
+        assert list(df["Municipio"]) == ["norte"]
+        assert list(df["Fecha"]) == [date(2024, 1, 5)]
+        assert list(df.columns) == MEDICIONES_SCHEMA.names
+
+    def test_read_results_on_missing_dataset_is_empty(self, tmp_path):
+        df = read_results(str(tmp_path / "nada"))
+        assert df.empty
+        assert list(df.columns) == MEDICIONES_SCHEMA.names
+
+    def test_compact_merges_files_and_keeps_latest_duplicate(self, tmp_path):
+        root = str(tmp_path / "ds")
+        writer = ResultsDatasetWriter(root)
+        writer.append([_row("norte", date(2024, 1, 2), media=1.0)])
+        writer.append([_row("norte", date(2024, 1, 1)), _row("norte", date(2024, 1, 2), media=9.0)])
+        assert compact(root) == 1
+        assert len(_files(root)) == 1
+        df = read_results(root)
+        assert list(df["Fecha"]) == [date(2024, 1, 1), date(2024, 1, 2)]
+        assert df["Media_de_radianza"].iloc[1] == 9.0
+        # A compacted partition is left alone
+        assert compact(root) == 0
+
+    def test_latest_write_wins_regardless_of_file_order(self, tmp_path):
+        root = str(tmp_path / "ds")
+        writer = ResultsDatasetWriter(root)
+        with patch("satellite_async.dataset.time.time_ns", return_value=2):
+            (nuevo,) = writer.append([_row("norte", date(2024, 1, 1), media=9.0)])
+        with patch("satellite_async.dataset.time.time_ns", return_value=1):
+            (viejo,) = writer.append([_row("norte", date(2024, 1, 1), media=1.0)])
+        # The older write sorts last by name and mtime
+        os.rename(viejo, os.path.join(os.path.dirname(viejo), "zz-part.parquet"))
+        os.utime(nuevo, (0, 0))
+        assert read_results(root)["Media_de_radianza"].tolist() == [9.0]
+        assert compact(root) == 1
+        assert read_results(root)["Media_de_radianza"].tolist() == [9.0]
+
+    def test_compact_matches_uri_encoded_partition_names(self, tmp_path):
+        root = str(tmp_path / "ds")
+        writer = ResultsDatasetWriter(root)
+        writer.append([_row("cuajimalpa de morelos", date(2024, 1, 1))])
+        writer.append([_row("cuajimalpa de morelos", date(2024, 1, 2)), _row("norte", date(2024, 1, 2))])
+        assert os.path.isdir(os.path.join(root, "municipio=cuajimalpa%20de%20morelos"))
+        assert compact(root, municipios=["cuajimalpa de morelos"]) == 1
+        df = read_results(root, municipios=["cuajimalpa de morelos"])
+        assert list(df["Fecha"]) == [date(2024, 1, 1), date(2024, 1, 2)]
+
+
+async def _run_norte(sample_hdf5_path, **kwargs):
+    def fake_load(municipio, path):
+        return CoordenadasPixeles(cuadrante="h08v07", coordenadas_pixeles=[(1, 1), (2, 2)])
+
+    with patch("satellite_async.satellite_async.load_coord_data", side_effect=fake_load):
+        sat = SatelliteImagesAsync(["norte"])
+    with patch("satellite_async.satellite_async.find_files", new=AsyncMock(return_value={})):
+        with patch("satellite_async.satellite_async.fetch_granule", new=AsyncMock(return_value=sample_hdf5_path)):
+            return await sat.run(["01-01-24", "02-01-24", "03-01-24"], **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_run_appends_each_chunk_to_the_dataset(tmp_path, sample_hdf5_path, monkeypatch):
+    root = str(tmp_path / "ds")
+    monkeypatch.setattr(sat_module, "ResultsDatasetWriter", lambda *_: ResultsDatasetWriter(root))
+    df = await _run_norte(sample_hdf5_path, chunks=1)
+    assert len(_files(root)) == 3
+    stored = read_results(root, municipios=["norte"])
+    assert len(stored) == len(df) == 3
+
+
+@pytest.mark.asyncio
+async def test_continuous_run_writes_the_dataset_only_when_asked(tmp_path, sample_hdf5_path, monkeypatch):
+    root = str(tmp_path / "ds")
+    monkeypatch.setattr(sat_module, "ResultsDatasetWriter", lambda *_: ResultsDatasetWriter(root))
+    await _run_norte(sample_hdf5_path)
+    assert _files(root) == []
+    await _run_norte(sample_hdf5_path, save_progress_enabled=True)
+    assert len(read_results(root)) == 3
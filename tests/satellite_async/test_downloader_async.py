@@ -1,9 +1,21 @@
 """Tests for satellite_async downloader with mocked HTTP."""
+import asyncio
+import hashlib
+import os
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import aiohttp
 import pytest
 
-from satellite_async.downloader import find_file, download_file
+from satellite_async.downloader import (
+    _split_ranges,
+    download_bytes,
+    download_file,
+    download_segmented,
+    fetch_granule,
+    fetch_granule_source,
+    find_file,
+)
 
 
 def _make_resp(status=200, text="", content_bytes=None):
@@ -74,3 +86,274 @@ class TestDownloadFileAsync:
         session.get = MagicMock(return_value=ctx)
         result = await download_file(session, "http://example.com/file.h5", path)
         assert result is None
+
+    async def test_resumes_with_range_after_interrupted_transfer(self, tmp_path):
+        path = str(tmp_path / "out.h5")
+        payload = b"0123456789" * 3
+        first = _make_resp(200)
+        first.headers = {"Content-Length": str(len(payload))}
+        first.content.read = AsyncMock(side_effect=[payload[:12], aiohttp.ClientPayloadError("cut")])
+        second = _make_resp(206)
+        second.headers = {"Content-Length": str(len(payload) - 12)}
+        second.content.read = AsyncMock(side_effect=[payload[12:], b""])
+        sent_headers = []
+
+        def fake_get(url, headers=None, **kwargs):
+            sent_headers.append(headers)
+            ctx = MagicMock()
+            ctx.__aenter__ = AsyncMock(return_value=[first, second][len(sent_headers) - 1])
+            ctx.__aexit__ = AsyncMock(return_value=None)
+            return ctx
+
+        session = MagicMock()
+        session.get = MagicMock(side_effect=fake_get)
+        result = await download_file(
+            session, "http://example.com/file.h5", path, delay=0, expected_size=len(payload)
+        )
+        assert result == path
+        assert (tmp_path / "out.h5").read_bytes() == payload
+        assert "Range" not in sent_headers[0]
+        assert sent_headers[1]["Range"] == "bytes=12-"
+        assert not (tmp_path / "out.h5.part").exists()
+
+    async def test_rejects_checksum_mismatch(self, tmp_path):
+        path = str(tmp_path / "out.h5")
+        session = MagicMock()
+        ctx = MagicMock()
+        ctx.__aenter__ = AsyncMock(side_effect=lambda: _make_resp(200, content_bytes=b"corrupt"))
+        ctx.__aexit__ = AsyncMock(return_value=None)
+        session.get = MagicMock(return_value=ctx)
+        result = await download_file(
+            session, "http://example.com/file.h5", path, max_retries=2, delay=0,
+            checksum=hashlib.md5(b"expected").hexdigest(),
+        )
+        assert result is None
+        assert not (tmp_path / "out.h5").exists()
+        assert not (tmp_path / "out.h5.part").exists()
+
+
+@pytest.mark.asyncio
+class TestFetchGranule:
+    async def test_downloads_once_then_serves_from_cache(self, isolated_granule_cache):
+        async def fake_download(session, url, path, **kwargs):
+            with open(path, "wb") as f:
+                f.write(b"\x89HDF\r\n\x1a\n" + b"\x00" * 10)
+            return path
+
+        with patch("satellite_async.downloader.find_file", new=AsyncMock(return_value="http://x/f.h5")) as ff:
+            with patch("satellite_async.downloader.download_file", side_effect=fake_download) as dl:
+                first = await fetch_granule(MagicMock(), 2024, "001", "h08v07")
+                second = await fetch_granule(MagicMock(), 2024, "001", "h08v07")
+        assert first == second
+        assert first.startswith(isolated_granule_cache.root)
+        assert ff.await_count == 1
+        assert dl.call_count == 1
+
+    async def test_rejects_non_hdf5_download(self, isolated_granule_cache):
+        async def fake_download(session, url, path, **kwargs):
+            with open(path, "wb") as f:
+                f.write(b"<!DOCTYPE html>")
+            return path
+
+        with patch("satellite_async.downloader.find_file", new=AsyncMock(return_value="http://x/f.h5")):
+            with patch("satellite_async.downloader.download_file", side_effect=fake_download):
+                result = await fetch_granule(MagicMock(), 2024, "001", "h08v07")
+        assert result is None
+        assert isolated_granule_cache.size_bytes() == 0
+
+    async def test_concurrent_requests_share_one_download(self, isolated_granule_cache):
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_download(session, url, path, **kwargs):
+            started.set()
+            await release.wait()
+            with open(path, "wb") as f:
+                f.write(b"\x89HDF\r\n\x1a\n" + b"\x00" * 10)
+            return path
+
+        with patch("satellite_async.downloader.find_file", new=AsyncMock(return_value="http://x/f.h5")):
+            with patch("satellite_async.downloader.download_file", side_effect=slow_download) as dl:
+                tasks = [
+                    asyncio.create_task(fetch_granule(MagicMock(), 2024, "001", "h08v07", pin=True))
+                    for _ in range(3)
+                ]
+                await started.wait()
+                release.set()
+                paths = await asyncio.gather(*tasks)
+        assert dl.call_count == 1
+        assert len(set(paths)) == 1
+        # Each requester holds its own reference
+        assert isolated_granule_cache._pins[os.path.abspath(paths[0])] == 3
+
+    async def test_cancelling_one_waiter_keeps_shared_download(self, isolated_granule_cache):
+        release = asyncio.Event()
+
+        async def slow_download(session, url, path, **kwargs):
+            await release.wait()
+            with open(path, "wb") as f:
+                f.write(b"\x89HDF\r\n\x1a\n")
+            return path
+
+        with patch("satellite_async.downloader.find_file", new=AsyncMock(return_value="http://x/f.h5")):
+            with patch("satellite_async.downloader.download_file", side_effect=slow_download) as dl:
+                first = asyncio.create_task(fetch_granule(MagicMock(), 2024, "001", "h08v07"))
+                second = asyncio.create_task(fetch_granule(MagicMock(), 2024, "001", "h08v07"))
+                await asyncio.sleep(0)
+                first.cancel()
+                release.set()
+                path = await second
+        assert path is not None
+        assert dl.call_count == 1
+
+
+
+def _range_app(payload: bytes, honor_range: bool = True):
+    """Local HTTP server that serves `payload`, answering Range requests with 206."""
+    from aiohttp import web
+
+    async def handler(request):
+        header = request.headers.get("Range")
+        if not header or not honor_range:
+            return web.Response(body=payload)
+        start, _, end = header.removeprefix("bytes=").partition("-")
+        start, end = int(start), int(end) if end else len(payload) - 1
+        return web.Response(
+            status=206,
+            body=payload[start : end + 1],
+            headers={"Content-Range": f"bytes {start}-{end}/{len(payload)}"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/file.h5", handler)
+    return app
+
+
+@pytest.mark.asyncio
+class TestSegmentedDownload:
+    async def test_fetches_ranges_concurrently_and_reassembles(self, tmp_path):
+        from aiohttp.test_utils import TestServer
+
+        payload = bytes(range(256)) * 40
+        progress = []
+        async with TestServer(_range_app(payload)) as server:
+            async with aiohttp.ClientSession() as session:
+                result = await download_segmented(
+                    session,
+                    str(server.make_url("/file.h5")),
+                    str(tmp_path / "out.h5"),
+                    segments=4,
+                    buffer_size=512,
+                    on_bytes=lambda received, total: progress.append((received, total)),
+                    min_bytes=0,
+                    checksum=hashlib.md5(payload).hexdigest(),
+                )
+        assert result == str(tmp_path / "out.h5")
+        assert (tmp_path / "out.h5").read_bytes() == payload
+        assert progress[-1] == (len(payload), len(payload))
+        assert not (tmp_path / "out.h5.seg").exists()
+
+    async def test_failed_segment_cancels_its_siblings(self, tmp_path):
+        from aiohttp.test_utils import TestServer
+
+        payload = b"x" * 4000
+        cancelled = []
+
+        async def fake_segment(session, url, f, start, end, *args):
+            if start == 0:
+                raise RuntimeError("rango fallido")
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.append(start)
+                raise
+
+        async with TestServer(_range_app(payload)) as server:
+            async with aiohttp.ClientSession() as session:
+                with patch("satellite_async.downloader._fetch_segment", side_effect=fake_segment):
+                    result = await download_segmented(
+                        session, str(server.make_url("/file.h5")), str(tmp_path / "out.h5"), segments=4, min_bytes=0
+                    )
+        assert result is None
+        assert sorted(cancelled) == [1000, 2000, 3000]
+        assert not (tmp_path / "out.h5.seg").exists()
+
+    async def test_cancelled_download_removes_the_segment_file(self, tmp_path):
+        from aiohttp.test_utils import TestServer
+
+        started = asyncio.Event()
+
+        async def stuck_segment(session, url, f, start, end, *args):
+            started.set()
+            await asyncio.sleep(60)
+
+        async with TestServer(_range_app(b"x" * 4000)) as server:
+            async with aiohttp.ClientSession() as session:
+                with patch("satellite_async.downloader._fetch_segment", side_effect=stuck_segment):
+                    task = asyncio.create_task(
+                        download_segmented(
+                            session, str(server.make_url("/file.h5")), str(tmp_path / "out.h5"), segments=4, min_bytes=0
+                        )
+                    )
+                    await started.wait()
+                    assert (tmp_path / "out.h5.seg").exists()
+                    task.cancel()
+                    with pytest.raises(asyncio.CancelledError):
+                        await task
+        assert not (tmp_path / "out.h5.seg").exists()
+
+    async def test_download_file_falls_back_when_ranges_unsupported(self, tmp_path):
+        from aiohttp.test_utils import TestServer
+
+        payload = b"x" * 5000
+        async with TestServer(_range_app(payload, honor_range=False)) as server:
+            async with aiohttp.ClientSession() as session:
+                result = await download_file(
+                    session,
+                    str(server.make_url("/file.h5")),
+                    str(tmp_path / "out.h5"),
+                    segments=4,
+                )
+        assert result == str(tmp_path / "out.h5")
+        assert (tmp_path / "out.h5").read_bytes() == payload
+
+
+@pytest.mark.asyncio
+class TestInMemoryDownload:
+    async def test_download_bytes_resumes_and_verifies(self):
+        from aiohttp.test_utils import TestServer
+
+        payload = b"\x89HDF\r\n\x1a\n" + bytes(range(200))
+        async with TestServer(_range_app(payload)) as server:
+            async with aiohttp.ClientSession() as session:
+                data = await download_bytes(
+                    session,
+                    str(server.make_url("/file.h5")),
+                    expected_size=len(payload),
+                    checksum=hashlib.md5(payload).hexdigest(),
+                )
+        assert data == payload
+
+    async def test_fetch_granule_source_keeps_download_off_disk(self, isolated_granule_cache):
+        payload = b"\x89HDF\r\n\x1a\n" + b"\x00" * 10
+        with patch("satellite_async.downloader.find_file", new=AsyncMock(return_value="http://x/f.h5")):
+            with patch("satellite_async.downloader.download_bytes", new=AsyncMock(return_value=payload)):
+                with patch("satellite_async.downloader.download_file", new=AsyncMock()) as dl:
+                    source = await fetch_granule_source(MagicMock(), 2024, "001", "h08v07")
+        assert source == payload
+        dl.assert_not_awaited()
+        assert os.listdir(isolated_granule_cache.root) == []
+
+    async def test_fetch_granule_source_prefers_cached_file(self, isolated_granule_cache, sample_hdf5_path):
+        key = isolated_granule_cache.key(2024, 1, "h08v07")
+        cached = isolated_granule_cache.put(key, sample_hdf5_path)
+        with patch("satellite_async.downloader.find_file", new=AsyncMock()) as ff:
+            source = await fetch_granule_source(MagicMock(), 2024, "001", "h08v07")
+        assert source == cached
+        ff.assert_not_awaited()
+        assert isolated_granule_cache.stats()["pinned"] == 1
+
+
+def test_split_ranges_covers_file_without_overlap():
+    assert _split_ranges(10, 3) == [(0, 3), (4, 7), (8, 9)]
+    assert _split_ranges(2, 8) == [(0, 0), (1, 1)]
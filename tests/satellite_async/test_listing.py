@@ -0,0 +1,119 @@
+"""Tests for the persistent LAADS listing index."""
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from satellite_async.downloader import find_entry, find_files
+from satellite_async.listing import ListingIndex, parse_listing
+
+BASE = "https://example.com/2024/001/"
+
+
+class TestParseListing:
+    def test_parses_relative_html_links(self, sample_directory_html):
+        entries = parse_listing(sample_directory_html, BASE)
+        assert [e["cuadrante"] for e in entries] == ["h08v07", "h09v07"]
+        assert entries[0]["url"] == BASE + "VNP46A1.A2024001.h08v07.001.2024003022532.h5"
+        assert entries[0]["size"] is None
+
+    def test_keeps_full_url_links(self, sample_directory_html_with_full_url):
+        entries = parse_listing(sample_directory_html_with_full_url, BASE)
+        assert entries[0]["url"].startswith("https://ladsweb")
+        assert entries[0]["filename"] == "VNP46A1.A2024001.h08v07.001.2024003022532.h5"
+
+    def test_parses_json_listing_with_size_and_checksum(self):
+        text = json.dumps({"content": [
+            {"name": "VNP46A1.A2024001.h08v07.001.2024003022532.h5", "size": 1234, "md5sum": "abc"},
+            {"name": "README.txt", "size": 10},
+        ]})
+        entries = parse_listing(text, BASE)
+        assert len(entries) == 1
+        assert entries[0]["size"] == 1234
+        assert entries[0]["checksum"] == "abc"
+
+
+class TestListingIndex:
+    def test_persists_and_reloads(self, tmp_path, sample_directory_html):
+        path = str(tmp_path / "index.jsonl")
+        index = ListingIndex(path)
+        index.store_day(2024, "001", parse_listing(sample_directory_html, BASE))
+        reloaded = ListingIndex(path)
+        assert reloaded.has_day(2024, 1)
+        assert reloaded.lookup(2024, 1, "h09v07")["filename"].startswith("VNP46A1.A2024001.h09v07")
+        assert reloaded.lookup(2024, 1, "h99v99") is None
+
+    def test_empty_listing_is_not_stored(self, tmp_path):
+        index = ListingIndex(str(tmp_path / "index.jsonl"))
+        index.store_day(2024, 1, [])
+        assert not index.has_day(2024, 1)
+
+    def test_unchanged_listing_is_not_appended_again(self, tmp_path, sample_directory_html):
+        path = tmp_path / "index.jsonl"
+        index = ListingIndex(str(path))
+        for _ in range(3):
+            index.store_day(2024, 1, parse_listing(sample_directory_html, BASE))
+        assert len(path.read_text().splitlines()) == 1
+
+    def test_negative_lookups_persist_and_expire(self, tmp_path):
+        path = str(tmp_path / "index.jsonl")
+        ListingIndex(path).store_missing(2024, 1, "h99v99", now=1000.0)
+        reloaded = ListingIndex(path, miss_ttl=60)
+        assert reloaded.known_missing(2024, 1, "h99v99", now=1030.0)
+        assert not reloaded.known_missing(2024, 1, "h99v99", now=1100.0)
+        assert not reloaded.known_missing(2024, 1, "h08v07", now=1030.0)
+
+    def test_duplicate_lines_are_compacted_on_load(self, tmp_path, sample_directory_html):
+        path = tmp_path / "index.jsonl"
+        entries = parse_listing(sample_directory_html, BASE)
+        record = json.dumps({"year": 2024, "day": 1, "entries": entries})
+        missing = json.dumps({"year": 2024, "day": 1, "missing": "h99v99", "checked_at": 1.0})
+        path.write_text("\n".join([record, record, missing, missing, record]) + "\n")
+        index = ListingIndex(str(path))
+        assert index.lookup(2024, 1, "h08v07") is not None
+        assert len(path.read_text().splitlines()) == 2
+
+
+@pytest.mark.asyncio
+class TestFindFiles:
+    async def test_fetches_each_day_once(self, sample_directory_html):
+        resp = MagicMock()
+        resp.status = 200
+        resp.text = AsyncMock(return_value=sample_directory_html)
+        ctx = MagicMock()
+        ctx.__aenter__ = AsyncMock(return_value=resp)
+        ctx.__aexit__ = AsyncMock(return_value=None)
+        session = MagicMock()
+        session.get = MagicMock(return_value=ctx)
+
+        dias = [(2024, "001"), (2024, "002"), (2024, "001")]
+        first = await find_files(session, dias, "h08v07")
+        second = await find_files(session, dias, "h09v07")
+        assert set(first) == {(2024, "001"), (2024, "002")}
+        assert all(e["cuadrante"] == "h08v07" for e in first.values())
+        assert all(e["cuadrante"] == "h09v07" for e in second.values())
+        assert session.get.call_count == 2
+
+    async def test_missing_quadrant_is_not_refetched_until_it_expires(self, sample_directory_html, tmp_path):
+        resp = MagicMock()
+        resp.status = 200
+        resp.text = AsyncMock(return_value=sample_directory_html)
+        ctx = MagicMock()
+        ctx.__aenter__ = AsyncMock(return_value=resp)
+        ctx.__aexit__ = AsyncMock(return_value=None)
+        session = MagicMock()
+        session.get = MagicMock(return_value=ctx)
+
+        path = tmp_path / "index.jsonl"
+        index = ListingIndex(str(path))
+        for _ in range(3):
+            assert await find_entry(session, 2024, "001", "h99v99", index) is None
+        assert session.get.call_count == 1
+        # One day line and one negative lookup
+        assert len(path.read_text().splitlines()) == 2
+
+        index.miss_ttl = 0
+        assert await find_entry(session, 2024, "001", "h99v99", index) is None
+        assert session.get.call_count == 2
+        # The refetched listing is unchanged, so only the new negative lookup is appended
+        assert len(path.read_text().splitlines()) == 3
@@ -0,0 +1,95 @@
+"""Tests for satellite_async.metrics (stage timers, counters and Prometheus rendering)."""
+import asyncio
+
+import pytest
+
+from satellite_async import metrics
+from satellite_async.metrics import MetricsRegistry, inc, job_scope, timed, timed_stage
+from satellite_async.processing import read_radiance_window
+from satellite_async.workers import run_cpu
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Enabled, empty metrics registry for the duration of a test."""
+    registry = MetricsRegistry(enabled=True, max_jobs=2)
+    monkeypatch.setattr(metrics, "_registry", registry)
+    return registry
+
+
+class TestDisabled:
+    def test_timed_returns_shared_noop_and_records_nothing(self, monkeypatch):
+        registry = MetricsRegistry(enabled=False)
+        monkeypatch.setattr(metrics, "_registry", registry)
+        assert timed("download") is timed("listing")
+        with timed("download"):
+            pass
+        inc("download_bytes_total", 10)
+        assert registry.stage_count("download") == 0
+        assert registry.counter("download_bytes_total") == 0
+
+
+class TestRegistry:
+    def test_timed_and_decorator_record_stages(self, registry):
+        @timed_stage("statistics")
+        def compute():
+            return 42
+
+        with timed("download"):
+            pass
+        assert compute() == 42
+        assert registry.stage_count("download") == 1
+        assert registry.stage_count("statistics") == 1
+
+    def test_job_scope_attributes_to_job_and_process(self, registry):
+        with job_scope("job-1"):
+            inc("download_bytes_total", 100)
+            with timed("hdf5_open"):
+                pass
+        inc("download_bytes_total", 5)
+        assert registry.counter("download_bytes_total") == 105
+        assert registry.counter("download_bytes_total", "job-1") == 100
+        assert registry.stage_count("hdf5_open", "job-1") == 1
+
+    def test_keeps_only_recent_jobs(self, registry):
+        for job_id in ("a", "b", "c"):
+            with job_scope(job_id):
+                inc("cache_hits_total")
+        assert registry.render("a") is None
+        assert registry.render("c") is not None
+
+    def test_render_prometheus_text(self, registry):
+        registry.observe("download", 0.3)
+        registry.observe("download", 7.0)
+        inc("cache_hits_total", 2)
+        text = registry.render()
+        assert "# TYPE vnp46a1_stage_seconds histogram" in text
+        assert 'vnp46a1_stage_seconds_bucket{stage="download",le="0.25"} 0' in text
+        assert 'vnp46a1_stage_seconds_bucket{stage="download",le="0.5"} 1' in text
+        assert 'vnp46a1_stage_seconds_bucket{stage="download",le="+Inf"} 2' in text
+        assert 'vnp46a1_stage_seconds_count{stage="download"} 2' in text
+        assert "vnp46a1_cache_hits_total 2" in text
+
+    def test_render_job_adds_job_label(self, registry):
+        with job_scope("job-9"):
+            registry.observe("mask", 0.002)
+        text = registry.render("job-9")
+        assert 'vnp46a1_stage_seconds_count{job_id="job-9",stage="mask"} 1' in text
+        assert 'vnp46a1_download_bytes_total{job_id="job-9"} 0' in text
+
+
+class TestPipelineInstrumentation:
+    async def test_cpu_stages_in_threads_belong_to_the_job(self, registry, sample_hdf5_path):
+        async def job():
+            with job_scope("job-cpu"):
+                bbox = {"min_x": 0, "max_x": 3, "min_y": 0, "max_y": 3}
+                return await run_cpu(read_radiance_window, sample_hdf5_path, bbox)
+
+        window = await asyncio.create_task(job())
+        assert window.shape == (4, 4)
+        for stage in ("cpu", "hdf5_open", "dataset_read"):
+            assert registry.stage_count(stage, "job-cpu") == 1
+
+    def test_cache_lookups_are_counted(self, registry, isolated_granule_cache):
+        assert isolated_granule_cache.get(isolated_granule_cache.key(2024, "001", "h08v07")) is None
+        assert registry.counter("cache_misses_total") == 1
@@ -1,9 +1,18 @@
 """Integration tests for satellite_async processing with mocked HDF5."""
 from datetime import date
 
+import h5py
+import numpy as np
 import pytest
 
-from satellite_async.processing import extract_radiance_matrix, process_image
+from satellite_async.config import IMAGE_PATH
+from satellite_async.processing import (
+    extract_radiance_matrix,
+    mask_to_json,
+    process_image,
+    radiance_to_json,
+    read_window,
+)
 
 
 class TestProcessImage:
@@ -57,6 +66,30 @@ class TestProcessImage:
         assert result is None
 
 
+class TestReadWindow:
+    def test_reads_only_requested_window(self, sample_hdf5_path):
+        with h5py.File(sample_hdf5_path, "r") as f:
+            full = f[IMAGE_PATH][()]
+            window, x0, y0 = read_window(f[IMAGE_PATH], 2, 4, 3, 5)
+        assert (x0, y0) == (2, 3)
+        np.testing.assert_array_equal(window, full[3:6, 2:5])
+
+    def test_margin_is_clamped_to_image(self, sample_hdf5_path):
+        with h5py.File(sample_hdf5_path, "r") as f:
+            window, x0, y0 = read_window(f[IMAGE_PATH], 0, 9, 8, 9, margin=3)
+        assert (x0, y0) == (0, 5)
+        assert window.shape == (5, 10)
+
+    def test_process_image_matches_full_read(self, sample_hdf5_path):
+        coords = [(1, 1), (7, 2), (3, 8), (9, 9)]
+        with h5py.File(sample_hdf5_path, "r") as f:
+            full = f[IMAGE_PATH][()]
+        pixeles = [full[y, x] for x, y in coords]
+        result = process_image(sample_hdf5_path, coords, date(2024, 1, 1), "Test", delete_file=False)
+        assert result.Suma_de_radianza == pytest.approx(float(np.sum(pixeles)))
+        assert result.Percentil_50_de_radianza == pytest.approx(float(np.percentile(pixeles, 50)))
+
+
 class TestExtractRadianceMatrix:
     def test_returns_dict_with_matrices_when_valid(self, sample_hdf5_path):
         coords = [(1, 1), (2, 1), (2, 2), (1, 2)]
@@ -77,6 +110,21 @@ class TestExtractRadianceMatrix:
         assert len(result["municipality_mask"]) == 2
         assert len(result["municipality_mask"][0]) == 2
         assert sum(sum(row) for row in result["municipality_mask"]) == 4
+        assert result["radiance_matrix"].dtype == np.float32
+
+    def test_in_memory_bytes_match_file_result(self, sample_hdf5_path):
+        coords = [(1, 1), (2, 1), (2, 2), (1, 2)]
+        with open(sample_hdf5_path, "rb") as f:
+            data = f.read()
+        from_file = extract_radiance_matrix(sample_hdf5_path, coords, date(2024, 1, 1), "x")
+        from_memory = extract_radiance_matrix(data, coords, date(2024, 1, 1), "x")
+        np.testing.assert_array_equal(from_memory["radiance_matrix"], from_file["radiance_matrix"])
+        np.testing.assert_array_equal(from_memory["municipality_mask"], from_file["municipality_mask"])
+        assert from_memory["bbox"] == from_file["bbox"]
+
+    def test_in_memory_html_is_rejected(self):
+        result = extract_radiance_matrix(b"<!DOCTYPE html><html>", [(0, 0)], date(2024, 1, 1), "x")
+        assert result is None
 
     def test_returns_none_when_path_does_not_exist(self):
         result = extract_radiance_matrix(
@@ -96,3 +144,19 @@ class TestExtractRadianceMatrix:
             "Test",
         )
         assert result is None
+
+
+class TestJsonConversion:
+    def test_radiance_nan_and_inf_become_none(self):
+        matrix = np.array([[1.5, np.nan], [-np.inf, 2.0]], dtype=np.float32)
+        assert radiance_to_json(matrix) == [[1.5, None], [None, 2.0]]
+
+    def test_lists_are_returned_unchanged(self):
+        data = [[0.1, None]]
+        assert radiance_to_json(data) is data
+        assert mask_to_json([[1, 0]]) == [[1, 0]]
+
+    def test_mask_becomes_python_ints(self):
+        result = mask_to_json(np.array([[1, 0]], dtype=np.uint8))
+        assert result == [[1, 0]]
+        assert type(result[0][0]) is int
@@ -0,0 +1,87 @@
+"""Tests for the incremental results store."""
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from satellite_async.config import ALGORITHM_VERSION
+from satellite_async.models import CoordenadasPixeles
+from satellite_async.results_store import ResultsStore
+from satellite_async.satellite_async import SatelliteImagesAsync
+
+COORDS = {
+    "norte": [(1, 1), (2, 1), (2, 2), (1, 2)],
+    "sur": [(5, 6), (6, 6), (6, 7)],
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = ResultsStore(str(tmp_path / "r.sqlite"))
+    yield s
+    s.close()
+
+
+class TestResultsStore:
+    def test_lookup_returns_saved_rows_and_none_markers(self, store):
+        store.save(
+            [
+                ("norte", date(2024, 1, 1), "h08v07", {"Municipio": "norte", "Fecha": date(2024, 1, 1)}),
+                ("sur", date(2024, 1, 1), "h08v07", None),
+            ],
+            "v1",
+        )
+        found = store.lookup({"norte": "h08v07", "sur": "h08v07"}, [date(2024, 1, 1), date(2024, 1, 2)], "v1")
+        assert found == {
+            ("norte", date(2024, 1, 1)): {"Municipio": "norte", "Fecha": "2024-01-01"},
+            ("sur", date(2024, 1, 1)): None,
+        }
+
+    def test_other_versions_and_quadrants_are_stale(self, store):
+        store.save([("norte", date(2024, 1, 1), "h08v07", {"x": 1})], "v1")
+        assert store.lookup({"norte": "h08v07"}, [date(2024, 1, 1)], "v2") == {}
+        assert store.lookup({"norte": "h09v07"}, [date(2024, 1, 1)], "v1") == {}
+
+    def test_save_replaces_existing_row(self, store):
+        store.save([("norte", date(2024, 1, 1), "h08v07", {"x": 1})], "v1")
+        store.save([("norte", date(2024, 1, 1), "h08v07", {"x": 2})], "v1")
+        assert store.lookup({"norte": "h08v07"}, [date(2024, 1, 1)], "v1") == {("norte", date(2024, 1, 1)): {"x": 2}}
+
+
+@pytest.fixture
+def sat():
+    def fake_load(municipio, path):
+        return CoordenadasPixeles(cuadrante="h08v07", coordenadas_pixeles=COORDS[municipio])
+
+    with patch("satellite_async.satellite_async.load_coord_data", side_effect=fake_load):
+        return SatelliteImagesAsync(["norte", "sur"])
+
+
+@pytest.mark.asyncio
+class TestIncrementalRun:
+    async def test_extending_range_fetches_only_new_dates(self, sat, sample_hdf5_path, isolated_results_store):
+        with patch("satellite_async.satellite_async.find_files", new=AsyncMock(return_value={})):
+            with patch("satellite_async.satellite_async.fetch_granule", new=AsyncMock(return_value=sample_hdf5_path)) as fg:
+                first = await sat.run(["01-01-24", "02-01-24"], save_progress_enabled=False, incremental=True)
+                assert fg.await_count == 2
+                second = await sat.run(
+                    ["01-01-24", "02-01-24", "03-01-24"], save_progress_enabled=False, incremental=True
+                )
+        assert fg.await_count == 3
+        assert len(first) == 4
+        assert len(second) == 6
+        assert list(second["Fecha"]) == sorted(second["Fecha"])
+        assert second.iloc[:4].reset_index(drop=True).equals(first)
+
+    async def test_new_algorithm_version_recomputes(self, sat, sample_hdf5_path, isolated_results_store):
+        isolated_results_store.save(
+            [(m, date(2024, 1, 1), "h08v07", None) for m in COORDS], "version-anterior"
+        )
+        with patch("satellite_async.satellite_async.find_files", new=AsyncMock(return_value={})):
+            with patch("satellite_async.satellite_async.fetch_granule", new=AsyncMock(return_value=sample_hdf5_path)) as fg:
+                df = await sat.run(["01-01-24"], save_progress_enabled=False, incremental=True)
+        assert fg.await_count == 1
+        assert len(df) == 2
+        assert len(isolated_results_store.lookup(
+            {m: "h08v07" for m in COORDS}, [date(2024, 1, 1)], ALGORITHM_VERSION
+        )) == 2
@@ -1,4 +1,6 @@
 """Integration tests for satellite_async SatelliteImagesAsync with mocked download/processing."""
+import asyncio
+import time
 from datetime import date
 from unittest.mock import patch, AsyncMock, MagicMock
 
@@ -8,6 +10,13 @@ import pytest
 from satellite_async.satellite_async import SatelliteImagesAsync
 
 
+@pytest.fixture(autouse=True)
+def no_listing_prefetch():
+    """Avoid hitting LAADS for the listing prefetch done at the start of run()."""
+    with patch("satellite_async.satellite_async.find_files", new_callable=AsyncMock, return_value={}):
+        yield
+
+
 @pytest.fixture
 def mock_coord_data():
     """Fake CoordenadasPixeles-like object for init."""
@@ -76,3 +85,113 @@ class TestSatelliteImagesAsyncRun:
             df = await sat.run(["01-01-24"], save_progress_enabled=False)
         assert isinstance(df, pd.DataFrame)
         assert len(df) == 0
+
+
+@pytest.mark.asyncio
+class TestSatelliteImagesAsyncConcurrency:
+    async def test_downloads_and_processing_are_bounded(self, mock_coord_data):
+        with patch("satellite_async.satellite_async.load_coord_data", return_value=mock_coord_data):
+            sat = SatelliteImagesAsync("Iztapalapa", max_downloads=2, max_processing=1)
+
+        in_flight = {"download": 0, "process": 0}
+        peak = {"download": 0, "process": 0}
+
+        async def fake_fetch(session, year, day, cuadrante, **kwargs):
+            in_flight["download"] += 1
+            peak["download"] = max(peak["download"], in_flight["download"])
+            await asyncio.sleep(0.01)
+            in_flight["download"] -= 1
+            return "/fake.h5"
+
+        def fake_measure(path, raster, date_obj, names=None):
+            in_flight["process"] += 1
+            peak["process"] = max(peak["process"], in_flight["process"])
+            time.sleep(0.005)
+            in_flight["process"] -= 1
+            return []
+
+        fechas = [f"{d:02d}-01-24" for d in range(1, 11)]
+        with patch("satellite_async.satellite_async.fetch_granule", side_effect=fake_fetch):
+            with patch("satellite_async.satellite_async.measure_granule", side_effect=fake_measure):
+                df = await sat.run(fechas, save_progress_enabled=False)
+        assert df.empty
+        assert peak["download"] == 2
+        assert peak["process"] == 1
+
+
+def test_instance_can_run_under_several_event_loops(mock_coord_data):
+    with patch("satellite_async.satellite_async.load_coord_data", return_value=mock_coord_data):
+        sat = SatelliteImagesAsync("Iztapalapa", max_downloads=1, max_processing=1)
+
+    async def fake_fetch(session, year, day, cuadrante, **kwargs):
+        await asyncio.sleep(0.01)
+        return "/fake.h5"
+
+    with patch("satellite_async.satellite_async.fetch_granule", side_effect=fake_fetch):
+        with patch("satellite_async.satellite_async.measure_granule", return_value=[]):
+            for _ in range(2):
+                # Both dates contend for the single download slot
+                df = asyncio.run(sat.run(["01-01-24", "02-01-24"], save_progress_enabled=False))
+                assert df.empty
+
+
+def _medicion(day):
+    return {
+        "Fecha": date(2024, 1, day),
+        "Municipio": "iztapalapa",
+        "Cantidad_de_pixeles": 1,
+        "Suma_de_radianza": 1.0,
+        "Media_de_radianza": 1.0,
+        "Desviacion_estandar_de_radianza": 0.0,
+        "Maximo_de_radianza": 1.0,
+        "Minimo_de_radianza": 1.0,
+        "Percentil_25_de_radianza": 1.0,
+        "Percentil_50_de_radianza": 1.0,
+        "Percentil_75_de_radianza": 1.0,
+    }
+
+
+@pytest.mark.asyncio
+class TestIterMeasures:
+    async def test_yields_each_date_as_soon_as_it_is_processed(self, mock_coord_data):
+        with patch("satellite_async.satellite_async.load_coord_data", return_value=mock_coord_data):
+            sat = SatelliteImagesAsync("Iztapalapa")
+        release_first = asyncio.Event()
+
+        async def fake_measures(session, date_str, municipios=None):
+            if date_str == "01-01-24":
+                await release_first.wait()
+            return [_medicion(int(date_str[:2]))]
+
+        progress = []
+        lotes = []
+        with patch.object(sat, "get_measures_for_date", side_effect=fake_measures):
+            async for lote in sat.iter_measures(["01-01-24", "02-01-24"], on_progress=progress.append):
+                lotes.append(lote)
+                # The slow date is still running when the fast one is yielded
+                release_first.set()
+        assert [l.fecha for l in lotes] == ["02-01-24", "01-01-24"]
+        assert all(l.origen == "calculado" for l in lotes)
+        assert progress == ["1/2 fechas", "2/2 fechas"]
+
+    async def test_closing_the_generator_cancels_pending_dates(self, mock_coord_data):
+        with patch("satellite_async.satellite_async.load_coord_data", return_value=mock_coord_data):
+            sat = SatelliteImagesAsync("Iztapalapa")
+        cancelled = []
+
+        async def fake_measures(session, date_str, municipios=None):
+            if date_str == "02-01-24":
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(date_str)
+                    raise
+            return [_medicion(int(date_str[:2]))]
+
+        with patch.object(sat, "get_measures_for_date", side_effect=fake_measures):
+            gen = sat.iter_measures(["01-01-24", "02-01-24"])
+            lote = await gen.__anext__()
+            await gen.aclose()
+            await asyncio.sleep(0)
+        assert lote.fecha == "01-01-24"
+        assert cancelled == ["02-01-24"]
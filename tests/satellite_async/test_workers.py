@@ -0,0 +1,73 @@
+"""Tests for the CPU worker pool used to keep HDF5 decoding off the event loop."""
+import asyncio
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from satellite_async import workers
+from satellite_async.zonal import LabelRaster, measure_granule
+
+
+@pytest.fixture
+def thread_pool():
+    workers.configure_cpu_executor("thread", 2)
+    yield
+    workers.shutdown_cpu_executor()
+
+
+@pytest.mark.asyncio
+class TestRunCpu:
+    async def test_runs_outside_event_loop_thread(self, thread_pool):
+        loop_thread = threading.get_ident()
+        worker_thread = await workers.run_cpu(threading.get_ident)
+        assert worker_thread != loop_thread
+
+    async def test_event_loop_stays_responsive(self, thread_pool):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await workers.run_cpu(time.sleep, 0.1)
+        task.cancel()
+        assert ticks >= 5
+
+    async def test_backpressure_limits_pending_submissions(self, thread_pool, monkeypatch):
+        monkeypatch.setattr(workers, "CPU_MAX_PENDING", 2)
+        monkeypatch.setattr(workers, "_pending", workers.weakref.WeakKeyDictionary())
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def job():
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+
+        await asyncio.gather(*(workers.run_cpu(job) for _ in range(6)))
+        assert peak <= 2
+
+    async def test_process_pool_runs_measure_granule(self, sample_hdf5_path):
+        workers.configure_cpu_executor("process", 1)
+        try:
+            raster = LabelRaster("h08v07", {"a": [(1, 1), (2, 2)]})
+            result = await workers.run_cpu(measure_granule, sample_hdf5_path, raster, date(2024, 1, 1))
+        finally:
+            workers.shutdown_cpu_executor()
+        assert result[0].Municipio == "a"
+        assert result[0].Cantidad_de_pixeles == 2
+
+
+def test_rejects_unknown_executor_kind():
+    with pytest.raises(ValueError):
+        workers.configure_cpu_executor("gpu", 1)
@@ -0,0 +1,70 @@
+"""Tests for the label raster and single-pass zonal statistics."""
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from satellite_async.models import CoordenadasPixeles
+from satellite_async.processing import process_image
+from satellite_async.satellite_async import SatelliteImagesAsync
+from satellite_async.zonal import LabelRaster, build_label_rasters, measure_granule
+
+COORDS = {
+    "norte": [(1, 1), (2, 1), (2, 2), (1, 2), (3, 1)],
+    "sur": [(5, 6), (6, 6), (6, 7), (7, 8)],
+    "fuera": [(50, 50)],
+}
+
+
+class TestLabelRaster:
+    def test_labels_and_bboxes(self):
+        raster = LabelRaster("h08v07", COORDS)
+        assert raster.labels.dtype == np.int16
+        assert (raster.x0, raster.y0) == (1, 1)
+        assert raster.bboxes["sur"] == (5, 7, 6, 8)
+        assert int((raster.labels == 0).sum()) == len(COORDS["norte"])
+        assert raster.window_for(["norte", "sur"]) == (1, 7, 1, 8)
+
+    def test_build_groups_by_quadrant(self):
+        rasters = build_label_rasters({
+            "a": CoordenadasPixeles(cuadrante="h08v07", coordenadas_pixeles=[(1, 1)]),
+            "b": CoordenadasPixeles(cuadrante="h07v06", coordenadas_pixeles=[(2, 2)]),
+            "c": CoordenadasPixeles(cuadrante="h08v07", coordenadas_pixeles=[(3, 3)]),
+        })
+        assert set(rasters) == {"h08v07", "h07v06"}
+        assert rasters["h08v07"].names == ["a", "c"]
+
+
+class TestMeasureGranule:
+    def test_matches_process_image_per_municipio(self, sample_hdf5_path):
+        raster = LabelRaster("h08v07", COORDS)
+        resultados = {m.Municipio: m for m in measure_granule(sample_hdf5_path, raster, date(2024, 1, 1))}
+        # "fuera" is outside the 10x10 image and is skipped, as process_image does
+        assert set(resultados) == {"norte", "sur"}
+        for nombre in ("norte", "sur"):
+            esperado = process_image(sample_hdf5_path, COORDS[nombre], date(2024, 1, 1), nombre, delete_file=False)
+            obtenido = resultados[nombre].model_dump()
+            for campo, valor in esperado.model_dump().items():
+                if isinstance(valor, float):
+                    assert obtenido[campo] == pytest.approx(valor, rel=1e-5), campo
+                else:
+                    assert obtenido[campo] == valor, campo
+
+    def test_subset_of_names(self, sample_hdf5_path):
+        raster = LabelRaster("h08v07", COORDS)
+        resultados = measure_granule(sample_hdf5_path, raster, date(2024, 1, 1), ["sur"])
+        assert [m.Municipio for m in resultados] == ["sur"]
+
+
+@pytest.mark.asyncio
+async def test_get_measures_for_date_reads_granule_once(sample_hdf5_path):
+    def fake_load(municipio, path):
+        return CoordenadasPixeles(cuadrante="h08v07", coordenadas_pixeles=COORDS[municipio])
+
+    with patch("satellite_async.satellite_async.load_coord_data", side_effect=fake_load):
+        sat = SatelliteImagesAsync(["norte", "sur"])
+    with patch("satellite_async.satellite_async.fetch_granule", new=AsyncMock(return_value=sample_hdf5_path)) as fg:
+        results = await sat.get_measures_for_date(MagicMock(), "01-01-24")
+    assert fg.await_count == 1
+    assert sorted(r["Municipio"] for r in results) == ["norte", "sur"]
@@ -1,7 +1,9 @@
 """Tests for satellite_sync downloader with mocked HTTP and I/O."""
+import hashlib
 from unittest.mock import patch, MagicMock
 
 import pytest
+import requests
 
 from satellite_sync.downloader import find_file, download_file, is_valid_hdf5_file
 
@@ -72,6 +74,37 @@ class TestDownloadFile:
                     result = download_file("http://example.com/file.h5", save_path)
         assert result is None
 
+    def test_resumes_part_file_with_range_request(self, tmp_path):
+        save_path = str(tmp_path / "out.h5")
+        payload = b"\x89HDF\r\n\x1a\n" + b"\x01" * 20
+        (tmp_path / "out.h5.part").write_bytes(payload[:10])
+        mock_resp = MagicMock()
+        mock_resp.status_code = 206
+        mock_resp.headers = {"Content-Length": str(len(payload) - 10)}
+        mock_resp.iter_content = lambda chunk_size: [payload[10:]]
+        with patch("satellite_sync.downloader.requests.get", return_value=mock_resp) as get:
+            with patch("satellite_sync.downloader.is_valid_hdf5_file", return_value=True):
+                result = download_file(
+                    "http://example.com/file.h5",
+                    save_path,
+                    expected_size=len(payload),
+                    checksum=hashlib.md5(payload).hexdigest(),
+                )
+        assert result == save_path
+        assert get.call_args.kwargs["headers"]["Range"] == "bytes=10-"
+        assert (tmp_path / "out.h5").read_bytes() == payload
+        assert not (tmp_path / "out.h5.part").exists()
+
+    def test_retries_after_connection_error_keeping_part(self, tmp_path):
+        save_path = str(tmp_path / "out.h5")
+        with patch(
+            "satellite_sync.downloader.requests.get",
+            side_effect=requests.ConnectionError("reset"),
+        ) as get:
+            result = download_file("http://example.com/file.h5", save_path, max_retries=2, delay=0)
+        assert result is None
+        assert get.call_count == 2
+
 
 class TestIsValidHdf5File:
     def test_returns_true_for_valid_hdf5(self, sample_hdf5_path):
@@ -8,7 +8,10 @@ from satellite_sync.image_processor import (
     completar_bordes,
     get_pixeles,
     detect_orphan_pixels,
+    seleccionar_pixeles,
+    leer_ventana,
 )
+from satellite_sync.utils import polygon_centroid
 
 
 class TestAumentarImagen:
@@ -51,6 +54,22 @@ class TestRecortarImagen:
         assert len(nx) == len(coords)
         assert len(ny) == len(coords)
 
+    def test_recorte_from_hdf5_dataset_matches_array(self, tmp_path):
+        import h5py
+
+        image = np.random.rand(20, 20).astype(np.float32)
+        path = tmp_path / "img.h5"
+        with h5py.File(path, "w") as f:
+            f.create_dataset("img", data=image, chunks=(5, 5))
+        upper_left = (0.0, 20.0)
+        coords = np.array([[4.0, 16.0], [10.0, 16.0], [10.0, 10.0], [4.0, 10.0], [4.0, 16.0]])
+        esperado, ex, ey = recortar_imagen(image, coords, upper_left, factor_escala=1)
+        with h5py.File(path, "r") as f:
+            recortada, nx, ny = recortar_imagen(f["img"], coords, upper_left, factor_escala=1)
+        np.testing.assert_array_equal(recortada, esperado)
+        np.testing.assert_array_equal(nx, ex)
+        np.testing.assert_array_equal(ny, ey)
+
     def test_recorte_with_scale_factor(self):
         image = np.ones((20, 20), dtype=np.float32)
         upper_left = (0.0, 20.0)
@@ -61,6 +80,39 @@ class TestRecortarImagen:
         assert recortada.shape[1] >= 8
 
 
+
+class TestLeerVentana:
+    class _CountingArray:
+        def __init__(self, data):
+            self.data = data
+            self.shape = data.shape
+            self.reads = 0
+
+        def __getitem__(self, key):
+            self.reads += 1
+            return self.data[key]
+
+    def test_crops_from_window_match_full_image(self):
+        image = np.random.rand(20, 20).astype(np.float32)
+        upper_left = (0.0, 20.0)
+        municipios = [
+            np.array([[2.0, 18.0], [6.0, 18.0], [6.0, 14.0], [2.0, 14.0], [2.0, 18.0]]),
+            np.array([[8.0, 12.0], [9.5, 11.0], [8.5, 9.0], [8.0, 12.0]]),
+            # Reaches past the bottom-right corner of the image
+            np.array([[7.0, 3.0], [10.5, 3.0], [10.5, -0.5], [7.0, -0.5], [7.0, 3.0]]),
+        ]
+        dataset = self._CountingArray(image)
+        ventana = leer_ventana(dataset, municipios, upper_left)
+        assert dataset.reads == 1
+        assert ventana.shape == image.shape
+        for coords in municipios:
+            for escala in (1, 2):
+                esperado, ex, ey = recortar_imagen(image, coords, upper_left, factor_escala=escala)
+                recortada, nx, ny = recortar_imagen(ventana, coords, upper_left, factor_escala=escala)
+                np.testing.assert_array_equal(recortada, esperado)
+                np.testing.assert_array_equal(nx, ex)
+                np.testing.assert_array_equal(ny, ey)
+
 class TestCompletarBordes:
     def test_consecutive_points_unchanged(self):
         x = np.array([0.0, 1.0, 2.0])
@@ -109,3 +161,54 @@ class TestDetectOrphanPixels:
         main = [(1, 1)]
         orphans = detect_orphan_pixels(img, bordes, main)
         assert all(isinstance(p, tuple) and len(p) == 2 for p in orphans)
+
+
+class TestSeleccionarPixeles:
+    @staticmethod
+    def _legacy(shape, centroide, bordes):
+        img = np.zeros(shape)
+        main = get_pixeles(img, centroide, bordes)
+        orphans = detect_orphan_pixels(img, bordes, main)
+        return set(main), set(orphans)
+
+    @staticmethod
+    def _as_set(mask):
+        ys, xs = np.nonzero(mask)
+        return set(zip(xs.tolist(), ys.tolist()))
+
+    @pytest.mark.parametrize("seed", range(8))
+    def test_matches_bfs_implementation_on_random_polygons(self, seed):
+        rng = np.random.default_rng(seed)
+        shape = (30, 40)
+        # Star-shaped polygon around the image center, possibly concave
+        angles = np.sort(rng.uniform(0, 2 * np.pi, 9))
+        radii = rng.uniform(4, 14, 9)
+        xs = 20 + radii * np.cos(angles)
+        ys = 15 + radii * np.sin(angles)
+        xs, ys = np.append(xs, xs[0]), np.append(ys, ys[0])
+        bordes = completar_bordes(xs, ys)
+        centroide = polygon_centroid(bordes)
+
+        main, orphans = self._legacy(shape, centroide, bordes)
+        mask_main, mask_orphans = seleccionar_pixeles(shape, centroide, bordes)
+        assert self._as_set(mask_main) == main
+        assert self._as_set(mask_orphans) == orphans
+
+    def test_orphan_region_detected(self):
+        shape = (9, 9)
+        # Two closed squares: the centroid lies in the first one
+        bordes = [(x, 1) for x in range(1, 5)] + [(x, 4) for x in range(1, 5)] + \
+                 [(1, y) for y in range(1, 5)] + [(4, y) for y in range(1, 5)] + \
+                 [(x, 5) for x in range(5, 9)] + [(x, 8) for x in range(5, 9)] + \
+                 [(5, y) for y in range(5, 9)] + [(8, y) for y in range(5, 9)]
+        mask_main, mask_orphans = seleccionar_pixeles(shape, (2.5, 2.5), bordes)
+        assert self._as_set(mask_main) == {(2, 2), (3, 2), (2, 3), (3, 3)}
+        assert self._as_set(mask_orphans) == {(6, 6), (7, 6), (6, 7), (7, 7)}
+        assert (self._as_set(mask_main), self._as_set(mask_orphans)) == self._legacy(shape, (2.5, 2.5), bordes)
+
+    def test_centroid_on_border_uses_neighbor_components(self):
+        shape = (5, 5)
+        bordes = [(0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (1, 2), (0, 2), (0, 1), (1, 1)]
+        mask_main, mask_orphans = seleccionar_pixeles(shape, (1, 1), bordes)
+        assert (self._as_set(mask_main), self._as_set(mask_orphans)) == self._legacy(shape, (1, 1), bordes)
+
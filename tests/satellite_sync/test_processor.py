@@ -21,12 +21,10 @@ def _fake_completar_bordes(nx, ny):
     return [(0, 0), (1, 0), (2, 1), (1, 1), (0, 0)]
 
 
-def _fake_get_pixeles(imagen, centroide, bordes):
-    return [(1, 1), (2, 1), (1, 2)]
-
-
-def _fake_detect_orphan(imagen, bordes, main_pixels):
-    return []
+def _fake_seleccionar_pixeles(shape, centroide, bordes):
+    principales = np.zeros(shape, dtype=bool)
+    principales[[1, 1, 2], [1, 2, 1]] = True
+    return principales, np.zeros(shape, dtype=bool)
 
 
 class TestSatelliteProcessor:
@@ -37,8 +35,8 @@ class TestSatelliteProcessor:
                 with patch("satellite_sync.processor.extraer_coordenadas", return_value=coords):
                     with patch("satellite_sync.processor.recortar_imagen", side_effect=_fake_recortar):
                         with patch("satellite_sync.processor.completar_bordes", side_effect=_fake_completar_bordes):
-                            with patch("satellite_sync.processor.get_pixeles", side_effect=_fake_get_pixeles):
-                                with patch("satellite_sync.processor.detect_orphan_pixels", side_effect=_fake_detect_orphan):
+                            with patch("satellite_sync.processor.seleccionar_pixeles", side_effect=_fake_seleccionar_pixeles):
+                                with patch("satellite_sync.processor.polygon_centroid", return_value=(1.0, 1.0)):
                                     proc = SatelliteProcessor("Iztapalapa")
                                     result = proc.get_measures("01-01-24", "h08v07", show_plots=False)
         assert result is not None
@@ -47,6 +45,7 @@ class TestSatelliteProcessor:
         assert "Cantidad_de_pixeles" in result
         assert "Media_de_radianza" in result
         assert "Suma_de_radianza" in result
+        assert result["Cantidad_de_pixeles"] == 3
 
     def test_get_measures_returns_none_when_find_file_fails(self):
         with patch("satellite_sync.processor.find_file", return_value=None):
@@ -76,8 +75,8 @@ class TestSatelliteProcessor:
                 with patch("satellite_sync.processor.extraer_coordenadas", return_value=coords):
                     with patch("satellite_sync.processor.recortar_imagen", side_effect=_fake_recortar):
                         with patch("satellite_sync.processor.completar_bordes", side_effect=_fake_completar_bordes):
-                            with patch("satellite_sync.processor.get_pixeles", side_effect=_fake_get_pixeles):
-                                with patch("satellite_sync.processor.detect_orphan_pixels", side_effect=_fake_detect_orphan):
+                            with patch("satellite_sync.processor.seleccionar_pixeles", side_effect=_fake_seleccionar_pixeles):
+                                with patch("satellite_sync.processor.polygon_centroid", return_value=(1.0, 1.0)):
                                     with patch("satellite_sync.processor.os.remove"):
                                         proc = SatelliteProcessor("Iztapalapa")
                                         df = proc.run(["01-01-24", "02-01-24"], "h08v07", show_plots=False)
@@ -92,3 +91,161 @@ class TestSatelliteProcessor:
             df = proc.run(["01-01-24", "02-01-24"], "h08v07", show_plots=False)
         assert isinstance(df, pd.DataFrame)
         assert len(df) == 0
+
+    def test_incremental_run_only_processes_missing_dates(self):
+        def fake_measures(fecha, quadrant, show_plots=False, factor_escala=None):
+            day, month, year = fecha.split("-")
+            return {
+                "Fecha": f"20{year}-{month}-{day}",
+                "Cantidad_de_pixeles": 3,
+                "Cantidad_de_pixeles_principales": 3,
+                "Suma_de_radianza": 30.0,
+                "Media_de_radianza": 10.0,
+                "Desviacion_estandar_de_radianza": 0.0,
+                "Maximo_de_radianza": 10.0,
+                "Minimo_de_radianza": 10.0,
+                "Percentil_25_de_radianza": 10.0,
+                "Percentil_50_de_radianza": 10.0,
+                "Percentil_75_de_radianza": 10.0,
+            }
+
+        proc = SatelliteProcessor("Iztapalapa")
+        with patch.object(proc, "get_measures", side_effect=fake_measures) as gm:
+            proc.run(["01-01-24", "02-01-24"], "h08v07", incremental=True)
+            df = proc.run(["01-01-24", "02-01-24", "03-01-24"], "h08v07", incremental=True)
+            assert gm.call_count == 3
+            # A different scale factor produces different pixels, so it is recomputed
+            proc.run(["01-01-24"], "h08v07", factor_escala=2, incremental=True)
+            assert gm.call_count == 4
+        assert len(df) == 3
+
+
+class TestParallelRun:
+    @staticmethod
+    def _patches(find_file, sample_hdf5_path):
+        coords = np.array([[-1.05, -0.60], [-1.04, -0.59], [-1.045, -0.58], [-1.05, -0.60]])
+        return [
+            patch("satellite_sync.processor.find_file", side_effect=find_file),
+            patch("satellite_sync.processor.download_file", return_value=sample_hdf5_path),
+            patch("satellite_sync.processor.extraer_coordenadas", return_value=coords),
+            patch("satellite_sync.processor.recortar_imagen", side_effect=_fake_recortar),
+            patch("satellite_sync.processor.completar_bordes", side_effect=_fake_completar_bordes),
+            patch("satellite_sync.processor.seleccionar_pixeles", side_effect=_fake_seleccionar_pixeles),
+            patch("satellite_sync.processor.polygon_centroid", return_value=(1.0, 1.0)),
+        ]
+
+    def _run(self, find_file, sample_hdf5_path, fechas, **kwargs):
+        patches = self._patches(find_file, sample_hdf5_path)
+        for p in patches:
+            p.start()
+        try:
+            return SatelliteProcessor("Iztapalapa").run(fechas, "h08v07", **kwargs)
+        finally:
+            for p in patches:
+                p.stop()
+
+    def test_parallel_matches_sequential_order(self, sample_hdf5_path, isolated_granule_cache):
+        import time
+
+        def slow_first(year, day, quadrant):
+            # Earlier dates finish their download last
+            time.sleep(0.05 * (5 - day))
+            return "http://example.com/file.h5"
+
+        fechas = ["01-01-24", "02-01-24", "03-01-24", "04-01-24"]
+        secuencial = self._run(slow_first, sample_hdf5_path, fechas)
+        paralelo = self._run(
+            slow_first, sample_hdf5_path, fechas, parallel=True, io_workers=4, cpu_workers=2, max_in_flight=2
+        )
+        assert list(paralelo["Fecha"]) == list(secuencial["Fecha"])
+        pd.testing.assert_frame_equal(paralelo, secuencial)
+        assert isolated_granule_cache.stats()["pinned"] == 0
+
+    def test_parallel_skips_missing_granules(self, sample_hdf5_path, isolated_granule_cache):
+        def only_even_days(year, day, quadrant):
+            return "http://example.com/file.h5" if day % 2 == 0 else None
+
+        df = self._run(
+            only_even_days, sample_hdf5_path, ["01-01-24", "02-01-24", "03-01-24", "04-01-24"],
+            parallel=True, io_workers=2, cpu_workers=1, max_in_flight=1,
+        )
+        assert [str(f) for f in df["Fecha"]] == ["2024-01-02", "2024-01-04"]
+        assert isolated_granule_cache.stats()["pinned"] == 0
+
+
+def _diamond(cx, cy, r):
+    return np.array([[cx - r, cy], [cx, cy + r], [cx + r, cy], [cx, cy - r], [cx - r, cy]])
+
+
+@pytest.fixture
+def tile_h08v07(tmp_path):
+    """200x200 tile of h08v07 (upper-left corner at lon -100, lat 20) with random radiance."""
+    import h5py
+
+    path = tmp_path / "tile.h5"
+    metadata = "UpperLeftPointMtrs=(-100000000.000000,20000000.000000)\nLowerRightMtrs=(-90000000.000000,10000000.000000)\n"
+    with h5py.File(path, "w") as f:
+        grp = f.create_group("HDFEOS/GRIDS/VNP_Grid_DNB/Data Fields")
+        grp.create_dataset(
+            "DNB_At_Sensor_Radiance_500m", data=np.random.default_rng(0).uniform(0, 100, (200, 200)).astype(np.float32)
+        )
+        f.create_group("HDFEOS INFORMATION").create_dataset(
+            "StructMetadata.0", data=np.array(metadata, dtype=f"S{len(metadata) + 1}")
+        )
+    return str(path)
+
+
+class TestMultiMunicipioRun:
+    COORDS = {
+        "Uno": _diamond(-99.0, 19.0, 0.6),
+        "Dos": _diamond(-97.4, 18.2, 0.45),
+    }
+    FECHAS = ["01-01-24", "02-01-24"]
+
+    def _run(self, municipios, tile, **kwargs):
+        with patch("satellite_sync.processor.find_file", return_value="http://example.com/file.h5"):
+            with patch("satellite_sync.processor.download_file", return_value=tile) as download:
+                with patch("satellite_sync.processor.extraer_coordenadas", side_effect=self.COORDS.get):
+                    df = SatelliteProcessor(municipios).run(self.FECHAS, **kwargs)
+        return df, download
+
+    def test_matches_single_municipio_runs(self, tile_h08v07, isolated_granule_cache):
+        esperado = pd.concat(
+            [self._run(m, tile_h08v07, quadrant="h08v07")[0] for m in self.COORDS], ignore_index=True
+        ).sort_values(["Fecha", "Municipio"], key=lambda c: c.map({"Uno": 0, "Dos": 1}) if c.name == "Municipio" else c)
+
+        for cuadrante in (tile for tile in list(isolated_granule_cache._entries())):
+            isolated_granule_cache.discard(cuadrante[2])
+        df, download = self._run(list(self.COORDS), tile_h08v07, quadrant=None)
+
+        assert list(df["Municipio"]) == ["Uno", "Dos", "Uno", "Dos"]
+        assert [str(f) for f in df["Fecha"]] == ["2024-01-01", "2024-01-01", "2024-01-02", "2024-01-02"]
+        # One granule per date, shared by both municipios
+        assert download.call_count == 2
+        pd.testing.assert_frame_equal(df, esperado.reset_index(drop=True))
+
+    def test_parallel_matches_sequential(self, tile_h08v07, isolated_granule_cache):
+        secuencial, _ = self._run(list(self.COORDS), tile_h08v07, quadrant=None)
+        paralelo, _ = self._run(
+            list(self.COORDS), tile_h08v07, quadrant=None, parallel=True, io_workers=2, cpu_workers=2, max_in_flight=2
+        )
+        pd.testing.assert_frame_equal(paralelo, secuencial)
+        assert isolated_granule_cache.stats()["pinned"] == 0
+
+    def test_incremental_only_measures_missing_municipios(self, tile_h08v07):
+        self._run(["Uno"], tile_h08v07, quadrant="h08v07", incremental=True)
+        medir = SatelliteProcessor._medir_archivo_municipios
+        with patch.object(SatelliteProcessor, "_medir_archivo_municipios", autospec=True, side_effect=medir) as mam:
+            df, _ = self._run(list(self.COORDS), tile_h08v07, quadrant="h08v07", incremental=True)
+            assert [list(c.args[4]) for c in mam.call_args_list] == [["Dos"], ["Dos"]]
+            self._run(list(self.COORDS), tile_h08v07, quadrant="h08v07", incremental=True)
+            assert mam.call_count == 2
+        assert list(df["Municipio"]) == ["Uno", "Dos", "Uno", "Dos"]
+
+    def test_explicit_quadrant_must_contain_every_municipio(self, tile_h08v07):
+        with pytest.raises(ValueError, match="h09v07"):
+            self._run(list(self.COORDS), tile_h08v07, quadrant="h09v07")
+
+    def test_requires_at_least_one_municipio(self):
+        with pytest.raises(ValueError):
+            SatelliteProcessor([])
@@ -1,5 +1,6 @@
 """Unit tests for satellite_sync utils (pure functions and I/O with mocks)."""
 import json
+import os
 from pathlib import Path
 from unittest.mock import patch, mock_open, MagicMock
 
@@ -15,6 +16,8 @@ from satellite_sync.utils import (
     extraer_coordenadas,
     load_coord_data,
     left_right_coords,
+    cuadrante_de_coordenadas,
+    RegistroLimites,
 )
 
 
@@ -76,6 +79,16 @@ class TestPolygonCentroid:
         assert cy == pytest.approx(2.0 / 3.0)
 
 
+class TestCuadranteDeCoordenadas:
+    def test_cdmx_is_h08v07(self):
+        coords = np.array([[-99.2, 19.5], [-99.0, 19.5], [-99.0, 19.3], [-99.2, 19.3]])
+        assert cuadrante_de_coordenadas(coords) == "h08v07"
+
+    def test_monterrey_is_h07v06(self):
+        coords = np.array([[-100.4, 25.8], [-100.2, 25.8], [-100.2, 25.6], [-100.4, 25.6]])
+        assert cuadrante_de_coordenadas(coords) == "h07v06"
+
+
 class TestEsBorde:
     def test_point_on_border(self):
         bordes = [(0, 0), (1, 0), (1, 1)]
@@ -109,6 +122,39 @@ class TestExtraerCoordenadas:
         assert coords is None
 
 
+class TestRegistroLimites:
+    def test_parses_file_once(self, municipios_json_path):
+        registro = RegistroLimites()
+        with patch("satellite_sync.utils.json.load", wraps=json.load) as load:
+            primero = registro.obtener("Iztapalapa", municipios_json_path)
+            segundo = registro.obtener("iztapalapa", municipios_json_path)
+        assert load.call_count == 1
+        assert primero is segundo
+
+    def test_precomputed_geometry(self, municipios_json_path):
+        limite = RegistroLimites().obtener("IZTAPALAPA", municipios_json_path)
+        assert limite.coordenadas.dtype == np.float64
+        assert limite.coordenadas.flags.c_contiguous
+        assert not limite.coordenadas.flags.writeable
+        assert limite.bbox == pytest.approx((-99.05, 19.32, -99.02, 19.35))
+        assert limite.area == pytest.approx(0.03 * 0.03)
+        cx, cy = polygon_centroid([tuple(p) for p in limite.coordenadas[:-1]])
+        assert limite.centroide == pytest.approx((cx, cy))
+
+    def test_reloads_when_mtime_changes(self, tmp_path, municipios_json_path):
+        path = tmp_path / "limites.json"
+        data = json.loads(Path(municipios_json_path).read_text(encoding="utf-8"))
+        path.write_text(json.dumps(data), encoding="utf-8")
+        registro = RegistroLimites()
+        assert registro.obtener("Tlalpan", str(path)) is None
+
+        data["features"][0]["properties"]["NOMGEO"] = "Tlalpan"
+        path.write_text(json.dumps(data), encoding="utf-8")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert registro.obtener("Tlalpan", str(path)) is not None
+
+
 class TestLoadCoordData:
     def test_loads_coordenadas_pixeles(self, tmp_path):
         path = tmp_path / "coords.json"